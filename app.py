@@ -1,15 +1,34 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify
+from flask import Flask, Response, render_template, request, redirect, url_for, flash, session, jsonify, after_this_request, send_from_directory
 import mysql.connector
+from mysql.connector import errorcode
 import os
 from werkzeug.utils import secure_filename
-from datetime import date # Import date for handling publish_date
+from datetime import date, datetime, timedelta # Import date for handling publish_date
 from functools import wraps # Import wraps for decorator
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from apscheduler.schedulers.background import BackgroundScheduler
 import time
-from app_utils import get_db_connection, login_required, return_content, send_email
+import uuid
+import json
+import hmac
+import tempfile
+from app_utils import (get_db_connection, login_required, return_content, send_email, release_request_connections,
+                       db_pool_stats, bump_content_version, content_cache_stats, page_cache, ALL_SECTIONS, fetch_sections,
+                       load_admin_listing, ADMIN_LISTINGS, ADMIN_PAGE_SIZE, json_value, listing_date_filter, mail_dispatcher, new_smtp_session,
+                       load_availability, bump_availability, AVAILABILITY_MAX_MONTHS, load_image_sources,
+                       SECTION_TABLES, load_blog_page, search_index, index_blog, index_faq, rebuild_search_index,
+                       get_db_pool, request_metrics, METRICS_TOKEN)
+from mailer import build_message
+from upload_store import UploadStore
+import image_variants
+import video_transcode
+import blog_renderer
+import lead_export
+from static_assets import StaticAssets
+from asset_bundles import AssetBundles
+from profiler import SamplingProfiler
 from dotenv import load_dotenv  
 
 # Load environment variables from .env file
@@ -28,6 +47,30 @@ ADMIN_PASSWORD = os.getenv('ADMIN_PASSWORD')
 UPLOAD_FOLDER = os.path.join(app.root_path, 'static', 'assets', 'uploads')
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 
+# Full rebuilds of the in-memory search index; this process's own edits are applied immediately
+SEARCH_REBUILD_MINUTES = int(os.getenv('SEARCH_REBUILD_MINUTES', 30))
+
+# Content-hashed static URLs with immutable caching, ranges and pre-compressed CSS/JS
+static_assets = StaticAssets(app)
+# Per-page minified CSS/JS bundles (python asset_bundles.py); ASSET_DEV=1 serves the source files
+asset_bundles = AssetBundles(app)
+# Cached pages link to the bundles, so a rebuilt manifest must not serve pages pointing at removed files
+page_cache.vary_on(asset_bundles.manifest_version)
+
+# Return any pooled DB connections a request forgot to close
+app.teardown_appcontext(release_request_connections)
+
+# Query, render and mail time per endpoint for /metrics, and the slow-request log
+request_metrics.init_app(app, get_db_pool())
+request_metrics.add_gauges('app_db_pool', db_pool_stats, "Connection pool usage")
+request_metrics.add_gauges('app_mail', mail_dispatcher.stats, "Background mail queue")
+
+# Stack sampling and cProfile of this worker on demand, started from /admin/profile/start
+PROFILE_DIR = os.getenv('PROFILE_DIR') or os.path.join(tempfile.gettempdir(), 'fortifund-profiles')
+PROFILE_MAX_SECONDS = float(os.getenv('PROFILE_MAX_SECONDS', 300))
+PROFILE_KEEP = int(os.getenv('PROFILE_KEEP', 20))
+profiler = SamplingProfiler(app, folder=PROFILE_DIR, keep=PROFILE_KEEP)
+
 # --- Email Utility ---
 ADMIN_EMAIL = os.getenv('ADMIN_EMAIL')
 SMTP_SERVER = os.getenv('SMTP_SERVER')
@@ -35,27 +78,122 @@ SMTP_PORT = int(os.getenv('SMTP_PORT', 587))
 SMTP_USERNAME = os.getenv('SMTP_USERNAME')
 SMTP_PASSWORD = os.getenv('SMTP_PASSWORD')
 
-def handle_upload(file, field_name):
+# Uploads are stored by content hash and reference counted in the Images table
+upload_store = UploadStore(UPLOAD_FOLDER)
+
+def handle_upload(file, field_name, cursor=None, current_path=None, released=None):
     """
     Handles file uploads, saves them, and returns the static path.
     field_name can be used to create subdirectories if needed, or just for logging.
+    With a cursor, the new file gains a reference in Images and the file it
+    replaces (current_path) loses one; files left with no references are
+    appended to `released` so the caller can purge them after committing.
     """
     if file and file.filename:
-        filename = secure_filename(file.filename)
-        # Use app.config['UPLOAD_FOLDER'] which is already an absolute path
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
+        filename = upload_store.save(file)
+        schedule_image_variants(filename)
+        if field_name in video_transcode.VIDEO_FIELDS:
+            schedule_video_transcode(field_name, upload_store.path_for(filename))
+        if cursor is not None:
+            upload_store.acquire(cursor, filename)
+            if field_name in video_transcode.VIDEO_FIELDS:
+                reset_video_renditions(cursor, field_name, upload_store.path_for(filename))
+            gone = upload_store.release_path(cursor, current_path)
+            if gone and released is not None:
+                released.append(gone)
         # Return path relative to static for URL usage
-        return f"static/assets/uploads/{filename}"
+        return upload_store.path_for(filename)
     return None
 
+def locked_section_row(cursor, section, columns):
+    """
+    The stored values of `columns` in a singleton section row, locked until
+    the transaction ends. Uploads replace these rather than the form's hidden
+    fields, so reference counts follow the row and concurrent saves queue.
+    """
+    table, key = SECTION_TABLES[section]
+    cursor.execute(f"SELECT {', '.join(columns)} FROM {table} WHERE {key} = 1 FOR UPDATE")
+    rows = cursor.fetchall()
+    return rows[0] if rows else dict.fromkeys(columns)
+
+
+def schedule_image_variants(filename):
+    """
+    Queues WebP/AVIF resizing for an uploaded image on the background scheduler.
+    It is queued once the request has finished, so the Images row it updates
+    has been committed; nothing is done for videos or other files.
+    """
+    if not image_variants.is_image(filename):
+        return
+    source = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+
+    @after_this_request
+    def queue_job(response):
+        scheduler.add_job(image_variants.process_image, args=[filename, source])
+        return response
+
+def schedule_video_transcode(field_name, video_path):
+    """
+    Queues the rendition ladder and poster frame for a newly uploaded section
+    video. ffmpeg runs on the scheduler's worker thread after the response has
+    been sent, so the admin POST never waits for it.
+    """
+    @after_this_request
+    def queue_job(response):
+        scheduler.add_job(video_transcode.process_video, args=[field_name, video_path])
+        return response
+
+
+def reset_video_renditions(cursor, field_name, video_path):
+    """Drops a section's stored renditions when it switches to a different video; the page falls back to the original until the new ones are built."""
+    section, column = video_transcode.VIDEO_FIELDS[field_name]
+    table, pk = SECTION_TABLES[section]
+    cursor.execute(
+        f"UPDATE {table} SET {column}Sources = NULL, {column}Poster = NULL WHERE {pk} = 1 AND NOT ({column} <=> %s)",
+        (video_path,),
+    )
+
+@app.template_global()
+def video_sources(path, renditions=None):
+    """
+    <source> entries for a section video: the transcoded renditions when they
+    exist (JSON stored next to the video column), otherwise the original file
+    with the MIME type matching its extension.
+    """
+    if renditions:
+        try:
+            return json.loads(renditions)
+        except ValueError:
+            pass
+    if not path:
+        return []
+    return [{'url': path, 'type': video_transcode.mime_type(path), 'height': None}]
+
+@app.template_global()
+def image_sources(path):
+    """srcset strings per format for an image path or uploaded filename, or {} if none exist yet."""
+    if not path:
+        return {}
+    key = upload_store.filename_from_path(path) or path
+    return load_image_sources().get(key, {})
+
 
 @app.route('/')
+@page_cache.cached(tags=('blog-list',))
 def index():
-    content = return_content()
+    content = return_content(ALL_SECTIONS, latest_blogs=True)
     return render_template('index.html', **content)
 
+@app.route('/blog')
+@page_cache.cached(tags=('blog-list',), query_args=('after', 'before'))
+def blog_archive():
+    """Every blog post, newest first, a page at a time (?after=/?before= cursors)."""
+    blogs = load_blog_page(request.args.get('after'), request.args.get('before'))
+    content = return_content()
+    return render_template('blog_archive.html', **content, blogs=blogs)
+
 @app.route('/blog/<int:blog_id>')
+@page_cache.cached(tags=lambda blog_id: (f'blog:{blog_id}',))
 def blog(blog_id):
     """
     Route to display a sing-le blog post.
@@ -71,7 +209,11 @@ def blog(blog_id):
             b.subheading,
             b.author,
             b.publish_date,
-            b.content,
+            b.content_html,
+            b.content_toc,
+            b.reading_minutes,
+            b.excerpt,
+            b.renderer_version,
             i.image_filename AS thumbnail_image_filename,
             i.alt_text AS thumbnail_image_alt_text
         FROM Blogs b
@@ -79,6 +221,13 @@ def blog(blog_id):
         WHERE b.blog_id = %s
     """, (blog_id,))
     blog_post = cursor.fetchone()
+    if blog_post and blog_post['renderer_version'] < blog_renderer.RENDERER_VERSION:
+        # Saved before this renderer version; render it once now, later views read the stored HTML
+        cursor.execute("SELECT content FROM Blogs WHERE blog_id = %s", (blog_id,))
+        rendered = blog_renderer.store(cursor, blog_id, cursor.fetchone()['content'])
+        conn.commit()
+        blog_post.update(content_html=rendered['html'], content_toc=rendered['toc'],
+                         reading_minutes=rendered['reading_minutes'], excerpt=rendered['excerpt'])
     conn.close()
 
     content = return_content()
@@ -128,6 +277,8 @@ def admin():
                 cursor.execute("INSERT INTO faqs (category, question, answer) VALUES (%s, %s, %s)",
                                (category, question, answer))
                 conn.commit()
+                index_faq(cursor.lastrowid, category, question, answer)
+                bump_content_version('faqs')
                 flash('FAQ added successfully!', 'success')
                 return redirect(url_for('admin'))
 
@@ -139,14 +290,18 @@ def admin():
                 cursor.execute("UPDATE faqs SET category = %s, question = %s, answer = %s WHERE faq_id = %s",
                                (category, question, answer, faq_id))
                 conn.commit()
+                index_faq(faq_id, category, question, answer)
+                bump_content_version('faqs')
                 flash('FAQ updated successfully!', 'success')
                 return redirect(url_for('admin'))
 
             elif form_type == 'update_main_content': # New condition for main content form
+                released = [] # uploads replaced by this save, deleted once it commits
                 # Existing content update logic
                 # Update Navbar Section (navtable)
                 nav_logo_file = request.files.get('navLogo')
-                nav_logo_path = handle_upload(nav_logo_file, 'navLogo') or request.form.get('currentNavLogo')
+                stored = locked_section_row(cursor, 'nav', ['navLogo'])
+                nav_logo_path = handle_upload(nav_logo_file, 'navLogo', cursor, stored['navLogo'], released) or stored['navLogo']
                 cursor.execute("""
                     UPDATE navtable SET
                     navLogo = %s, navAnchor1 = %s, navAnchor2 = %s, navAnchor3 = %s,
@@ -160,7 +315,8 @@ def admin():
 
                 # Update Hero Section (herotable)
                 hero_img_file = request.files.get('heroImg')
-                hero_img_path = handle_upload(hero_img_file, 'heroImg') or request.form.get('currentHeroImg')
+                stored = locked_section_row(cursor, 'hero', ['heroImg'])
+                hero_img_path = handle_upload(hero_img_file, 'heroImg', cursor, stored['heroImg'], released) or stored['heroImg']
                 cursor.execute("""
                     UPDATE herotable SET
                     heroHeading = %s, heroDescription = %s, heroImg = %s
@@ -173,16 +329,18 @@ def admin():
                     clientHeading = %s, clientDescription = %s
                     WHERE clientTrust_id = 1
                 """, (request.form['clientHeading'], request.form['clientDescription']))
+                stored = locked_section_row(cursor, 'client_trust', [f'clientImg{i}' for i in range(1, 10)])
                 for i in range(1, 10):
                     cl_img_file = request.files.get(f'clientImg{i}')
-                    cl_img_path = handle_upload(cl_img_file, f'clientImg{i}') or request.form.get(f'currentClientImg{i}')
+                    cl_img_path = handle_upload(cl_img_file, f'clientImg{i}', cursor, stored[f'clientImg{i}'], released)
                     if cl_img_path:
                         cursor.execute(f"UPDATE clientTrust SET clientImg{i} = %s WHERE clientTrust_id = 1", (cl_img_path,))
 
 
                 # Update Innovation Section (innovationTable)
                 innovation_video_file = request.files.get('innovationVideo')
-                innovation_video_path = handle_upload(innovation_video_file, 'innovationVideo') or request.form.get('currentInnovationVideo')
+                stored = locked_section_row(cursor, 'innovation', ['innovationVideo'])
+                innovation_video_path = handle_upload(innovation_video_file, 'innovationVideo', cursor, stored['innovationVideo'], released) or stored['innovationVideo']
                 cursor.execute("""
                     UPDATE innovationTable SET
                     innovationHeadTop = %s, innovationHeadmain = %s, innovationDescription = %s,
@@ -196,7 +354,8 @@ def admin():
 
                 # Update Client Experience Section (clientExperience)
                 exp_video_file = request.files.get('clientExpVideo')
-                exp_video_path = handle_upload(exp_video_file, 'clientExpVideo') or request.form.get('currentClientExpVideo')
+                stored = locked_section_row(cursor, 'experience', ['clientExpVideo'])
+                exp_video_path = handle_upload(exp_video_file, 'clientExpVideo', cursor, stored['clientExpVideo'], released) or stored['clientExpVideo']
                 cursor.execute("""
                     UPDATE clientExperience SET
                     clientExpHead = %s, clientExpDescription = %s, clientExpVideo = %s
@@ -213,9 +372,10 @@ def admin():
                 """, (request.form['statHead'], request.form['statDescription']))
 
                 # Update Stat Card Section (stat_card) - new table
+                stored = locked_section_row(cursor, 'stat_card', [f'StatcardLogo{i}' for i in range(1, 4)])
                 for i in range(1, 4):
                     card_logo_file = request.files.get(f'StatcardLogo{i}')
-                    card_logo_path = handle_upload(card_logo_file, f'StatcardLogo{i}') or request.form.get(f'currentStatcardLogo{i}')
+                    card_logo_path = handle_upload(card_logo_file, f'StatcardLogo{i}', cursor, stored[f'StatcardLogo{i}'], released)
                     if card_logo_path:
                         cursor.execute(f"UPDATE stat_card SET StatcardLogo{i} = %s WHERE statCard_id = 1", (card_logo_path,))
                 cursor.execute("""
@@ -232,7 +392,8 @@ def admin():
 
                 # Update Get to Know Section (getToKnow)
                 know_video_file = request.files.get('knowVideo')
-                know_video_path = handle_upload(know_video_file, 'knowVideo') or request.form.get('currentKnowVideo')
+                stored = locked_section_row(cursor, 'know', ['knowVideo'])
+                know_video_path = handle_upload(know_video_file, 'knowVideo', cursor, stored['knowVideo'], released) or stored['knowVideo']
                 cursor.execute("""
                     UPDATE getToKnow SET
                     knowHead = %s, knowVideo = %s
@@ -248,17 +409,18 @@ def admin():
 
 
                 # Update Footer Section (footer)
+                stored = locked_section_row(cursor, 'footer', [f'footer_social_icon{i}' for i in range(1, 5)])
                 social_img1_file = request.files.get('footer_social_icon1')
-                social_img1_path = handle_upload(social_img1_file, 'footer_social_icon1') or request.form.get('current_footer_social_icon1')
+                social_img1_path = handle_upload(social_img1_file, 'footer_social_icon1', cursor, stored['footer_social_icon1'], released) or stored['footer_social_icon1']
 
                 social_img2_file = request.files.get('footer_social_icon2')
-                social_img2_path = handle_upload(social_img2_file, 'footer_social_icon2') or request.form.get('current_footer_social_icon2')
+                social_img2_path = handle_upload(social_img2_file, 'footer_social_icon2', cursor, stored['footer_social_icon2'], released) or stored['footer_social_icon2']
 
                 social_img3_file = request.files.get('footer_social_icon3')
-                social_img3_path = handle_upload(social_img3_file, 'footer_social_icon3') or request.form.get('current_footer_social_icon3')
+                social_img3_path = handle_upload(social_img3_file, 'footer_social_icon3', cursor, stored['footer_social_icon3'], released) or stored['footer_social_icon3']
 
                 social_img4_file = request.files.get('footer_social_icon4')
-                social_img4_path = handle_upload(social_img4_file, 'footer_social_icon4') or request.form.get('current_footer_social_icon4')
+                social_img4_path = handle_upload(social_img4_file, 'footer_social_icon4', cursor, stored['footer_social_icon4'], released) or stored['footer_social_icon4']
 
                 cursor.execute("""
                     UPDATE footer SET
@@ -278,6 +440,8 @@ def admin():
 
 
                 conn.commit()
+                upload_store.purge(cursor, released)
+                bump_content_version()
                 flash('Content updated successfully!', 'success')
                 return redirect(url_for('admin'))
             else:
@@ -289,93 +453,173 @@ def admin():
             flash(f'An error occurred: {e}', 'error')
             print(f"Error: {e}") # For debugging
 
-    # Fetch all content for the GET request (and initial form population)
-    cursor.execute("SELECT * FROM navtable WHERE nav_id = 1")
-    nav_content = cursor.fetchone()
-
-    cursor.execute("SELECT * FROM herotable WHERE hero_id = 1")
-    hero_content = cursor.fetchone()
-
-    cursor.execute("SELECT * FROM clientTrust WHERE clientTrust_id = 1")
-    client_trust_content = cursor.fetchone()
+    # Fetch all section content for the GET request (and initial form population)
+    # Read straight from the DB (not the page cache) so admins always see what is saved
+    section_content = fetch_sections(conn, ALL_SECTIONS)
 
-    cursor.execute("SELECT * FROM innovationTable WHERE innovation_id = 1")
-    innovation_content = cursor.fetchone()
-
-    cursor.execute("SELECT * FROM clientExperience WHERE clientExp_id = 1")
-    experience_content = cursor.fetchone()
-
-    cursor.execute("SELECT * FROM statistics WHERE statistics_id = 1")
-    stats_content = cursor.fetchone()
-
-    cursor.execute("SELECT * FROM stat_card WHERE statCard_id = 1")
-    stat_card_content = cursor.fetchone()
+    # Fetch all FAQs for display in the admin panel
+    cursor.execute("SELECT * FROM faqs ORDER BY category, faq_id")
+    all_faqs = cursor.fetchall()
 
-    cursor.execute("SELECT * FROM getToKnow WHERE knowId = 1")
-    know_content = cursor.fetchone()
+    conn.close()
 
-    cursor.execute("SELECT * FROM exploreTable WHERE explore_id = 1")
-    explore_content = cursor.fetchone()
+    # Contact submissions and demo bookings are not rendered here; their tabs fetch /admin/api/<listing>
+    # Blogs are paged by keyset (?blogs_after=, ?blogs_before=)
+    blogs = load_blog_page(request.args.get('blogs_after'), request.args.get('blogs_before'), per_page=ADMIN_PAGE_SIZE)
 
-    cursor.execute("SELECT * FROM footer WHERE footer_id = 1")
-    footer_content = cursor.fetchone()
+    # Combine all content into a single dictionary for the admin panel
+    content = {
+        **section_content,
+        'all_blogs': blogs['rows'], # Current page of blogs
+        'blogs_page': blogs,
+        'all_faqs': all_faqs, # Add all FAQs for admin
+    }
 
-    # Fetch all blogs for display in the admin panel
-    cursor.execute("""
-        SELECT
-            b.blog_id,
-            b.heading,
-            b.author,
-            b.publish_date,
-            i.image_filename AS thumbnail_image_filename
-        FROM Blogs b
-        LEFT JOIN Images i ON b.thumbnail_image_id = i.image_id
-        ORDER BY b.publish_date DESC
-    """)
-    all_blogs = cursor.fetchall()
+    return render_template('admin.html', content=content)
 
-    # Fetch all FAQs for display in the admin panel
-    cursor.execute("SELECT * FROM faqs ORDER BY category, faq_id")
-    all_faqs = cursor.fetchall()
 
-    # Fetch contact submissions (assuming a table named contact_submissions)
+@app.route('/admin/api/<listing>', methods=['GET'])
+@login_required # Protect this route
+def admin_listing(listing):
+    """
+    A page of contact submissions or demo bookings for the admin tabs.
+    Query args: sort, dir (asc/desc), from/to (YYYY-MM-DD), after/before
+    (cursors from the previous response) and per_page.
+    """
+    if listing not in ADMIN_LISTINGS:
+        return jsonify({'error': f"Unknown listing {listing!r}"}), 404
     try:
-        cursor.execute("SELECT * FROM contact_submissions ORDER BY submission_date DESC")
-        contact_submissions = cursor.fetchall()
+        page = load_admin_listing(
+            listing,
+            sort=request.args.get('sort'),
+            direction=request.args.get('dir', 'desc'),
+            after=request.args.get('after'),
+            before=request.args.get('before'),
+            date_from=request.args.get('from'),
+            date_to=request.args.get('to'),
+            per_page=request.args.get('per_page', ADMIN_PAGE_SIZE, type=int),
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except mysql.connector.Error as err:
-        print(f"Error fetching contact submissions: {err}")
-        contact_submissions = [] # Initialize as empty list if table doesn't exist
+        print(f"Error fetching {listing}: {err}")
+        return jsonify({'error': 'Database error'}), 500
+    page['rows'] = [{key: json_value(value) for key, value in row.items()} for row in page['rows']]
+    page['sorts'] = ADMIN_LISTINGS[listing]['sorts']
+    return jsonify(page)
 
-    # Fetch all demo bookings for admin panel display
+@app.route('/admin/export/<listing>.<fmt>', methods=['GET'])
+@login_required # Protect this route
+def admin_export(listing, fmt):
+    """
+    Streams every contact submission or demo booking as CSV or NDJSON, oldest
+    first, optionally within from/to (YYYY-MM-DD). The body is gzip-encoded
+    for clients that accept it; ?gzip=1 downloads a .gz file instead.
+    """
+    if listing not in ADMIN_LISTINGS or fmt not in lead_export.FORMATS:
+        return jsonify({'error': f"No export {listing}.{fmt}"}), 404
+    try:
+        where, params = listing_date_filter(listing, request.args.get('from'), request.args.get('to'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    as_file = request.args.get('gzip') == '1'
+    encode = not as_file and request.accept_encodings['gzip'] > 0
     try:
-        cursor.execute("SELECT * FROM demo_bookings ORDER BY meeting_date DESC")
-        all_demo_bookings = cursor.fetchall()
+        stream = lead_export.open_export(listing, fmt, where, params, compress=as_file or encode)
+    except lead_export.ExportBusy as e:
+        return jsonify({'error': str(e)}), 429, {'Retry-After': '30'}
     except mysql.connector.Error as err:
-        print(f"Error fetching demo bookings: {err}")
-        all_demo_bookings = [] # Initialize as empty list if table doesn't exist
+        print(f"Error starting {listing} export: {err}")
+        return jsonify({'error': 'Database error'}), 503
+
+    filename = f"{listing}-{date.today().isoformat()}.{fmt}" + ('.gz' if as_file else '')
+    response = Response(stream, mimetype='application/gzip' if as_file else lead_export.FORMATS[fmt])
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response.headers['Cache-Control'] = 'no-store'
+    response.vary.add('Accept-Encoding')
+    if encode:
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+@app.route('/admin/pool_stats', methods=['GET'])
+@login_required # Protect this route
+def admin_pool_stats():
+    """Connection pool usage (in use, waiters, wait/checkout latency) for sizing DB_POOL_SIZE."""
+    return jsonify(db_pool_stats())
 
+@app.route('/admin/cache_stats', methods=['GET'])
+@login_required # Protect this route
+def admin_cache_stats():
+    """Page content cache version and hit/miss counters."""
+    return jsonify(content_cache_stats())
 
-    conn.close()
+@app.route('/admin/mail_stats', methods=['GET'])
+@login_required # Protect this route
+def admin_mail_stats():
+    """Background mail queue depth and sent/failed counters."""
+    return jsonify(mail_dispatcher.stats())
 
-    # Combine all content into a single dictionary for the admin panel
-    content = {
-        **(nav_content or {}),
-        **(hero_content or {}),
-        **(client_trust_content or {}),
-        **(innovation_content or {}),
-        **(experience_content or {}),
-        **(stats_content or {}),
-        **(stat_card_content or {}),
-        **(know_content or {}),
-        **(explore_content or {}),
-        **(footer_content or {}),
-        'all_blogs': all_blogs, # Add all blogs to the content for admin
-        'all_faqs': all_faqs, # Add all FAQs for admin
-        'contact_submissions': contact_submissions, # Add contact submissions
-        'all_demo_bookings': all_demo_bookings # Add all demo bookings for admin
-    }
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """
+    Request, query, render and mail histograms per endpoint, plus the pool and
+    mail queue gauges, for Prometheus. Scrapers send METRICS_TOKEN as a bearer
+    token; a logged-in admin can read it from the browser.
+    """
+    token = request.headers.get('Authorization', '').encode()
+    if not session.get('logged_in') and not (METRICS_TOKEN and hmac.compare_digest(token, f"Bearer {METRICS_TOKEN}".encode())):
+        return Response("Unauthorized\n", status=401, mimetype='text/plain', headers={'WWW-Authenticate': 'Bearer'})
+    return Response(request_metrics.expose(), mimetype='text/plain; version=0.0.4')
 
-    return render_template('admin.html', content=content)
+@app.route('/admin/profile', methods=['GET'])
+@login_required # Protect this route
+def admin_profile():
+    """The profile running on this worker, if any, and the stored ones available for download."""
+    return jsonify({'running': profiler.status(), 'profiles': profiler.profiles()})
+
+@app.route('/admin/profile/start', methods=['POST'])
+@login_required # Protect this route
+def admin_profile_start():
+    """
+    Starts profiling the worker that serves this request. Form fields:
+    requests and endpoint (an endpoint name or path such as /admin) profile
+    the next N requests to it; otherwise seconds (default 30) samples every
+    thread, or only the requests to endpoint if given. interval_ms sets the
+    sampling period (default 10). Poll /admin/profile for the result.
+    """
+    endpoint = request.form.get('endpoint') or None
+    requests = request.form.get('requests', type=int)
+    seconds = request.form.get('seconds', PROFILE_MAX_SECONDS if requests else 30, type=float)
+    interval_ms = request.form.get('interval_ms', 10, type=float)
+    running = profiler.status()
+    if running is not None:
+        return jsonify({'error': f"Profile {running['name']} is still running"}), 409
+    if seconds > PROFILE_MAX_SECONDS:
+        return jsonify({'error': f"seconds must be at most {PROFILE_MAX_SECONDS:g}"}), 400
+    try:
+        profile = profiler.start(seconds, endpoint=endpoint, requests=requests, interval=interval_ms / 1000)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(profile.status()), 202
+
+@app.route('/admin/profile/stop', methods=['POST'])
+@login_required # Protect this route
+def admin_profile_stop():
+    """Ends the running profile early; what it has collected is still written."""
+    profile = profiler.stop()
+    if profile is None:
+        return jsonify({'error': 'No profile is running on this worker'}), 404
+    return jsonify(profile.status())
+
+@app.route('/admin/profile/<name>.<fmt>', methods=['GET'])
+@login_required # Protect this route
+def admin_profile_download(name, fmt):
+    """A stored profile as collapsed stacks (flamegraph.pl, speedscope), a cProfile dump (prof) or its json summary."""
+    try:
+        folder, filename = profiler.file(name, fmt)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 404
+    return send_from_directory(folder, filename, as_attachment=True, max_age=0)
 
 
 # --- Blog Management Routes ---
@@ -438,23 +682,21 @@ def submit_blog():
 
         thumbnail_image_id = None
         if thumbnail_file and thumbnail_file.filename:
-            # Save the image file
-            filename = secure_filename(thumbnail_file.filename)
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            thumbnail_file.save(filepath)
-
-            # Insert image into Images table
-            cursor.execute("INSERT INTO Images (image_filename, alt_text) VALUES (%s, %s)",
-                           (filename, image_alt_text))
-            conn.commit()
-            thumbnail_image_id = cursor.lastrowid # Get the ID of the newly inserted image
-
-        # Insert blog post into Blogs table
+            # Save the image file (deduplicated by content) and take a reference to it
+            filename = upload_store.save(thumbnail_file)
+            thumbnail_image_id = upload_store.acquire(cursor, filename, image_alt_text)
+            schedule_image_variants(filename)
+
+        # Insert blog post into Blogs table, rendered and sanitized once here rather than on every view
         cursor.execute("""
-            INSERT INTO Blogs (heading, subheading, author, publish_date, content, thumbnail_image_id)
-            VALUES (%s, %s, %s, %s, %s, %s)
-        """, (heading, subheading, author, publish_date_str, content, thumbnail_image_id))
+            INSERT INTO Blogs (heading, subheading, author, publish_date, content, thumbnail_image_id,
+                               content_html, content_toc, reading_minutes, excerpt, renderer_version)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """, (heading, subheading, author, publish_date_str, content, thumbnail_image_id,
+              *blog_renderer.rendered_values(content)))
         conn.commit()
+        index_blog(cursor.lastrowid, heading, subheading, content, publish_date_str)
+        bump_content_version('blog-list')
         flash('Blog post added successfully!', 'success')
     except Exception as e:
         conn.rollback()
@@ -478,31 +720,25 @@ def update_blog(blog_id):
         image_alt_text = request.form.get('imageAltText', f"Thumbnail for {heading}")
 
         thumbnail_file = request.files.get('blogImageUpload')
-        current_thumbnail_id = request.form.get('currentThumbnailId') # Hidden input for existing image ID
+        # Use the stored thumbnail rather than the form's hidden field so reference counts stay right
+        cursor.execute("SELECT thumbnail_image_id FROM Blogs WHERE blog_id = %s FOR UPDATE", (blog_id,))
+        result = cursor.fetchone()
+        current_thumbnail_id = result[0] if result else None
 
+        released = []
         new_thumbnail_image_id = current_thumbnail_id
         if thumbnail_file and thumbnail_file.filename:
-            # Save new image
-            filename = secure_filename(thumbnail_file.filename)
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            thumbnail_file.save(filepath)
-
+            # Save new image and move this blog's reference from the old one to it
+            filename = upload_store.save(thumbnail_file)
+            new_thumbnail_image_id = upload_store.acquire(cursor, filename, image_alt_text)
+            schedule_image_variants(filename)
             if current_thumbnail_id:
-                # Update existing image record with new filename and alt text
-                cursor.execute("UPDATE Images SET image_filename = %s, alt_text = %s WHERE image_id = %s",
-                               (filename, image_alt_text, current_thumbnail_id))
-            else:
-                # Insert new image record if no previous image
-                cursor.execute("INSERT INTO Images (image_filename, alt_text) VALUES (%s, %s)",
-                               (filename, image_alt_text))
-                new_thumbnail_image_id = cursor.lastrowid # Get the ID of the newly inserted image
-            conn.commit() # Commit image changes
+                released.append(upload_store.release(cursor, image_id=current_thumbnail_id))
 
         elif current_thumbnail_id:
             # If no new file but there was an old one, just update its alt text
             cursor.execute("UPDATE Images SET alt_text = %s WHERE image_id = %s",
                            (image_alt_text, current_thumbnail_id))
-            conn.commit() # Commit alt text change
 
 
         # Update blog post in Blogs table
@@ -513,10 +749,19 @@ def update_blog(blog_id):
                 author = %s,
                 publish_date = %s,
                 content = %s,
-                thumbnail_image_id = %s
+                thumbnail_image_id = %s,
+                content_html = %s,
+                content_toc = %s,
+                reading_minutes = %s,
+                excerpt = %s,
+                renderer_version = %s
             WHERE blog_id = %s
-        """, (heading, subheading, author, publish_date_str, content, new_thumbnail_image_id, blog_id))
+        """, (heading, subheading, author, publish_date_str, content, new_thumbnail_image_id,
+              *blog_renderer.rendered_values(content), blog_id))
         conn.commit()
+        upload_store.purge(cursor, released)
+        index_blog(blog_id, heading, subheading, content, publish_date_str)
+        bump_content_version(f'blog:{blog_id}', 'blog-list')
         flash('Blog post updated successfully!', 'success')
     except Exception as e:
         conn.rollback()
@@ -528,7 +773,7 @@ def update_blog(blog_id):
 @app.route('/delete_blog/<int:blog_id>', methods=['POST'])
 @login_required # Protect this route
 def delete_blog(blog_id):
-    """Handles the deletion of a blog post and its associated image."""
+    """Handles the deletion of a blog post and releases its thumbnail image."""
     conn = get_db_connection()
     cursor = conn.cursor()
     try:
@@ -540,18 +785,14 @@ def delete_blog(blog_id):
         # Delete the blog post
         cursor.execute("DELETE FROM Blogs WHERE blog_id = %s", (blog_id,))
 
+        released = []
         if thumbnail_image_id:
-            # Get filename before deleting image record
-            cursor.execute("SELECT image_filename FROM Images WHERE image_id = %s", (thumbnail_image_id,))
-            image_filename_result = cursor.fetchone()
-            if image_filename_result and image_filename_result[0]:
-                filename_to_delete = image_filename_result[0]
-                filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename_to_delete)
-                if os.path.exists(filepath):
-                    os.remove(filepath) # Delete the physical file
-            # Delete the image record from the Images table
-            cursor.execute("DELETE FROM Images WHERE image_id = %s", (thumbnail_image_id,))
+            # Drop this blog's reference; the file is only deleted if nothing else uses it
+            released.append(upload_store.release(cursor, image_id=thumbnail_image_id))
         conn.commit()
+        upload_store.purge(cursor, released)
+        search_index.remove('blog', blog_id)
+        bump_content_version(f'blog:{blog_id}', 'blog-list')
         flash('Blog post deleted successfully!', 'success')
     except Exception as e:
         conn.rollback()
@@ -570,6 +811,8 @@ def delete_faq(faq_id):
     try:
         cursor.execute("DELETE FROM faqs WHERE faq_id = %s", (faq_id,))
         conn.commit()
+        search_index.remove('faq', faq_id)
+        bump_content_version('faqs')
         flash('FAQ deleted successfully!', 'success')
     except Exception as e:
         conn.rollback()
@@ -624,8 +867,8 @@ def submit_contact():
         Number of Employees: {num_employees}\n
         Additional Details: {additional_details}
         """
-        send_email(ADMIN_EMAIL, admin_subject, admin_body)
-        admin_email_success = True
+        # Only queued here; a mail worker delivers it (and retries) in the background
+        admin_email_success = send_email(ADMIN_EMAIL, admin_subject, admin_body)
     except Exception as e:
         flash(f'Failed to send notification email to admin: {e}', 'error')
 
@@ -633,8 +876,7 @@ def submit_contact():
     try:
         user_subject = "Thank you for contacting FortiFund!"
         user_body = f"Dear {first_name},\n\nThank you for reaching out to FortiFund. We have received your submission and will get back to you soon.\n\nBest regards,\nThe FortiFund Team"
-        send_email(email, user_subject, user_body)
-        user_email_success = True
+        user_email_success = send_email(email, user_subject, user_body)
     except Exception as e:
         flash(f'Failed to send confirmation email to you: {e}', 'error')
 
@@ -642,62 +884,97 @@ def submit_contact():
     if db_success:
         flash('Your message has been submitted successfully!', 'success')
     if admin_email_success:
-        flash('Notification email sent to admin successfully.', 'success')
+        flash('Notification email to admin queued for delivery.', 'success')
     if user_email_success:
-        flash('Confirmation email sent to you successfully.', 'success')
+        flash('Confirmation email queued for delivery to you.', 'success')
 
     return redirect(url_for('index'))
 
 # --- Other Pages (existing) ---
 
 @app.route('/faqs')
+@page_cache.cached(tags=('faqs',))
 def faqs():
-    content = return_content()
-    # The return_content() function now groups faqs by category
+    content = return_content(faqs=True)
+    # faqs_by_category is grouped by category in the loader
     return render_template('faqs.html', **content)
 
 @app.route('/demo')
+@page_cache.cached()
 def demo():
     content = return_content()
     return render_template('demo-page.html', **content)
 
 @app.route('/matchmaking')
+@page_cache.cached()
 def matchmaking():
     content = return_content()
     return render_template('matchmaking.html', **content)
 
 @app.route('/upcommingSolutions')
+@page_cache.cached()
 def upcommingSolutions():
     content = return_content()
     return render_template('upcomming.html', **content)
 
 
-@app.route('/api/booked_dates', methods=['GET'])
-def api_booked_dates():
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT meeting_date FROM demo_bookings")
-    booked = cursor.fetchall()
-    conn.close()
-    # Return list of YYYY-MM-DD strings
-    return jsonify([row['meeting_date'].strftime('%Y-%m-%d') for row in booked])
+@app.route('/api/availability', methods=['GET'])
+def api_availability():
+    """
+    Free/busy demo slots for a month window, e.g. /api/availability?month=2025-07&months=1.
+    Served from memory with an ETag; unchanged data answers 304.
+    """
+    month = request.args.get('month')
+    try:
+        first_month = datetime.strptime(month, '%Y-%m').date() if month else date.today().replace(day=1)
+    except ValueError:
+        return jsonify({'error': 'month must look like YYYY-MM'}), 400
+    months = request.args.get('months', 1, type=int)
+
+    try:
+        body, etag = load_availability(first_month, months)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    response = app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    # Always revalidate: a booking can change availability at any moment
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+@app.route('/api/search', methods=['GET'])
+def api_search():
+    """
+    Ranked blog/FAQ matches for ?q=, e.g. /api/search?q=insur&type=faq&limit=5.
+    Matches on word prefixes; snippets are HTML with the matched words in <mark>.
+    """
+    query = request.args.get('q', '').strip()[:200]
+    kind = request.args.get('type')
+    if kind not in (None, 'blog', 'faq'):
+        return jsonify({'error': "type must be 'blog' or 'faq'"}), 400
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 50)
+    if not search_index.built:
+        try:
+            rebuild_search_index()
+        except mysql.connector.Error as err:
+            print(f"Error building search index: {err}")
+    started = time.perf_counter()
+    results = search_index.search(query, limit=limit, kind=kind)
+    return jsonify({
+        'query': query,
+        'results': [dict(r, snippet=str(r['snippet'])) for r in results],
+        'took_ms': round((time.perf_counter() - started) * 1000, 2),
+    })
 
 @app.route('/api/booked_dates_times', methods=['GET'])
 def api_booked_dates_times():
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT meeting_date, meeting_time FROM demo_bookings")
-    booked = cursor.fetchall()
-    conn.close()
-    # Return as { 'YYYY-MM-DD': ['08:00', ...] }
-    result = {}
-    for row in booked:
-        date = row['meeting_date'].strftime('%Y-%m-%d')
-        time_ = row['meeting_time']
-        if date not in result:
-            result[date] = []
-        result[date].append(time_)
-    return jsonify(result)
+    """
+    Deprecated: kept for old clients. Same { 'YYYY-MM-DD': ['08:00', ...] } shape
+    as before, built from the cached availability for the next few months.
+    """
+    first_month = date.today().replace(day=1)
+    body, _ = load_availability(first_month, AVAILABILITY_MAX_MONTHS)
+    days = json.loads(body)['days']
+    return jsonify({day: info['busy'] for day, info in days.items()})
 
 @app.route('/book_demo', methods=['POST'])
 def book_demo():
@@ -711,25 +988,34 @@ def book_demo():
     meeting_date = data.get('meeting_date')
     meeting_time = data.get('meeting_time')
 
-    # Check if date+time is already booked
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT COUNT(*) as cnt FROM demo_bookings WHERE meeting_date = %s AND meeting_time = %s", (meeting_date, meeting_time))
-    if cursor.fetchone()['cnt'] > 0:
-        conn.close()
-        flash('Selected date and time is already booked. Please choose another slot.', 'error')
+    try:
+        meeting_at = datetime.strptime(f"{meeting_date} {meeting_time}", '%Y-%m-%d %H:%M')
+    except (TypeError, ValueError):
+        flash('Please choose a valid date and time for your demo.', 'error')
         return redirect(url_for('demo'))
 
     # Generate a placeholder meeting link (replace with real API if needed)
-    meeting_link = f'https://meet.jit.si/fortifund-demo-{meeting_date.replace("-", "")}-{meeting_time.replace(":", "")}'
+    meeting_link = f'https://meet.jit.si/fortifund-demo-{meeting_at:%Y%m%d}-{meeting_at:%H%M}'
 
-    # Save booking
-    cursor.execute("""
-        INSERT INTO demo_bookings (firm_name, company_type, person_name, title, email, team_size, meeting_date, meeting_time, meeting_link)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-    """, (firm_name, company_type, person_name, title, email, team_size, meeting_date, meeting_time, meeting_link))
-    conn.commit()
-    conn.close()
+    # Save booking. The unique index on meeting_at makes the insert itself the
+    # availability check, so two concurrent requests can't take the same slot.
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            INSERT INTO demo_bookings (firm_name, company_type, person_name, title, email, team_size, meeting_date, meeting_time, meeting_at, meeting_link)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """, (firm_name, company_type, person_name, title, email, team_size, meeting_at.date(), meeting_at.strftime('%H:%M'), meeting_at, meeting_link))
+        conn.commit()
+        bump_availability()
+    except mysql.connector.IntegrityError as err:
+        conn.rollback()
+        if err.errno != errorcode.ER_DUP_ENTRY:
+            raise
+        flash('Selected date and time is already booked. Please choose another slot.', 'error')
+        return redirect(url_for('demo'))
+    finally:
+        conn.close()
 
     # Send simple confirmation email (no link)
     subject = "Your Forti-Fund Demo Booking Confirmation"
@@ -737,28 +1023,109 @@ def book_demo():
     Dear {person_name},\n\nYour demo is booked for {meeting_date} at {meeting_time}.\nWe will send you the meeting link shortly before your scheduled time.\n\nThank you!\nForti-Fund Team
     """
     send_email(email, subject, body)
-    flash('Demo booked successfully! Confirmation sent to your email.', 'success')
+    flash('Demo booked successfully! A confirmation email is on its way to you.', 'success')
     return redirect(url_for('demo'))
 
 # --- APScheduler job to send meeting links at the correct time ---
+MEETING_LINK_MAX_ATTEMPTS = 3
+
 def send_due_meeting_links():
+    """
+    Sends the meeting link for every booking starting in the next 10 minutes
+    that has not had its link sent yet.
+    Due rows are claimed with a single UPDATE first, so overlapping runs (or
+    several workers) never send the same link twice. All mail for the run goes
+    over one SMTP session, and only bookings that were actually delivered are
+    marked sent; the rest are released for the next run.
+    """
+    claim_token = uuid.uuid4().hex
+    now = datetime.now().replace(second=0, microsecond=0)
+
+    # Runs outside a request, so the connection has to go back to the pool explicitly
     conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    # Find bookings for today, within the next 10 minutes, and not yet sent
-    now = time.strftime('%Y-%m-%d %H:%M')
-    cursor.execute("SELECT * FROM demo_bookings WHERE CONCAT(meeting_date, ' ', meeting_time) >= %s AND CONCAT(meeting_date, ' ', meeting_time) <= DATE_ADD(%s, INTERVAL 10 MINUTE)", (now, now))
-    bookings = cursor.fetchall()
-    for booking in bookings:
-        # Check if already sent (could add a sent flag in DB, for now just send)
-        subject = "Your Forti-Fund Demo Meeting Link"
-        body = f"Dear {booking['person_name']},\n\nHere is your meeting link for your demo scheduled at {booking['meeting_date']} {booking['meeting_time']}:\n{booking['meeting_link']}\n\nThank you!\nForti-Fund Team"
-        send_email(booking['email'], subject, body)
-        send_email(ADMIN_EMAIL, f"Demo Meeting Link for {booking['person_name']}", f"Meeting for {booking['person_name']} ({booking['email']}) at {booking['meeting_date']} {booking['meeting_time']}: {booking['meeting_link']}")
-    conn.close()
+    try:
+        cursor = conn.cursor(dictionary=True)
+        # Claim unsent bookings in the window. A claim older than 10 minutes
+        # belongs to a run that died and may be taken over.
+        cursor.execute("""
+            UPDATE demo_bookings SET
+                link_claim_token = %s,
+                link_claimed_at = NOW(),
+                link_attempts = link_attempts + 1
+            WHERE link_sent_at IS NULL
+              AND link_attempts < %s
+              AND (link_claimed_at IS NULL OR link_claimed_at < NOW() - INTERVAL 10 MINUTE)
+              AND meeting_at BETWEEN %s AND %s
+        """, (claim_token, MEETING_LINK_MAX_ATTEMPTS, now, now + timedelta(minutes=10)))
+        conn.commit()
+        if cursor.rowcount == 0:
+            return
+        cursor.execute("SELECT * FROM demo_bookings WHERE link_claim_token = %s", (claim_token,))
+        bookings = cursor.fetchall()
+    finally:
+        conn.close()
 
+    sent_ids = []
+    smtp_session = new_smtp_session()
+    try:
+        for booking in bookings:
+            subject = "Your Forti-Fund Demo Meeting Link"
+            body = f"Dear {booking['person_name']},\n\nHere is your meeting link for your demo scheduled at {booking['meeting_date']} {booking['meeting_time']}:\n{booking['meeting_link']}\n\nThank you!\nForti-Fund Team"
+            admin_subject = f"Demo Meeting Link for {booking['person_name']}"
+            admin_body = f"Meeting for {booking['person_name']} ({booking['email']}) at {booking['meeting_date']} {booking['meeting_time']}: {booking['meeting_link']}"
+            try:
+                smtp_session.send(SMTP_USERNAME, booking['email'], build_message(SMTP_USERNAME, booking['email'], subject, body).as_string())
+            except Exception as e:
+                print(f"Error sending meeting link for booking {booking['id']}: {e}")
+                smtp_session.close()
+                continue
+            sent_ids.append(booking['id'])
+            try:
+                smtp_session.send(SMTP_USERNAME, ADMIN_EMAIL, build_message(SMTP_USERNAME, ADMIN_EMAIL, admin_subject, admin_body).as_string())
+            except Exception as e:
+                # The customer already has the link; hand the admin copy to the retrying queue
+                print(f"Error sending admin copy for booking {booking['id']}: {e}")
+                smtp_session.close()
+                send_email(ADMIN_EMAIL, admin_subject, admin_body)
+    finally:
+        smtp_session.close()
+
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        if sent_ids:
+            placeholders = ", ".join(["%s"] * len(sent_ids))
+            cursor.execute(f"UPDATE demo_bookings SET link_sent_at = NOW() WHERE id IN ({placeholders})", sent_ids)
+        # Release whatever failed so the next run retries it
+        cursor.execute("""
+            UPDATE demo_bookings SET link_claim_token = NULL, link_claimed_at = NULL
+            WHERE link_claim_token = %s AND link_sent_at IS NULL
+        """, (claim_token,))
+        conn.commit()
+    finally:
+        conn.close()
+
+# Created here so uploads can queue work on it, but only started by start_scheduler()
 scheduler = BackgroundScheduler()
-scheduler.add_job(send_due_meeting_links, 'interval', minutes=5)
-scheduler.start()
+
+def start_scheduler():
+    """
+    Adds the recurring jobs and starts the background scheduler and the mail
+    dispatcher, whose outbox poller sends mail a previous run left queued.
+    Called when the app is served (`python app.py`, wsgi.py), never on import,
+    so scripts that import the app (export_site.py, query_audit.py, bench)
+    cannot send meeting links or run any other job.
+    """
+    if scheduler.running:
+        return
+    scheduler.add_job(send_due_meeting_links, 'interval', minutes=5)
+    # Build the search index in the background right away, then refresh it for edits made by other workers
+    scheduler.add_job(rebuild_search_index)
+    scheduler.add_job(rebuild_search_index, 'interval', minutes=SEARCH_REBUILD_MINUTES)
+    # Blogs saved by an older blog_renderer (or before it existed) are re-rendered once after a deploy
+    scheduler.add_job(blog_renderer.rebuild)
+    scheduler.start()
+    mail_dispatcher.start()
 
 
 if __name__ == '__main__':
@@ -766,4 +1133,5 @@ if __name__ == '__main__':
     if not os.path.exists(UPLOAD_FOLDER):
         os.makedirs(UPLOAD_FOLDER)
 
+    start_scheduler()
     app.run(debug=True)
\ No newline at end of file
@@ -1,15 +1,25 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify
+from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, g, has_app_context
 import mysql.connector
 import os
 from werkzeug.utils import secure_filename
-from datetime import date # Import date for handling publish_date
+from datetime import date, datetime, timedelta # Import date for handling publish_date
 from functools import wraps # Import wraps for decorator
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from apscheduler.schedulers.background import BackgroundScheduler
 import time
+import threading
+import json
+import hashlib
 from dotenv import load_dotenv 
+from db_pool import ConnectionPool
+from content_cache import VersionedCache
+from page_cache import PageCache, MemoryBackend, DiskBackend
+from search_index import SearchIndex
+from mailer import MailDispatcher, SmtpSession, SqlOutbox
+from image_variants import srcsets
+from request_metrics import RequestMetrics
 load_dotenv()
 
 # --- Admin Credentials ---
@@ -26,16 +36,73 @@ DB_USER = os.getenv("DB_USER")
 DB_PASSWORD = os.getenv("DB_PASSWORD")
 DB_NAME = os.getenv("DB_NAME")
 
+# --- Connection pool settings ---
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 10))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 5))
+DB_POOL_PING_INTERVAL = float(os.getenv('DB_POOL_PING_INTERVAL', 30))
+DB_POOL_RECYCLE = float(os.getenv('DB_POOL_RECYCLE', 3600))
+
+# The pool is created on first use so importing this module never needs a live database
+_db_pool = None
+_db_pool_lock = threading.Lock()
+
+def get_db_pool():
+    global _db_pool
+    if _db_pool is None:
+        with _db_pool_lock:
+            if _db_pool is None:
+                _db_pool = ConnectionPool(
+                    size=DB_POOL_SIZE,
+                    timeout=DB_POOL_TIMEOUT,
+                    ping_interval=DB_POOL_PING_INTERVAL,
+                    recycle=DB_POOL_RECYCLE,
+                    host=DB_HOST,
+                    user=DB_USER,          # Replace with your MySQL username
+                    password=DB_PASSWORD, # Replace with your MySQL password
+                    database=DB_NAME # Updated to your new database name
+                )
+    return _db_pool
+
 # for establishing db connection
 def get_db_connection():
-    conn = mysql.connector.connect(
-        host=DB_HOST,
-        user=DB_USER,          # Replace with your MySQL username
-        password=DB_PASSWORD, # Replace with your MySQL password
-        database=DB_NAME # Updated to your new database name
-    )
+    """
+    Checks a connection out of the shared pool.
+    Calling conn.close() returns it to the pool. Connections taken during a
+    request are also released on teardown, so an early return or exception
+    in a route can never leak a pool slot.
+    """
+    with request_metrics.timed('connect'):
+        conn = get_db_pool().get_connection()
+    if has_app_context():
+        g.setdefault('_db_connections', []).append(conn)
     return conn
 
+def release_request_connections(exc=None):
+    # Registered as a teardown_appcontext handler in app.py
+    for conn in g.pop('_db_connections', []):
+        if not conn.released:
+            conn.close()
+
+def get_dedicated_connection():
+    """
+    A connection of its own, outside the pool, for long-running work such as
+    lead exports, which would otherwise hold a pool slot for as long as the
+    client takes to download. conn.close() really closes it.
+    """
+    return get_db_pool().connect_direct()
+
+def db_pool_stats():
+    return get_db_pool().stats()
+
+# --- Request metrics ---
+# Query, pool, render and mail time per endpoint, served on /metrics (installed in app.py);
+# requests slower than SLOW_REQUEST_MS are logged with the statements they ran.
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() != 'false'
+SLOW_REQUEST_MS = float(os.getenv('SLOW_REQUEST_MS', 1000))
+# Bearer token for Prometheus; without one, /metrics is only readable by a logged-in admin
+METRICS_TOKEN = os.getenv('METRICS_TOKEN') or None
+request_metrics = RequestMetrics(slow_request_ms=SLOW_REQUEST_MS, enabled=METRICS_ENABLED)
+
 # authentication decorator 
 def login_required(f):
     @wraps(f)
@@ -48,112 +115,493 @@ def login_required(f):
 
 
 
-# returning connection
+# --- Page content cache ---
+# Public pages only change when an admin saves something, so the loaded
+# sections are cached and rebuilt once per content version.
+CONTENT_CACHE_TTL = float(os.getenv('CONTENT_CACHE_TTL', 300))
+content_cache = VersionedCache(ttl=CONTENT_CACHE_TTL)
+
+# Rendered HTML of the anonymous public pages, tagged so an edit only evicts the pages it shows up on:
+# 'blog:<id>' for a blog's own page, 'blog-list' for pages listing blogs, 'faqs' for the FAQ page.
+PAGE_CACHE_BACKEND = os.getenv('PAGE_CACHE_BACKEND', 'memory')  # memory, disk or off
+PAGE_CACHE_MAX_ENTRIES = int(os.getenv('PAGE_CACHE_MAX_ENTRIES', 500))
+page_cache = PageCache(
+    DiskBackend(os.getenv('PAGE_CACHE_DIR') or None, PAGE_CACHE_MAX_ENTRIES) if PAGE_CACHE_BACKEND == 'disk'
+    else MemoryBackend(PAGE_CACHE_MAX_ENTRIES),
+    ttl=float(os.getenv('PAGE_CACHE_TTL', CONTENT_CACHE_TTL)),
+    enabled=PAGE_CACHE_BACKEND != 'off',
+)
+
+def bump_content_version(*tags):
+    """
+    Call after committing any admin write that changes public page content.
+    With tags, only the cached pages carrying them are purged; without, all of them.
+    """
+    version = content_cache.bump()
+    if tags:
+        page_cache.purge(*tags)
+    else:
+        page_cache.purge_all()
+    return version
+
+def content_cache_stats():
+    return dict(content_cache.stats(), pages=page_cache.stats())
+
+
+# --- Page content loaders ---
+# Each public route asks only for the sections its template renders.
+
+# Singleton section tables: name -> (table, primary key column).
+# Every row lives at id 1 and the primary key is the table's first column.
+SECTION_TABLES = {
+    'nav': ('navtable', 'nav_id'),
+    'hero': ('herotable', 'hero_id'),
+    'client_trust': ('clientTrust', 'clientTrust_id'),
+    'innovation': ('innovationTable', 'innovation_id'),
+    'experience': ('clientExperience', 'clientExp_id'),
+    'statistics': ('statistics', 'statistics_id'),
+    'stat_card': ('stat_card', 'statCard_id'),
+    'know': ('getToKnow', 'knowId'),
+    'explore': ('exploreTable', 'explore_id'),
+    'footer': ('footer', 'footer_id'),
+}
+ALL_SECTIONS = tuple(SECTION_TABLES)
+# Sections rendered by base.html on every public page (navbar + footer)
+LAYOUT_SECTIONS = ('nav', 'footer')
+
+def _sections_query(names):
+    # One row holding every requested section side by side. LEFT JOINs off a
+    # one-row anchor keep the row even if a section table is empty.
+    select = ", ".join(f"{name}.*" for name in names)
+    joins = " ".join(
+        f"LEFT JOIN {SECTION_TABLES[name][0]} AS {name} ON {name}.{SECTION_TABLES[name][1]} = 1"
+        for name in names
+    )
+    return f"SELECT {select} FROM (SELECT 1 AS anchor) AS anchor {joins}"
+
+def fetch_sections(conn, names=ALL_SECTIONS):
+    """
+    Fetches the given singleton sections in a single round trip and merges
+    their columns into one dict, the shape the templates expect.
+    A section whose row is missing contributes no keys, as before.
+    """
+    cursor = conn.cursor(buffered=True)
+    cursor.execute(_sections_query(names))
+    row = cursor.fetchone()
+    columns = [col[0] for col in cursor.description]
+    cursor.close()
+
+    content = {}
+    if not row:
+        return content
+    # Walk the wide row section by section: each one starts at its primary key,
+    # and a NULL key means that section's row is missing so its columns are skipped
+    starts = {SECTION_TABLES[name][1] for name in names}
+    keep = False
+    for column, value in zip(columns, row):
+        if column in starts:
+            keep = value is not None
+        if keep:
+            content[column] = value
+    return content
+
+def load_sections(*names):
+    names = tuple(names) or ALL_SECTIONS
+    def build():
+        conn = get_db_connection()
+        try:
+            return fetch_sections(conn, names)
+        finally:
+            conn.close()
+    return content_cache.get_or_build(('sections', names), build)
+
+def load_latest_blogs(limit=9):
+    # Latest blogs for the 'Explore' section on the index page.
+    # Only the card fields are selected; the full content TEXT is left out.
+    def build():
+        conn = get_db_connection()
+        try:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute(f"""
+                SELECT {BLOG_LIST_COLUMNS}
+                FROM Blogs b
+                LEFT JOIN Images i ON b.thumbnail_image_id = i.image_id
+                ORDER BY b.publish_date DESC, b.blog_id DESC
+                LIMIT %s
+            """, (limit,))
+            return cursor.fetchall()
+        finally:
+            conn.close()
+    return content_cache.get_or_build(('latest_blogs', limit), build)
+
+# Blog listings page with a keyset on (publish_date, blog_id) instead of OFFSET, so
+# every page is an index range scan on idx_blogs_publish however deep the archive goes.
+BLOG_PAGE_SIZE = 12
+
+BLOG_LIST_COLUMNS = """
+    b.blog_id,
+    b.heading,
+    b.subheading,
+    b.author,
+    b.publish_date,
+    b.excerpt,
+    b.reading_minutes,
+    i.image_filename AS thumbnail_image_filename,
+    i.alt_text AS thumbnail_image_alt_text
+"""
+
+def blog_cursor(blog):
+    """Opaque position of a blog in the listing, e.g. '2025-06-01.42'."""
+    return f"{blog['publish_date'].isoformat()}.{blog['blog_id']}"
+
+def _parse_blog_cursor(value):
+    try:
+        day, blog_id = value.split('.')
+        return date.fromisoformat(day), int(blog_id)
+    except (AttributeError, ValueError):
+        return None
+
+def load_blog_page(after=None, before=None, per_page=BLOG_PAGE_SIZE):
+    """
+    One page of blogs, newest first, without the content column.
+    after/before are cursors from a previous page's 'next'/'prev' (older/newer posts).
+    Returns {'rows', 'next', 'prev'} where next/prev are None at either end.
+    """
+    after, before = _parse_blog_cursor(after), _parse_blog_cursor(before)
+    # Spelled out rather than as a row comparison so MySQL can use it as an index range
+    if before:
+        where = "WHERE b.publish_date > %s OR (b.publish_date = %s AND b.blog_id > %s)"
+        params = (before[0], before[0], before[1])
+        order = "b.publish_date ASC, b.blog_id ASC"
+    elif after:
+        where = "WHERE b.publish_date < %s OR (b.publish_date = %s AND b.blog_id < %s)"
+        params = (after[0], after[0], after[1])
+        order = "b.publish_date DESC, b.blog_id DESC"
+    else:
+        where, params, order = "", (), "b.publish_date DESC, b.blog_id DESC"
 
-def return_content():
     conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-
-    # Fetch all content from all tables according to new schema
-    cursor.execute("SELECT * FROM navtable WHERE nav_id = 1")
-    nav_content = cursor.fetchone()
-
-    cursor.execute("SELECT * FROM herotable WHERE hero_id = 1")
-    hero_content = cursor.fetchone()
-
-    cursor.execute("SELECT * FROM clientTrust WHERE clientTrust_id = 1")
-    client_trust_content = cursor.fetchone()
-
-    cursor.execute("SELECT * FROM innovationTable WHERE innovation_id = 1")
-    innovation_content = cursor.fetchone()
-
-    cursor.execute("SELECT * FROM clientExperience WHERE clientExp_id = 1")
-    experience_content = cursor.fetchone()
-
-    cursor.execute("SELECT * FROM statistics WHERE statistics_id = 1")
-    stats_content = cursor.fetchone()
-
-    cursor.execute("SELECT * FROM stat_card WHERE statCard_id = 1")
-    stat_card_content = cursor.fetchone()
-
-    cursor.execute("SELECT * FROM getToKnow WHERE knowId = 1")
-    know_content = cursor.fetchone()
-
-    cursor.execute("SELECT * FROM exploreTable WHERE explore_id = 1")
-    explore_content = cursor.fetchone()
-
-    cursor.execute("SELECT * FROM footer WHERE footer_id = 1")
-    footer = cursor.fetchone()
-
-    # Fetch latest blogs for the 'Explore' section (e.g., for index page)
-    # Join with Images table to get thumbnail details
-    cursor.execute("""
-        SELECT
-            b.blog_id,
-            b.heading,
-            b.subheading,
-            b.author,
-            b.publish_date,
-            b.content,
-            i.image_filename AS thumbnail_image_filename,
-            i.alt_text AS thumbnail_image_alt_text
-        FROM Blogs b
-        LEFT JOIN Images i ON b.thumbnail_image_id = i.image_id
-        ORDER BY b.publish_date DESC
-        LIMIT 9 # Fetch a reasonable number of latest blogs
-    """)
-    latest_blogs = cursor.fetchall()
-
-    # Fetch all FAQs and group by category
-    cursor.execute("SELECT * FROM faqs ORDER BY category, faq_id")
-    all_faqs = cursor.fetchall()
-    faqs_by_category = {}
-    for faq in all_faqs:
-        category = faq['category']
-        if category not in faqs_by_category:
-            faqs_by_category[category] = []
-        faqs_by_category[category].append(faq)
-
-    # Fetch contact submissions
-    cursor.execute("SELECT * FROM contact_submissions ORDER BY submission_date DESC")
-    contact_submissions = cursor.fetchall()
-
-
-    conn.close()
-
-    # Combine all content into a single dictionary for easier access in Jinja
-    content = {
-        **(nav_content or {}),
-        **(hero_content or {}),
-        **(client_trust_content or {}),
-        **(innovation_content or {}),
-        **(experience_content or {}),
-        **(stats_content or {}),
-        **(stat_card_content or {}),
-        **(know_content or {}),
-        **(explore_content or {}),
-        **(footer or {} ),
-        'latest_blogs': latest_blogs, # Add latest blogs to the content
-        'faqs_by_category': faqs_by_category, # Add grouped FAQs
-        'contact_submissions': contact_submissions # Add contact submissions
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(f"""
+            SELECT {BLOG_LIST_COLUMNS}
+            FROM Blogs b
+            LEFT JOIN Images i ON b.thumbnail_image_id = i.image_id
+            {where}
+            ORDER BY {order}
+            LIMIT %s
+        """, params + (per_page + 1,))
+        rows = cursor.fetchall()
+    finally:
+        conn.close()
+
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if before:
+        rows.reverse()
+    return {
+        'rows': rows,
+        # Coming from a newer page there are always older posts; coming from an older one, always newer
+        'next': blog_cursor(rows[-1]) if rows and (more or before) else None,
+        'prev': blog_cursor(rows[0]) if rows and ((more and before) or after) else None,
     }
 
+def load_faqs_by_category():
+    # All FAQs grouped by category, in display order
+    def build():
+        conn = get_db_connection()
+        try:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute("SELECT * FROM faqs ORDER BY category, faq_id")
+            all_faqs = cursor.fetchall()
+        finally:
+            conn.close()
+        faqs_by_category = {}
+        for faq in all_faqs:
+            faqs_by_category.setdefault(faq['category'], []).append(faq)
+        return faqs_by_category
+    return content_cache.get_or_build('faqs_by_category', build)
+
+def load_image_sources():
+    # Responsive variants per image: {image_filename: {'webp': srcset, 'avif': srcset}}
+    def build():
+        conn = get_db_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT image_filename, variants FROM Images WHERE variants IS NOT NULL")
+            rows = cursor.fetchall()
+        finally:
+            conn.close()
+        return {filename: srcsets(json.loads(variants)) for filename, variants in rows}
+    return content_cache.get_or_build('image_sources', build)
+
+def return_content(sections=LAYOUT_SECTIONS, latest_blogs=False, faqs=False):
+    """
+    Builds the template context for a public page from the cached loaders.
+    By default only the navbar and footer are loaded; pass sections=ALL_SECTIONS
+    and/or latest_blogs/faqs=True for pages that render more.
+    """
+    # Fresh dict so a caller adding keys can't leak them into the cache
+    content = dict(load_sections(*sections))
+    if latest_blogs:
+        content['latest_blogs'] = load_latest_blogs()
+    if faqs:
+        content['faqs_by_category'] = load_faqs_by_category()
     return content
 
 
-# send email
+# --- Site search ---
+# Blogs and FAQs are indexed in memory at startup; the write paths keep it current
+# with index_blog/index_faq/search_index.remove, and a periodic rebuild picks up
+# changes made through other workers.
+search_index = SearchIndex()
 
-def send_email(to_email, subject, body):
-    msg = MIMEMultipart()
-    msg['From'] = SMTP_USERNAME
-    msg['To'] = to_email
-    msg['Subject'] = subject
-    msg.attach(MIMEText(body, 'plain'))
+def index_blog(blog_id, heading, subheading, content, publish_date=None):
+    search_index.add('blog', int(blog_id), heading, f"{subheading or ''} {content or ''}", f"/blog/{blog_id}",
+                     publish_date=str(publish_date) if publish_date else None)
+
+def index_faq(faq_id, category, question, answer):
+    search_index.add('faq', int(faq_id), question, answer, f"/faqs#faq-{faq_id}", category=category)
+
+def rebuild_search_index():
+    conn = get_db_connection()
     try:
-        server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT)
-        server.starttls()
-        server.login(SMTP_USERNAME, SMTP_PASSWORD)
-        server.sendmail(SMTP_USERNAME, to_email, msg.as_string())
-        server.quit()
-    except Exception as e:
-        print(f"Error sending email: {e}")
\ No newline at end of file
+        cursor = conn.cursor()
+        cursor.execute("SELECT blog_id, heading, subheading, content, publish_date FROM Blogs")
+        blogs = cursor.fetchall()
+        cursor.execute("SELECT faq_id, category, question, answer FROM faqs")
+        faqs = cursor.fetchall()
+    finally:
+        conn.close()
+    search_index.replace_all(
+        [('blog', blog_id, heading, f"{subheading or ''} {content or ''}", f"/blog/{blog_id}",
+          {'publish_date': str(publish_date) if publish_date else None})
+         for blog_id, heading, subheading, content, publish_date in blogs] +
+        [('faq', faq_id, question, answer, f"/faqs#faq-{faq_id}", {'category': category})
+         for faq_id, category, question, answer in faqs]
+    )
+    return len(search_index)
+
+
+# --- Admin-only loaders ---
+# These are never cached and are paged so the admin page stays fast as leads grow.
+ADMIN_PAGE_SIZE = 50
+
+# Admin listings of leads, as JSON for the admin tabs. Pages are keyset-paged on
+# (sort column, id) like the blog archive; every sort column is indexed, so any
+# page of any sort is an index range scan, and the date filters narrow the same range.
+ADMIN_LISTINGS = {
+    'submissions': {
+        'table': 'contact_submissions',
+        'columns': ('id', 'first_name', 'last_name', 'email', 'job_title', 'company_name', 'phone_number',
+                    'industry', 'num_employees', 'additional_details', 'submission_date'),
+        'sorts': ('submission_date', 'id'),
+        'date_column': 'submission_date',
+    },
+    'bookings': {
+        'table': 'demo_bookings',
+        'columns': ('id', 'firm_name', 'company_type', 'person_name', 'title', 'email', 'team_size',
+                    'meeting_date', 'meeting_time', 'meeting_at', 'meeting_link', 'link_sent_at', 'created_at'),
+        'sorts': ('meeting_at', 'created_at', 'id'),
+        'date_column': 'meeting_at',
+    },
+}
+ADMIN_MAX_PAGE_SIZE = 200
+
+def json_value(value):
+    # ISO 8601 rather than jsonify's RFC 822 dates, so admin tables and exports can sort and parse them
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, timedelta):
+        return str(value)
+    return value
+
+def listing_cursor(row, sort):
+    """Opaque position of a row in a listing sorted by `sort`, e.g. '2025-06-01T10:00:00.42'."""
+    value = row[sort]
+    return f"{value.isoformat() if hasattr(value, 'isoformat') else value}.{row['id']}"
+
+def _parse_listing_cursor(value, sort):
+    try:
+        key, row_id = value.rsplit('.', 1)
+        return (int(key) if sort == 'id' else datetime.fromisoformat(key)), int(row_id)
+    except (AttributeError, ValueError):
+        return None
+
+def _parse_day(value):
+    try:
+        return date.fromisoformat(value) if value else None
+    except ValueError:
+        raise ValueError(f"Invalid date: {value!r} (expected YYYY-MM-DD)")
+
+def listing_date_filter(name, date_from=None, date_to=None):
+    """
+    ([conditions], [params]) restricting a listing to an inclusive day range
+    on its date column; ValueError for a malformed date.
+    """
+    date_column = ADMIN_LISTINGS[name]['date_column']
+    where, params = [], []
+    start, end = _parse_day(date_from), _parse_day(date_to)
+    if start:
+        where.append(f"{date_column} >= %s")
+        params.append(start)
+    if end:
+        # Inclusive of the whole last day, still a plain range on the index
+        where.append(f"{date_column} < %s")
+        params.append(end + timedelta(days=1))
+    return where, params
+
+def load_admin_listing(name, sort=None, direction='desc', after=None, before=None,
+                       date_from=None, date_to=None, per_page=ADMIN_PAGE_SIZE):
+    """
+    One page of an ADMIN_LISTINGS table. sort is one of its 'sorts' (default
+    the first), direction 'asc' or 'desc'; date_from/date_to (YYYY-MM-DD,
+    inclusive) filter on its date column. after/before are a previous page's
+    'next'/'prev' cursors. Returns {'rows', 'next', 'prev', 'sort', 'direction'}.
+    Raises KeyError for an unknown listing and ValueError for bad arguments.
+    """
+    listing = ADMIN_LISTINGS[name]
+    sort = sort or listing['sorts'][0]
+    if sort not in listing['sorts']:
+        raise ValueError(f"Cannot sort by {sort!r}; use one of {', '.join(listing['sorts'])}")
+    if direction not in ('asc', 'desc'):
+        raise ValueError("direction must be 'asc' or 'desc'")
+    per_page = max(1, min(int(per_page), ADMIN_MAX_PAGE_SIZE))
+    after, before = _parse_listing_cursor(after, sort), _parse_listing_cursor(before, sort)
+
+    where, params = listing_date_filter(name, date_from, date_to)
+
+    # Walking backwards (?before=) reads the index the other way and reverses the rows afterwards
+    forward = before is None
+    descending = (direction == 'desc') == forward
+    position = after or before
+    if position:
+        op = '<' if descending else '>'
+        if sort == 'id':
+            where.append(f"id {op} %s")
+            params.append(position[1])
+        else:
+            # Spelled out rather than as a row comparison so MySQL can use it as an index range
+            where.append(f"({sort} {op} %s OR ({sort} = %s AND id {op} %s))")
+            params.extend((position[0], position[0], position[1]))
+    order = ' DESC' if descending else ' ASC'
+    order_by = f"id{order}" if sort == 'id' else f"{sort}{order}, id{order}"
+
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(f"""
+            SELECT {', '.join(listing['columns'])}
+            FROM {listing['table']}
+            {'WHERE ' + ' AND '.join(where) if where else ''}
+            ORDER BY {order_by}
+            LIMIT %s
+        """, (*params, per_page + 1))
+        rows = cursor.fetchall()
+    finally:
+        conn.close()
+
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if not forward:
+        rows.reverse()
+    return {
+        'rows': rows,
+        'next': listing_cursor(rows[-1], sort) if rows and (more or not forward) else None,
+        'prev': listing_cursor(rows[0], sort) if rows and ((more and not forward) or after) else None,
+        'sort': sort,
+        'direction': direction,
+    }
+
+
+# --- Demo availability ---
+# Bookable demo slots per weekday; must match the options in demo-page.html
+DEMO_SLOTS = ('08:00', '09:00', '10:00', '11:00', '12:00', '13:00', '14:00')
+AVAILABILITY_MAX_MONTHS = 3
+# Demos can be booked from the current month through this many months ahead
+AVAILABILITY_BOOKABLE_MONTHS = int(os.getenv('AVAILABILITY_BOOKABLE_MONTHS', 12))
+# Bookings only change through book_demo, which bumps this cache. The short TTL
+# lets slots that have started drop out and covers bookings made by other workers.
+availability_cache = VersionedCache(ttl=float(os.getenv('AVAILABILITY_CACHE_TTL', 60)))
+
+def bump_availability():
+    return availability_cache.bump()
+
+def _add_months(day, months):
+    month = day.month - 1 + months
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+def load_availability(first_month, months=1):
+    """
+    Busy slots for the days from `first_month` (a date on the 1st) through
+    `months` months later, skipping anything already in the past.
+    Returns (json_bytes, etag): the payload is serialised once per cache entry
+    so repeat requests and 304s cost no query and no JSON encoding.
+    Raises ValueError if `first_month` is outside the bookable window, which
+    also keeps the number of cache entries bounded.
+    """
+    this_month = date.today().replace(day=1)
+    if not this_month <= first_month <= _add_months(this_month, AVAILABILITY_BOOKABLE_MONTHS):
+        raise ValueError(f"month must be between {this_month:%Y-%m} and "
+                         f"{_add_months(this_month, AVAILABILITY_BOOKABLE_MONTHS):%Y-%m}")
+    months = max(1, min(int(months), AVAILABILITY_MAX_MONTHS))
+    def build():
+        start = max(datetime.combine(first_month, datetime.min.time()), datetime.now())
+        end = datetime.combine(_add_months(first_month, months), datetime.min.time())
+        days = {}
+        if start < end:
+            conn = get_db_connection()
+            try:
+                cursor = conn.cursor()
+                # Range scan on uq_demo_meeting_at; only the window is read, never past history
+                cursor.execute(
+                    "SELECT meeting_at FROM demo_bookings WHERE meeting_at >= %s AND meeting_at < %s ORDER BY meeting_at",
+                    (start, end),
+                )
+                rows = cursor.fetchall()
+            finally:
+                conn.close()
+            for (meeting_at,) in rows:
+                days.setdefault(meeting_at.strftime('%Y-%m-%d'), []).append(meeting_at.strftime('%H:%M'))
+        payload = {
+            'from': first_month.isoformat(),
+            'to': _add_months(first_month, months).isoformat(),
+            'slots': list(DEMO_SLOTS),
+            # Only days with at least one booking are listed; any other day is fully free
+            'days': {
+                day: {'busy': busy, 'full': len(set(busy) & set(DEMO_SLOTS)) >= len(DEMO_SLOTS)}
+                for day, busy in days.items()
+            },
+        }
+        body = json.dumps(payload, sort_keys=True, separators=(',', ':')).encode()
+        return body, hashlib.sha1(body).hexdigest()
+    return availability_cache.get_or_build(('availability', first_month, months), build)
+
+
+# --- Outgoing email ---
+# Mail is queued and sent by background workers that keep an SMTP session
+# open, so form posts never wait on the relay. Every message is written to
+# the email_outbox table first and survives a restart.
+SMTP_USE_TLS = os.getenv('SMTP_USE_TLS', 'true').lower() != 'false' # set false for a local test SMTP server
+MAIL_WORKERS = int(os.getenv('MAIL_WORKERS', 2))
+MAIL_QUEUE_SIZE = int(os.getenv('MAIL_QUEUE_SIZE', 1000))
+MAIL_MAX_ATTEMPTS = int(os.getenv('MAIL_MAX_ATTEMPTS', 5))
+
+def new_smtp_session():
+    return SmtpSession(SMTP_SERVER, SMTP_PORT, SMTP_USERNAME, SMTP_PASSWORD, use_tls=SMTP_USE_TLS,
+                       on_send=request_metrics.observe_smtp)
+
+mail_dispatcher = MailDispatcher(
+    new_smtp_session,
+    from_addr=SMTP_USERNAME,
+    outbox=SqlOutbox(get_db_connection),
+    workers=MAIL_WORKERS,
+    queue_size=MAIL_QUEUE_SIZE,
+    max_attempts=MAIL_MAX_ATTEMPTS,
+)
+
+# send email
+def send_email(to_email, subject, body):
+    """Queues an email for background delivery and returns immediately."""
+    with request_metrics.timed('mail'):
+        return mail_dispatcher.enqueue(to_email, subject, body)
@@ -0,0 +1,303 @@
+import hashlib
+import json
+import os
+import re
+import threading
+
+from markupsafe import Markup
+from flask import url_for
+
+STATIC_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+DIST_FOLDER = 'dist'
+MANIFEST_FILE = os.path.join(STATIC_ROOT, DIST_FOLDER, 'manifest.json')
+
+# Per-page bundles, in the order the files were loaded before bundling (CSS order is the cascade)
+BUNDLES = {
+    'base': {'css': ['css/base.css'], 'js': ['js/navbarScroll.js']},
+    'index': {'css': ['css/base.css', 'css/style.css'], 'js': ['js/navbarScroll.js', 'js/lazy_video.js']},
+    'faqs': {'css': ['css/base.css', 'css/faqs.css'], 'js': ['js/navbarScroll.js', 'js/site_search.js']},
+    'archive': {'css': ['css/base.css'], 'js': ['js/navbarScroll.js', 'js/site_search.js']},
+    'demo': {'css': ['css/base.css', 'css/demo-page.css'], 'js': ['js/navbarScroll.js', 'js/demo_page.js']},
+    'blog': {'css': ['css/base.css', 'css/blog.css'], 'js': ['js/navbarScroll.js']},
+    'admin': {'css': ['css/admin.css'], 'js': ['js/admin_listing.js']},
+}
+
+# Selectors that style the first screen of a page (navbar and hero on the index page).
+# Rules mentioning any of them are inlined; the rest of the bundle loads without blocking render.
+CRITICAL_SELECTORS = {
+    'index': (r'\*', r'html', r'body', r':root', r'\.navbar', r'\.logo', r'\.list', r'\.dropdown[\w-]*',
+              r'#dropBtn', r'\.side', r'\.talk-to-expert', r'\.hero[\w-]*', r'picture\.responsive'),
+}
+
+
+# --- Minification ---
+# Deliberately conservative: whitespace and comments only, nothing that needs a real parser.
+
+# A '/' after one of these (or at the start) begins a regex literal; after anything else it divides
+_REGEX_AFTER_PUNCTUATION = set('(,=:[!&|?{};+-*%<>~^')
+_REGEX_AFTER_KEYWORDS = {'return', 'typeof', 'case', 'do', 'else', 'in', 'of', 'new', 'delete', 'void',
+                         'throw', 'instanceof', 'yield', 'await'}
+
+
+def _regex_allowed(out):
+    """Whether a '/' appended to `out` (the code kept so far) would start a regex literal."""
+    code = ''
+    for chunk in reversed(out):
+        code = (chunk + code).rstrip()
+        if len(code) > 12:  # enough for the longest keyword
+            break
+    if not code:
+        return True
+    if code[-1] in _REGEX_AFTER_PUNCTUATION:
+        return True
+    word = re.search(r'[A-Za-z_$][\w$]*$', code)
+    return word is not None and word.group() in _REGEX_AFTER_KEYWORDS
+
+
+def _regex_end(text, i):
+    """Index just past the regex literal starting at text[i] (its flags included)."""
+    j, n, in_class = i + 1, len(text), False
+    while j < n and text[j] != '\n':
+        c = text[j]
+        if c == '\\':
+            j += 2
+            continue
+        if c == '[':
+            in_class = True
+        elif c == ']':
+            in_class = False
+        elif c == '/' and not in_class:
+            j += 1
+            while j < n and (text[j].isalnum() or text[j] in '_$'):
+                j += 1
+            return j
+        j += 1
+    return j
+
+
+def _strip_comments(text, line_comments):
+    """
+    Removes /* */ (and // for JS) comments, leaving string and template
+    literals untouched, and in JS regex literals too: a '/' where an operand
+    is expected (judged by the code before it) starts a regex, not a comment.
+    """
+    out = []
+    i, n = 0, len(text)
+    while i < n:
+        c = text[i]
+        if c in '"\'`':
+            j = i + 1
+            while j < n and text[j] != c:
+                j += 2 if text[j] == '\\' else 1
+            out.append(text[i:j + 1])
+            i = j + 1
+        elif text.startswith('/*', i):
+            end = text.find('*/', i + 2)
+            i = n if end == -1 else end + 2
+            out.append(' ')
+        elif line_comments and text.startswith('//', i):
+            end = text.find('\n', i)
+            i = n if end == -1 else end
+        elif line_comments and c == '/' and _regex_allowed(out):
+            end = _regex_end(text, i)
+            out.append(text[i:end])
+            i = end
+        else:
+            out.append(c)
+            i += 1
+    return ''.join(out)
+
+
+def minify_css(text):
+    text = _strip_comments(text, line_comments=False)
+    text = re.sub(r'\s+', ' ', text)
+    # Spaces around these never matter; ':' and '+'/'-' are left alone (selectors, calc())
+    text = re.sub(r'\s*([{};,>])\s*', r'\1', text)
+    text = text.replace(';}', '}')
+    return text.strip()
+
+
+def minify_js(text):
+    # Keeps line breaks so automatic semicolon insertion behaves exactly as before
+    text = _strip_comments(text, line_comments=True)
+    lines = (line.strip() for line in text.splitlines())
+    return '\n'.join(line for line in lines if line)
+
+
+# --- Critical CSS ---
+
+def _blocks(css):
+    """Splits minified CSS into top-level (prelude, body) pairs."""
+    blocks, depth, start, prelude = [], 0, 0, None
+    for i, c in enumerate(css):
+        if c == '{':
+            if depth == 0:
+                prelude, start = css[start:i].strip(), i + 1
+            depth += 1
+        elif c == '}':
+            depth -= 1
+            if depth == 0:
+                blocks.append((prelude, css[start:i]))
+                start = i + 1
+    return blocks
+
+
+def extract_critical(css, selectors):
+    """The subset of (minified) CSS whose rules mention one of the given selector patterns."""
+    pattern = re.compile(r'(?<![\w-])(?:%s)(?![\w-])' % '|'.join(selectors))
+    kept, keyframes = [], {}
+    for prelude, body in _blocks(css):
+        if prelude.startswith('@media') or prelude.startswith('@supports'):
+            inner = extract_critical(body, selectors)
+            if inner:
+                kept.append(f"{prelude}{{{inner}}}")
+        elif prelude.startswith('@keyframes'):
+            keyframes[prelude.split()[-1]] = f"{prelude}{{{body}}}"
+        elif prelude.startswith('@font-face') or pattern.search(prelude):
+            kept.append(f"{prelude}{{{body}}}")
+    critical = ''.join(kept)
+    # Animations used above the fold need their keyframes too
+    for name, rule in keyframes.items():
+        if re.search(r'(?<![\w-])%s(?![\w-])' % re.escape(name), critical):
+            critical += rule
+    return critical
+
+
+# --- Build ---
+
+def _write_hashed(name, ext, data, written):
+    digest = hashlib.sha256(data.encode()).hexdigest()[:12]
+    if digest in written:
+        # Pages with identical bundles share one file, so browsers cache it once
+        return written[digest]
+    filename = written[digest] = f"{DIST_FOLDER}/{name}.{digest}.{ext}"
+    path = os.path.join(STATIC_ROOT, filename)
+    if not os.path.exists(path):
+        with open(path + '.tmp', 'w', encoding='utf-8') as out:
+            out.write(data)
+        os.replace(path + '.tmp', path)
+    return filename
+
+
+def bundle_data(kind, sources):
+    """The minified contents of one bundle: the source files under static/, in order."""
+    minify = minify_js if kind == 'js' else minify_css
+    parts = []
+    for source in sources:
+        with open(os.path.join(STATIC_ROOT, source), encoding='utf-8') as f:
+            parts.append(minify(f.read()))
+    # ';' keeps one script's last statement from running into the next one's first
+    return ('\n;\n' if kind == 'js' else '\n').join(parts)
+
+
+def build():
+    """
+    Writes every bundle to static/dist as <page>.<hash>.css/.js, plus .gz/.br
+    copies, and records them in static/dist/manifest.json. Bundles from earlier
+    builds are removed once the new manifest is in place.
+    """
+    from static_assets import precompress
+    os.makedirs(os.path.join(STATIC_ROOT, DIST_FOLDER), exist_ok=True)
+    manifest = {'bundles': {}, 'critical': {}}
+    written = {}
+    for page, kinds in BUNDLES.items():
+        manifest['bundles'][page] = {}
+        for kind, sources in kinds.items():
+            if not sources:
+                continue
+            data = bundle_data(kind, sources)
+            manifest['bundles'][page][kind] = _write_hashed(page, kind, data, written)
+            if kind == 'css' and page in CRITICAL_SELECTORS:
+                manifest['critical'][page] = extract_critical(data, CRITICAL_SELECTORS[page])
+
+    with open(MANIFEST_FILE + '.tmp', 'w', encoding='utf-8') as out:
+        json.dump(manifest, out, indent=1)
+    os.replace(MANIFEST_FILE + '.tmp', MANIFEST_FILE)
+
+    current = {f.split('/', 1)[1] for kinds in manifest['bundles'].values() for f in kinds.values()}
+    dist = os.path.join(STATIC_ROOT, DIST_FOLDER)
+    for name in os.listdir(dist):
+        base = name[:-3] if name.endswith(('.gz', '.br')) else name
+        if base != 'manifest.json' and base not in current:
+            os.remove(os.path.join(dist, name))
+    precompress(STATIC_ROOT, subdirs=(DIST_FOLDER,))
+    return manifest
+
+
+# --- Template helpers ---
+
+class AssetBundles:
+    """
+    Template side of the bundles: stylesheet_tags(page) and script_tags(page)
+    emit the built bundle from the manifest, inlining the page's critical CSS
+    and loading the full stylesheet without blocking render. In dev mode
+    (ASSET_DEV=1, or no manifest has been built) they emit the individual
+    source files instead, so edits show up on reload.
+    """
+
+    def __init__(self, app=None, dev=None):
+        self.dev = dev
+        self._manifest = None
+        self._manifest_mtime = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        if self.dev is None:
+            self.dev = os.getenv('ASSET_DEV', '0') == '1'
+        app.add_template_global(self.stylesheet_tags, 'stylesheet_tags')
+        app.add_template_global(self.script_tags, 'script_tags')
+
+    def manifest(self):
+        """The built manifest, reloaded when a rebuild replaces it; None in dev mode or before the first build."""
+        if self.dev:
+            return None
+        try:
+            mtime = os.stat(MANIFEST_FILE).st_mtime
+        except OSError:
+            return None
+        if mtime != self._manifest_mtime:
+            with self._lock:
+                with open(MANIFEST_FILE, encoding='utf-8') as f:
+                    self._manifest = json.load(f)
+                self._manifest_mtime = mtime
+        return self._manifest
+
+    def manifest_version(self):
+        """Changes whenever the tags would point at different files (a rebuild or a dev-mode switch)."""
+        self.manifest()
+        return None if self.dev else self._manifest_mtime
+
+    def stylesheet_tags(self, page):
+        manifest = self.manifest()
+        bundle = manifest and manifest['bundles'].get(page, {}).get('css')
+        if not bundle:
+            return Markup(''.join(
+                f'<link rel="stylesheet" href="{url_for("static", filename=source)}">' for source in BUNDLES[page]['css']
+            ))
+        href = url_for('static', filename=bundle)
+        critical = manifest['critical'].get(page)
+        if not critical:
+            return Markup(f'<link rel="stylesheet" href="{href}">')
+        return Markup(
+            f'<style>{critical}</style>'
+            f'<link rel="preload" as="style" href="{href}" onload="this.onload=null;this.rel=\'stylesheet\'">'
+            f'<noscript><link rel="stylesheet" href="{href}"></noscript>'
+        )
+
+    def script_tags(self, page):
+        manifest = self.manifest()
+        bundle = manifest and manifest['bundles'].get(page, {}).get('js')
+        sources = [bundle] if bundle else BUNDLES[page]['js']
+        return Markup(''.join(
+            f'<script src="{url_for("static", filename=source)}"></script>' for source in sources
+        ))
+
+
+if __name__ == '__main__':
+    built = build()
+    for page, files in built['bundles'].items():
+        print(f"{page}: {', '.join(files.values())}")
+    for page, css in built['critical'].items():
+        print(f"{page}: {len(css)} bytes of critical CSS inlined")
@@ -0,0 +1,14 @@
+"""
+Load tests for the public pages and forms against a scratch MySQL database.
+
+    python -m bench seed [--scale 0.1] [--volume contact_submissions=100000 ...]
+    python -m bench run [--requests 5000] [--concurrency 8] [--server] [--save-baseline]
+
+`seed` creates BENCH_DB_NAME (default DB_NAME + '_bench'), applies the
+migrations and fills it with synthetic rows (bench.synthetic). `run` replays a
+weighted mix of requests to /, /faqs, /blog/<id>, /demo,
+/api/booked_dates_times, /submit_contact and /book_demo (bench.traffic),
+with mail going to a local SMTP sink. It prints p50/p95/p99 latency and
+queries per request per route plus RSS. The run is then compared with
+bench/baseline.json, exiting 1 on a regression.
+"""
@@ -0,0 +1,151 @@
+import argparse
+import os
+import sys
+from datetime import datetime
+
+from dotenv import load_dotenv
+
+from bench import report, synthetic, traffic
+from bench.smtp_sink import SmtpSink
+
+load_dotenv()
+
+BENCH_DB_NAME = os.getenv('BENCH_DB_NAME') or f"{os.getenv('DB_NAME')}_bench"
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+TABLES = tuple(synthetic.DEFAULT_VOLUMES)
+
+
+def _volume(value):
+    table, _, rows = value.partition('=')
+    if table not in TABLES or not rows.isdigit():
+        raise argparse.ArgumentTypeError(f"expected TABLE=ROWS with TABLE one of {', '.join(TABLES)}")
+    return table, int(rows)
+
+
+def _positive(value):
+    if not value.isdigit() or int(value) < 1:
+        raise argparse.ArgumentTypeError(f"expected a whole number of at least 1, got {value!r}")
+    return int(value)
+
+
+def seed_command(args):
+    volumes = {table: max(1, int(rows * args.scale)) for table, rows in synthetic.DEFAULT_VOLUMES.items()}
+    volumes.update(dict(args.volume or ()))
+    import app_utils
+    with synthetic.scratch_database(keep=True) as name:
+        conn = app_utils.get_dedicated_connection()
+        try:
+            counts = synthetic.seed(conn, volumes)
+        finally:
+            conn.close()
+    print(f"Seeded {name}: " + ", ".join(f"{rows} {table}" for table, rows in counts.items()))
+
+
+def _table_sizes(conn):
+    cursor = conn.cursor()
+    sizes = {}
+    for table in TABLES:
+        cursor.execute(f"SELECT COUNT(*) FROM {table}")
+        sizes[table] = cursor.fetchone()[0]
+    cursor.execute("SELECT blog_id FROM Blogs")
+    blog_ids = [blog_id for (blog_id,) in cursor.fetchall()]
+    return sizes, blog_ids
+
+
+def run_command(args):
+    sink = SmtpSink().start()
+    # Mail goes to the sink, unauthenticated and without TLS, never to a real relay
+    os.environ.update({
+        'SMTP_SERVER': sink.address[0], 'SMTP_PORT': str(sink.address[1]), 'SMTP_USE_TLS': 'false',
+        'SMTP_USERNAME': 'bench@example.com', 'SMTP_PASSWORD': '', 'ADMIN_EMAIL': 'bench-admin@example.com',
+    })
+    # Queries per request come from the app's own instrumentation
+    os.environ['METRICS_ENABLED'] = 'true'
+    if args.no_page_cache:
+        os.environ['PAGE_CACHE_BACKEND'] = 'off'
+
+    rss_start = report.rss_mb()
+    import app_utils
+    conn = app_utils.get_dedicated_connection()
+    try:
+        sizes, blog_ids = _table_sizes(conn)
+    finally:
+        conn.close()
+    if not blog_ids:
+        sys.exit(f"{os.environ['DB_NAME']} has no blogs; run `python -m bench seed` first")
+
+    import app as site
+    traffic.report_queries(site.app, app_utils.request_metrics)
+    transport = (traffic.ServerTransport if args.server else traffic.TestClientTransport)(site.app)
+    workload = traffic.Workload(blog_ids, app_utils.DEMO_SLOTS)
+    try:
+        with report.RssSampler() as rss:
+            samples, seconds = traffic.run(transport, workload, args.requests, args.concurrency, args.warmup, args.seed)
+    finally:
+        transport.close()
+    app_utils.mail_dispatcher.wait_idle(timeout=30)
+
+    result = dict(
+        report.summarize(samples, seconds),
+        created=datetime.now().isoformat(timespec='seconds'),
+        settings={
+            'requests': args.requests,
+            'concurrency': args.concurrency,
+            'transport': transport.name,
+            'page_cache': os.getenv('PAGE_CACHE_BACKEND', 'memory'),
+            'volumes': sizes,
+        },
+        rss_mb={'start': rss_start, 'peak': rss.peak, 'end': report.rss_mb()},
+        mail_delivered=sink.messages,
+    )
+    sink.close()
+    report.print_report(result)
+
+    if args.save_baseline:
+        report.save_baseline(result, args.baseline)
+        print(f"Saved the baseline to {args.baseline}")
+        return
+    baseline = report.load_baseline(args.baseline)
+    if baseline is None:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to store this run as one.")
+        return
+    lines, regressed = report.compare(result, baseline, args.tolerance)
+    print(f"Compared with the baseline from {baseline['created']}:")
+    for line in lines or ["no differences beyond the tolerance"]:
+        print(f"  {line}")
+    if regressed:
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m bench', description="Synthetic data and load tests for the public and form routes.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    seed_parser = sub.add_parser('seed', help=f"create {BENCH_DB_NAME} and fill it with synthetic rows")
+    seed_parser.add_argument('--scale', type=float, default=1, help="multiply the default row counts")
+    seed_parser.add_argument('--volume', type=_volume, action='append', metavar='TABLE=ROWS',
+                             help="rows for one table, e.g. contact_submissions=100000 (repeatable)")
+    run_parser = sub.add_parser('run', help="replay mixed traffic against the seeded database and report")
+    run_parser.add_argument('--requests', type=_positive, default=2000, help="timed requests (default 2000)")
+    run_parser.add_argument('--concurrency', type=_positive, default=4, help="client threads (default 4)")
+    run_parser.add_argument('--warmup', type=int, default=200, help="untimed requests first (default 200)")
+    run_parser.add_argument('--seed', type=int, default=1, help="random seed for the request mix")
+    run_parser.add_argument('--server', action='store_true', help="go through a local HTTP server, not the test client")
+    run_parser.add_argument('--no-page-cache', action='store_true', help="render every page (PAGE_CACHE_BACKEND=off)")
+    run_parser.add_argument('--baseline', default=BASELINE_PATH, help="baseline file (default bench/baseline.json)")
+    run_parser.add_argument('--save-baseline', action='store_true', help="store this run as the baseline")
+    run_parser.add_argument('--tolerance', type=float, default=0.2,
+                            help="slowdown allowed before a percentile counts as a regression (default 0.2 = 20%%)")
+    args = parser.parse_args()
+
+    try:
+        synthetic.use_database(BENCH_DB_NAME)
+    except ValueError as e:
+        sys.exit(f"{e}; set BENCH_DB_NAME to a scratch database")
+    if args.command == 'seed':
+        seed_command(args)
+    else:
+        run_command(args)
+
+
+if __name__ == '__main__':
+    main()
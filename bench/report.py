@@ -0,0 +1,159 @@
+"""Latency percentiles, queries per request and memory for a benchmark run, and the comparison with a stored baseline."""
+import json
+import math
+import os
+import threading
+
+# Regressions smaller than this are noise on a developer machine, whatever the percentage
+MIN_LATENCY_REGRESSION_MS = 2.0
+# Cached pages only query when their cache entry is rebuilt, so the average wanders a little between runs
+MIN_QUERIES_CHANGE = 0.1
+
+
+def percentile(values, p):
+    """Nearest-rank percentile of an already sorted list."""
+    if not values:
+        return None
+    return values[max(0, math.ceil(p / 100 * len(values)) - 1)]
+
+
+def _ms(value):
+    return None if value is None else round(value, 2)
+
+
+def _stats(samples):
+    latencies = sorted(seconds * 1000 for _, seconds, _, _ in samples)
+    queries = [q for _, _, _, q in samples if q is not None]
+    return {
+        'requests': len(samples),
+        'errors': sum(1 for _, _, status, _ in samples if status is None or status >= 500),
+        'p50_ms': _ms(percentile(latencies, 50)),
+        'p95_ms': _ms(percentile(latencies, 95)),
+        'p99_ms': _ms(percentile(latencies, 99)),
+        'max_ms': _ms(latencies[-1] if latencies else None),
+        'queries_per_request': round(sum(queries) / len(queries), 2) if queries else None,
+    }
+
+
+def summarize(samples, seconds):
+    routes = {}
+    for sample in samples:
+        routes.setdefault(sample[0], []).append(sample)
+    return {
+        'overall': dict(_stats(samples), requests_per_second=round(len(samples) / seconds, 1)),
+        'routes': {route: _stats(route_samples) for route, route_samples in sorted(routes.items())},
+    }
+
+
+def rss_mb():
+    """Resident set size of this process in MB, or None where /proc is not available."""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return round(pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024), 1)
+
+
+class RssSampler:
+    """Samples rss_mb() on a background thread while the load runs and keeps the highest reading."""
+
+    def __init__(self, interval=0.1):
+        self.interval = interval
+        self.peak = rss_mb()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, name="bench-rss", daemon=True)
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            current = rss_mb()
+            if current is not None:
+                self.peak = max(self.peak or 0, current)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(result, path):
+    with open(path, 'w') as f:
+        json.dump(result, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def _change(now, before):
+    """' (+12%)' for the relative change, or '' when the baseline is zero and there is no ratio."""
+    return f" ({(now / before - 1) * 100:+.0f}%)" if before else ""
+
+
+def compare(result, baseline, tolerance):
+    """
+    Lines describing how `result` differs from `baseline`, and whether any of
+    them is a regression: a latency percentile more than `tolerance` (a
+    fraction) and MIN_LATENCY_REGRESSION_MS slower, more than
+    MIN_QUERIES_CHANGE extra queries per request, a higher error rate, or
+    peak RSS more than `tolerance` higher.
+    """
+    lines = []
+    regressed = False
+    for key in ('requests', 'concurrency', 'transport', 'page_cache', 'volumes'):
+        if result['settings'].get(key) != baseline['settings'].get(key):
+            lines.append(f"note: {key} differs from the baseline ({baseline['settings'].get(key)} -> "
+                         f"{result['settings'].get(key)}); numbers may not be comparable")
+
+    for route, stats in result['routes'].items():
+        base = baseline['routes'].get(route)
+        if base is None:
+            lines.append(f"{route}: not in the baseline")
+            continue
+        for key in ('p50_ms', 'p95_ms', 'p99_ms'):
+            now, before = stats[key], base[key]
+            if now is None or before is None:
+                continue
+            if now > before * (1 + tolerance) and now - before > MIN_LATENCY_REGRESSION_MS:
+                regressed = True
+                lines.append(f"REGRESSION {route} {key}: {before} -> {now}{_change(now, before)}")
+            elif now < before / (1 + tolerance) and before - now > MIN_LATENCY_REGRESSION_MS:
+                lines.append(f"improved   {route} {key}: {before} -> {now}{_change(now, before)}")
+        now, before = stats['queries_per_request'], base['queries_per_request']
+        if now is not None and before is not None and abs(now - before) > MIN_QUERIES_CHANGE:
+            regressed = regressed or now > before
+            lines.append(f"{'REGRESSION' if now > before else 'improved  '} {route} queries/request: {before} -> {now}")
+        # Rates, since the random mix sends a slightly different number of requests to each route
+        now, before = stats['errors'] / max(stats['requests'], 1), base['errors'] / max(base['requests'], 1)
+        if now > before:
+            regressed = True
+            lines.append(f"REGRESSION {route} errors: {before:.1%} -> {now:.1%} of requests")
+
+    now, before = result['rss_mb']['peak'], baseline['rss_mb']['peak']
+    if now is not None and before is not None and now > before * (1 + tolerance):
+        regressed = True
+        lines.append(f"REGRESSION peak RSS: {before} MB -> {now} MB")
+    return lines, regressed
+
+
+def print_report(result):
+    settings = result['settings']
+    print(f"{settings['requests']} requests, concurrency {settings['concurrency']}, {settings['transport']}, "
+          f"page cache {settings['page_cache']}")
+    print(f"{'route':28s} {'requests':>8s} {'errors':>6s} {'p50 ms':>8s} {'p95 ms':>8s} {'p99 ms':>8s} {'queries':>8s}")
+    def cell(value):
+        return f"{'n/a' if value is None else f'{value:.2f}':>8s}"
+
+    for route, stats in list(result['routes'].items()) + [('all', result['overall'])]:
+        print(f"{route:28s} {stats['requests']:8d} {stats['errors']:6d} {cell(stats['p50_ms'])} {cell(stats['p95_ms'])} "
+              f"{cell(stats['p99_ms'])} {cell(stats['queries_per_request'])}")
+    rss = result['rss_mb']
+    print(f"{result['overall']['requests_per_second']} requests/s; RSS {rss['start']} MB at start, "
+          f"{rss['peak']} MB peak, {rss['end']} MB at end; {result['mail_delivered']} emails delivered to the SMTP sink")
@@ -0,0 +1,78 @@
+"""A local SMTP server that accepts every message and throws it away, counting what it got."""
+import socketserver
+import threading
+
+
+class _Session(socketserver.StreamRequestHandler):
+    def _reply(self, line):
+        self.wfile.write(line.encode('ascii') + b'\r\n')
+
+    def handle(self):
+        self._reply('220 bench SMTP sink')
+        for raw in self.rfile:
+            command = raw[:4].upper()
+            if command == b'EHLO':
+                self._reply('250 bench')
+            elif command == b'DATA':
+                self._reply('354 End data with <CR><LF>.<CR><LF>')
+                for line in self.rfile:
+                    if line in (b'.\r\n', b'.\n'):
+                        break
+                if self.server.sink.accept():
+                    self._reply('250 OK')
+                else:
+                    self._reply('451 Try again later')
+            elif command == b'QUIT':
+                self._reply('221 Bye')
+                return
+            elif command in (b'HELO', b'MAIL', b'RCPT', b'RSET', b'NOOP'):
+                self._reply('250 OK')
+            else:
+                self._reply('502 Command not implemented')
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class SmtpSink:
+    """
+    Plain SMTP (no TLS, no AUTH) on 127.0.0.1; port 0 picks a free one.
+    Point SMTP_SERVER/SMTP_PORT at `address`, with SMTP_USE_TLS=false and no
+    SMTP_PASSWORD, and the app's mail workers deliver here. Setting `reject`
+    to N refuses the next N messages with a temporary 451 error, for testing
+    retries.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0):
+        self._server = _Server((host, port), _Session)
+        self._server.sink = self
+        self._lock = threading.Lock()
+        self.messages = 0
+        self.rejected = 0
+        self.reject = 0
+        self._thread = None
+
+    @property
+    def address(self):
+        return self._server.server_address
+
+    def accept(self):
+        """Counts one message as delivered, or as rejected while `reject` is above zero; True if delivered."""
+        with self._lock:
+            if self.reject > 0:
+                self.reject -= 1
+                self.rejected += 1
+                return False
+            self.messages += 1
+            return True
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="smtp-sink", daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,165 @@
+"""
+Synthetic rows for the benchmark and query_audit.py.
+
+The section tables get their single row from the migrations; seed() fills
+the tables that grow with traffic and content. Everything runs against a
+scratch database so the live one is never touched:
+
+    use_database('fortifund_bench')      # before app_utils is imported
+    with scratch_database():
+        seed(app_utils.get_dedicated_connection(), {'contact_submissions': 100000})
+"""
+import os
+import random
+import sys
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import mysql.connector
+
+# Rows per table when no volume is given
+DEFAULT_VOLUMES = {
+    'Images': 2000,
+    'Blogs': 10000,
+    'faqs': 300,
+    'contact_submissions': 100000,
+    'demo_bookings': 1800,  # about a year of weekdays with every demo slot taken
+    'email_outbox': 20000,
+}
+BATCH_SIZE = 1000
+# Share of the bookings that are still to come, so availability has busy days to show
+UPCOMING_BOOKINGS = 0.1
+
+
+def use_database(name):
+    """
+    Points the app at `name` instead of DB_NAME. app_utils reads the setting
+    when it is imported, so this has to run first.
+    """
+    if 'app_utils' in sys.modules:
+        raise RuntimeError("use_database() must be called before app_utils is imported")
+    live = os.getenv('DB_NAME')
+    if name == live:
+        raise ValueError(f"Refusing to use the live database {live!r}: it would be dropped and refilled")
+    os.environ['DB_NAME'] = name
+
+
+def _server_execute(statement):
+    conn = mysql.connector.connect(host=os.getenv('DB_HOST'), user=os.getenv('DB_USER'), password=os.getenv('DB_PASSWORD'))
+    try:
+        conn.cursor().execute(statement)
+    finally:
+        conn.close()
+
+
+@contextmanager
+def scratch_database(keep=False):
+    """Creates the database set by use_database() from scratch, migrated, and drops it afterwards unless keep."""
+    import migrate
+    name = os.environ['DB_NAME']
+    _server_execute(f"DROP DATABASE IF EXISTS {name}")
+    _server_execute(f"CREATE DATABASE {name}")
+    try:
+        # Nothing else is using it, so a locking ALTER costs nothing
+        migrate.upgrade(allow_locking=True)
+        yield name
+    finally:
+        if not keep:
+            _server_execute(f"DROP DATABASE IF EXISTS {name}")
+
+
+def _insert(cursor, table, columns, rows):
+    statement = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+    for start in range(0, len(rows), BATCH_SIZE):
+        cursor.executemany(statement, rows[start:start + BATCH_SIZE])
+
+
+def _booking_slots(count, now):
+    """`count` distinct demo slot times on weekdays, the last UPCOMING_BOOKINGS of them from tomorrow on."""
+    from app_utils import DEMO_SLOTS
+    upcoming = int(count * UPCOMING_BOOKINGS)
+    slots = []
+    day = now.date() + timedelta(days=1)
+    # Walk back from tomorrow far enough for the past bookings, then forward for the upcoming ones
+    for step, wanted in ((-1, count - upcoming), (1, upcoming)):
+        taken = 0
+        current = day if step == 1 else day - timedelta(days=1)
+        while taken < wanted:
+            if current.weekday() < 5:
+                for slot in DEMO_SLOTS[:wanted - taken]:
+                    slots.append(datetime.combine(current, datetime.strptime(slot, '%H:%M').time()))
+                    taken += 1
+            current += timedelta(days=step)
+    return slots
+
+
+def seed(conn, volumes=None, rng=None):
+    """
+    Inserts synthetic Images, Blogs, faqs, contact_submissions, demo_bookings
+    and email_outbox rows - `volumes` per table, DEFAULT_VOLUMES for the rest -
+    and ANALYZEs the tables so query plans match a real database of that size.
+    Returns the number of rows inserted per table.
+    """
+    import blog_renderer
+    rng = rng or random.Random(40)
+    count = dict(DEFAULT_VOLUMES, **(volumes or {}))
+    now = datetime.now().replace(second=0, microsecond=0)
+    today = now.date()
+    cursor = conn.cursor()
+
+    _insert(cursor, 'Images', ('image_filename', 'alt_text', 'ref_count'), [
+        (f"{i:032x}.jpg", f"Synthetic image {i}", 1) for i in range(count['Images'])
+    ])
+    cursor.execute("SELECT image_id FROM Images")
+    image_ids = [image_id for (image_id,) in cursor.fetchall()]
+
+    # Stored already rendered, as submit_blog would, so nothing is re-rendered on first view
+    body = "\n\n".join(
+        f"## Section {n}\n\nFund administrators reconcile capital calls, distributions and investor "
+        f"reporting across portfolios. Paragraph {n} of a synthetic post." for n in range(1, 6)
+    )
+    rendered = blog_renderer.rendered_values(body)
+    _insert(cursor, 'Blogs', ('heading', 'subheading', 'author', 'publish_date', 'content', 'content_html',
+                              'content_toc', 'reading_minutes', 'excerpt', 'renderer_version', 'thumbnail_image_id'), [
+        (f"Synthetic post {i}", "A subheading", f"Author {i % 7}", today - timedelta(days=rng.randrange(3000)),
+         body, *rendered, rng.choice(image_ids) if image_ids and rng.random() < 0.8 else None)
+        for i in range(count['Blogs'])
+    ])
+
+    categories = [f"Category {n}" for n in range(12)]
+    _insert(cursor, 'faqs', ('category', 'question', 'answer'), [
+        (rng.choice(categories), f"Synthetic question {i}?", f"Synthetic answer {i}.") for i in range(count['faqs'])
+    ])
+
+    _insert(cursor, 'contact_submissions', ('first_name', 'last_name', 'job_title', 'company_name', 'phone_number',
+                                            'email', 'industry', 'num_employees', 'additional_details', 'submission_date'), [
+        ("Lead", str(i), "Partner", f"Fund {i % 900}", "555-0100", f"lead{i}@example.com", "Private equity", "50",
+         "Synthetic enquiry", now - timedelta(minutes=rng.randrange(3 * 365 * 24 * 60)))
+        for i in range(count['contact_submissions'])
+    ])
+
+    bookings = []
+    for i, meeting_at in enumerate(_booking_slots(count['demo_bookings'], now)):
+        bookings.append((f"Firm {i}", "Fund", f"Person {i}", "CFO", f"booking{i}@example.com", "10-50",
+                         meeting_at.date(), meeting_at.strftime('%H:%M'), meeting_at, "https://meet.jit.si/synthetic",
+                         meeting_at - timedelta(minutes=10) if meeting_at < now else None,
+                         meeting_at - timedelta(days=rng.randrange(1, 30))))
+    _insert(cursor, 'demo_bookings', ('firm_name', 'company_type', 'person_name', 'title', 'email', 'team_size',
+                                      'meeting_date', 'meeting_time', 'meeting_at', 'meeting_link', 'link_sent_at',
+                                      'created_at'), bookings)
+
+    outbox = []
+    for i in range(count['email_outbox']):
+        status = rng.choices(('sent', 'failed', 'pending'), (97, 2, 1))[0]
+        queued = now - timedelta(minutes=rng.randrange(365 * 24 * 60))
+        outbox.append((f"lead{i}@example.com", "Synthetic message", "Body", status, 1, queued,
+                       queued if status == 'sent' else None))
+    _insert(cursor, 'email_outbox', ('to_email', 'subject', 'body', 'status', 'attempts', 'next_attempt_at', 'sent_at'),
+            outbox)
+    conn.commit()
+
+    for table in count:
+        cursor.execute(f"ANALYZE TABLE {table}")
+        cursor.fetchall()
+    cursor.close()
+    return count
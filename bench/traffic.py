@@ -0,0 +1,178 @@
+"""Mixed public traffic, sent through the Flask test client or a local HTTP server and timed per request."""
+import http.client
+import itertools
+import random
+import threading
+import time
+from datetime import date, timedelta
+from urllib.parse import urlencode
+
+# Route: share of requests. Roughly what the access logs show: mostly the home
+# page and blog posts, with a small share of form posts.
+MIX = {
+    '/': 30,
+    '/faqs': 10,
+    '/blog/<id>': 30,
+    '/demo': 10,
+    '/api/booked_dates_times': 12,
+    '/submit_contact': 5,
+    '/book_demo': 3,
+}
+QUERY_HEADER = 'X-Bench-Queries'
+
+
+def report_queries(app, metrics):
+    """
+    Returns the number of statements each request ran, as counted by
+    request_metrics, in the X-Bench-Queries response header. Statements from
+    background threads (mail workers, scheduler jobs) are not counted.
+    """
+    @app.after_request
+    def add_query_header(response):
+        timings = metrics.current()
+        response.headers[QUERY_HEADER] = str(timings.queries if timings is not None else 0)
+        return response
+
+
+class Workload:
+    """
+    Picks the next request of the mix. Form posts get a fresh email and, for
+    demos, a slot no other request has taken: weekdays from `first_day` on,
+    past anything the seeded bookings use.
+    """
+
+    def __init__(self, blog_ids, slots, mix=MIX, first_day=None):
+        self.blog_ids = blog_ids
+        self.routes = list(mix)
+        self.weights = [mix[route] for route in self.routes]
+        self._serial = itertools.count()
+        self._slots = self._free_slots(first_day or date.today() + timedelta(days=3 * 365), slots)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _free_slots(day, slots):
+        while True:
+            if day.weekday() < 5:
+                for slot in slots:
+                    yield day, slot
+            day += timedelta(days=1)
+
+    def next(self, rng):
+        """(route, method, path, form) for one request."""
+        route = rng.choices(self.routes, self.weights)[0]
+        n = next(self._serial)
+        if route == '/blog/<id>':
+            return route, 'GET', f"/blog/{rng.choice(self.blog_ids)}", None
+        if route == '/submit_contact':
+            return route, 'POST', route, {
+                'first_name': 'Bench', 'last_name': str(n), 'job_title': 'CFO', 'company_name': f"Bench Fund {n}",
+                'phone_number': '555-0100', 'email': f"bench-{n}-{time.time_ns()}@example.com", 'industry': 'Venture',
+                'num_employees': '25', 'additional_details': 'Load test submission',
+            }
+        if route == '/book_demo':
+            with self._lock:
+                day, slot = next(self._slots)
+            return route, 'POST', route, {
+                'firm_name': f"Bench Fund {n}", 'company_type': 'Fund', 'person_name': 'Bench', 'title': 'CFO',
+                'email': f"bench-demo-{n}@example.com", 'team_size': '10-50',
+                'meeting_date': day.isoformat(), 'meeting_time': slot,
+            }
+        return route, 'GET', route, None
+
+
+class TestClientTransport:
+    """Requests go straight to the WSGI app in this process; one test client per thread."""
+
+    name = 'test-client'
+
+    def __init__(self, app):
+        self._app = app
+        self._local = threading.local()
+
+    def send(self, method, path, form=None):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self._app.test_client()
+        response = client.open(path, method=method, data=form)
+        response.get_data()
+        return response.status_code, response.headers.get(QUERY_HEADER)
+
+    def close(self):
+        pass
+
+
+class ServerTransport:
+    """
+    Serves the app on a threaded Werkzeug server on 127.0.0.1 and sends real
+    HTTP requests to it, so sockets, headers and the server's own threading
+    are part of the timing.
+    """
+
+    name = 'local-server'
+
+    def __init__(self, app):
+        from werkzeug.serving import make_server
+        self._server = make_server('127.0.0.1', 0, app, threaded=True)
+        self._thread = threading.Thread(target=self._server.serve_forever, name="bench-server", daemon=True)
+        self._thread.start()
+        self._local = threading.local()
+
+    def send(self, method, path, form=None):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = http.client.HTTPConnection(self._server.host, self._server.port, timeout=30)
+        body = urlencode(form) if form else None
+        headers = {'Content-Type': 'application/x-www-form-urlencoded'} if form else {}
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+        except (http.client.HTTPException, OSError):
+            # The server closed the previous keep-alive connection; retry on a fresh one
+            conn.close()
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+        response.read()
+        return response.status, response.getheader(QUERY_HEADER)
+
+    def close(self):
+        self._server.shutdown()
+
+
+def run(transport, workload, requests, concurrency=4, warmup=0, seed=1):
+    """
+    Sends `warmup` untimed requests, then `requests` timed ones spread over
+    `concurrency` threads. Returns (samples, seconds): one (route, seconds,
+    status, queries) per timed request, status None when it raised.
+    """
+    samples = []
+    lock = threading.Lock()
+
+    def worker(index, counter, total, record):
+        rng = random.Random(seed * 1000 + index)
+        while next(counter) < total:
+            route, method, path, form = workload.next(rng)
+            started = time.perf_counter()
+            try:
+                status, queries = transport.send(method, path, form)
+            except Exception as e:
+                print(f"{method} {path} failed: {e}")
+                status, queries = None, None
+            elapsed = time.perf_counter() - started
+            if record:
+                with lock:
+                    samples.append((route, elapsed, status, int(queries) if queries is not None else None))
+
+    def phase(total, record):
+        counter = itertools.count()
+        threads = [threading.Thread(target=worker, args=(i, counter, total, record), name=f"bench-{i}")
+                   for i in range(concurrency)]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return time.perf_counter() - started
+
+    if warmup:
+        phase(warmup, record=False)
+    return samples, phase(requests, record=True)
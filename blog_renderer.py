@@ -0,0 +1,309 @@
+import html
+import math
+import re
+from html.parser import HTMLParser
+
+# Bump whenever render() output changes; rows rendered by an older version are rebuilt by rebuild()
+RENDERER_VERSION = 1
+
+WORDS_PER_MINUTE = 200
+EXCERPT_LENGTH = 220
+TOC_MIN_HEADINGS = 2    # a table of contents for a single heading is just noise
+
+ALLOWED_TAGS = {
+    'p', 'br', 'hr', 'h2', 'h3', 'h4', 'h5', 'h6', 'strong', 'b', 'em', 'i', 'u', 's', 'sub', 'sup', 'mark',
+    'small', 'span', 'div', 'blockquote', 'pre', 'code', 'ul', 'ol', 'li', 'a', 'img', 'figure', 'figcaption',
+    'table', 'thead', 'tbody', 'tr', 'th', 'td',
+}
+ALLOWED_ATTRIBUTES = {
+    'a': {'href', 'title'},
+    'img': {'src', 'alt', 'title', 'width', 'height'},
+    'th': {'colspan', 'rowspan'},
+    'td': {'colspan', 'rowspan'},
+}
+URL_ATTRIBUTES = {'href', 'src'}
+SAFE_SCHEMES = ('http', 'https', 'mailto', 'tel')
+VOID_TAGS = {'br', 'hr', 'img'}
+# Dropped together with everything inside them
+DROP_CONTENT_TAGS = {'script', 'style', 'iframe', 'object', 'embed', 'template', 'noscript', 'textarea', 'select', 'svg', 'math'}
+# The page title is the <h1>, so headings in the body start at <h2>
+RENAMED_TAGS = {'h1': 'h2'}
+TOC_TAGS = ('h2', 'h3')
+HEADING_TAGS = {'h2', 'h3', 'h4', 'h5', 'h6'}
+# Separate words in the extracted text
+BLOCK_TAGS = HEADING_TAGS | {'p', 'div', 'li', 'blockquote', 'pre', 'tr', 'td', 'th', 'figcaption'}
+
+_ORDERED_ITEM = re.compile(r'\d+[.)]\s+')
+_HTML_BLOCK = re.compile(r'<\s*(p|div|br|h[1-6]|ul|ol|li|table|blockquote|pre|img|a)\b', re.IGNORECASE)
+
+
+def _safe_url(url):
+    url = (url or '').strip()
+    # Browsers ignore control characters and whitespace inside a scheme ('java\tscript:')
+    compact = re.sub(r'[\x00-\x20]+', '', url).lower()
+    scheme = re.match(r'([a-z][a-z0-9+.-]*):', compact)
+    if scheme and scheme.group(1) not in SAFE_SCHEMES:
+        return None
+    return url
+
+
+def slugify(text):
+    return re.sub(r'[^\w]+', '-', text.lower()).strip('-')[:60] or 'section'
+
+
+# --- Plain text -> HTML ---
+# Blog bodies typed into the admin textarea without any markup get a small
+# Markdown subset: blank-line paragraphs, '#' headings, '-'/'1.' lists,
+# '>' quotes, **bold**, *italic*, `code` and [links](url).
+
+def _inline(text):
+    text = html.escape(text, quote=True)
+    text = re.sub(r'`([^`]+)`', r'<code>\1</code>', text)
+    text = re.sub(r'\*\*(.+?)\*\*', r'<strong>\1</strong>', text)
+    text = re.sub(r'(?<![\w*])\*(?!\s)(.+?)(?<!\s)\*(?![\w*])', r'<em>\1</em>', text)
+    text = re.sub(r'\[([^\]]+)\]\(([^)\s]+)\)', r'<a href="\2">\1</a>', text)
+    return text
+
+
+def text_to_html(text):
+    blocks = re.split(r'\n\s*\n', text.replace('\r\n', '\n').strip())
+    out = []
+    for block in blocks:
+        lines = [line.strip() for line in block.strip().split('\n')]
+        if not lines or not lines[0]:
+            continue
+        heading = re.match(r'(#{1,6})\s+(.*)', lines[0])
+        if heading and len(lines) == 1:
+            level = min(len(heading.group(1)) + 1, 6)
+            out.append(f'<h{level}>{_inline(heading.group(2))}</h{level}>')
+        elif all(re.match(r'[-*]\s+', line) for line in lines):
+            items = ''.join(f'<li>{_inline(line[1:].strip())}</li>' for line in lines)
+            out.append(f'<ul>{items}</ul>')
+        elif all(_ORDERED_ITEM.match(line) for line in lines):
+            items = ''.join(f'<li>{_inline(_ORDERED_ITEM.sub("", line))}</li>' for line in lines)
+            out.append(f'<ol>{items}</ol>')
+        elif all(line.startswith('>') for line in lines):
+            out.append(f'<blockquote><p>{"<br>".join(_inline(line[1:].strip()) for line in lines)}</p></blockquote>')
+        else:
+            out.append(f'<p>{"<br>".join(_inline(line) for line in lines)}</p>')
+    return '\n'.join(out)
+
+
+# --- Sanitizer ---
+
+class _Sanitizer(HTMLParser):
+    """
+    Re-emits allow-listed tags and attributes only, with text escaped, unsafe
+    URLs removed and every open tag closed. <h2>/<h3> get unique ids and are
+    collected for the table of contents.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.out = []
+        self.text = []
+        self.prose = []        # text outside headings, for the excerpt
+        self.headings = []     # (tag, id, text)
+        self._open = []
+        self._skip = 0
+        self._heading = None   # (index of the start tag in out, tag, text parts)
+        self._ids = set()
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROP_CONTENT_TAGS:
+            if tag not in VOID_TAGS:
+                self._skip += 1
+            return
+        tag = RENAMED_TAGS.get(tag, tag)
+        if self._skip or tag not in ALLOWED_TAGS:
+            return
+        kept = []
+        for name, value in attrs:
+            if name not in ALLOWED_ATTRIBUTES.get(tag, ()) or value is None:
+                continue
+            if name in URL_ATTRIBUTES:
+                value = _safe_url(value)
+                if value is None:
+                    continue
+            kept.append((name, value))
+        if tag == 'a' and any(name == 'href' and re.match(r'https?://', value, re.I) for name, value in kept):
+            kept.append(('rel', 'noopener nofollow'))
+        if tag == 'img':
+            kept.append(('loading', 'lazy'))
+        rendered = ''.join(f' {name}="{html.escape(value, quote=True)}"' for name, value in kept)
+        if tag in VOID_TAGS:
+            self.out.append(f'<{tag}{rendered}>')
+            self.text.append(' ')
+            self.prose.append(' ')
+            return
+        if tag in BLOCK_TAGS:
+            self.text.append(' ')
+            self.prose.append(' ')
+        if tag in TOC_TAGS and self._heading is None:
+            self._heading = (len(self.out), tag, [])
+        self.out.append(f'<{tag}{rendered}>')
+        self._open.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS and tag not in DROP_CONTENT_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in DROP_CONTENT_TAGS:
+            self._skip = max(self._skip - 1, 0)
+            return
+        tag = RENAMED_TAGS.get(tag, tag)
+        if self._skip or tag not in self._open:
+            return
+        while self._open:
+            current = self._open.pop()
+            self.out.append(f'</{current}>')
+            if self._heading and current == self._heading[1]:
+                self._close_heading()
+            if current == tag:
+                break
+        if tag in BLOCK_TAGS:
+            self.text.append(' ')
+            self.prose.append(' ')
+
+    def _close_heading(self):
+        index, tag, parts = self._heading
+        self._heading = None
+        title = re.sub(r'\s+', ' ', ''.join(parts)).strip()
+        if not title:
+            return
+        anchor = base = slugify(title)
+        n = 2
+        while anchor in self._ids:
+            anchor, n = f'{base}-{n}', n + 1
+        self._ids.add(anchor)
+        self.out[index] = self.out[index][:-1] + f' id="{anchor}">'
+        self.headings.append((tag, anchor, title))
+
+    def handle_data(self, data):
+        if self._skip:
+            return
+        self.out.append(html.escape(data, quote=False))
+        self.text.append(data)
+        if self._heading:
+            self._heading[2].append(data)
+        elif not any(tag in HEADING_TAGS for tag in self._open):
+            self.prose.append(data)
+
+    def close(self):
+        super().close()
+        while self._open:
+            self.handle_endtag(self._open[-1])
+
+
+def _squash(parts):
+    return re.sub(r'\s+', ' ', ''.join(parts)).strip()
+
+
+def sanitize(markup):
+    """(safe HTML, plain text, plain text outside headings, headings) for untrusted HTML."""
+    parser = _Sanitizer()
+    parser.feed(markup)
+    parser.close()
+    return ''.join(parser.out), _squash(parser.text), _squash(parser.prose), parser.headings
+
+
+def _toc(headings):
+    if len(headings) < TOC_MIN_HEADINGS:
+        return ''
+    items = ''.join(
+        f'<li class="toc-{tag}"><a href="#{anchor}">{html.escape(title)}</a></li>' for tag, anchor, title in headings
+    )
+    return f'<nav class="blog-toc" aria-label="Contents"><ul>{items}</ul></nav>'
+
+
+def _excerpt(text, length=EXCERPT_LENGTH):
+    if len(text) <= length:
+        return text
+    cut = text[:length]
+    if ' ' in cut:
+        cut = cut[:cut.rfind(' ')]
+    return cut.rstrip(' ,;:.-') + '…'
+
+
+def render(content):
+    """
+    Everything a blog page needs from Blogs.content, computed once at save
+    time: {'html', 'toc', 'reading_minutes', 'excerpt', 'version'}. Content
+    with HTML block markup is taken as HTML, anything else as plain text with
+    the small Markdown subset above; either way the result is sanitized.
+    """
+    content = content or ''
+    markup = content if _HTML_BLOCK.search(content) else text_to_html(content)
+    safe_html, text, prose, headings = sanitize(markup)
+    words = len(text.split())
+    return {
+        'html': safe_html,
+        'toc': _toc(headings),
+        'reading_minutes': max(1, math.ceil(words / WORDS_PER_MINUTE)) if words else 0,
+        'excerpt': _excerpt(prose),
+        'version': RENDERER_VERSION,
+    }
+
+
+# --- Storage ---
+
+def _values(rendered):
+    return rendered['html'], rendered['toc'], rendered['reading_minutes'], rendered['excerpt'], rendered['version']
+
+
+def rendered_values(content):
+    """(content_html, content_toc, reading_minutes, excerpt, renderer_version) for INSERT/UPDATE parameters."""
+    return _values(render(content))
+
+
+def store(cursor, blog_id, content):
+    """Renders one blog's content into its row (the caller commits) and returns render()'s result."""
+    rendered = render(content)
+    cursor.execute("""
+        UPDATE Blogs SET content_html = %s, content_toc = %s, reading_minutes = %s, excerpt = %s, renderer_version = %s
+        WHERE blog_id = %s
+    """, (*_values(rendered), blog_id))
+    return rendered
+
+
+def rebuild(everything=False, batch_size=100):
+    """
+    Re-renders blogs stored by an older renderer (or never rendered, e.g.
+    rows from before these columns existed); everything=True re-renders all.
+    Returns the number of blogs rendered.
+    """
+    from app_utils import get_db_connection, bump_content_version
+    conn = get_db_connection()
+    rendered = 0
+    try:
+        cursor = conn.cursor()
+        last_id = 0
+        while True:
+            cursor.execute(f"""
+                SELECT blog_id, content FROM Blogs
+                WHERE blog_id > %s {'' if everything else 'AND renderer_version < %s'}
+                ORDER BY blog_id LIMIT %s
+            """, (last_id, batch_size) if everything else (last_id, RENDERER_VERSION, batch_size))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            for blog_id, content in rows:
+                store(cursor, blog_id, content)
+            conn.commit()
+            rendered += len(rows)
+            last_id = rows[-1][0]
+    finally:
+        conn.close()
+    if rendered:
+        bump_content_version()
+    return rendered
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Render blog bodies into Blogs.content_html and friends.")
+    parser.add_argument('--all', action='store_true', help="re-render every blog, not just outdated ones")
+    args = parser.parse_args()
+    print(f"{rebuild(everything=args.all)} blogs rendered (renderer version {RENDERER_VERSION})")
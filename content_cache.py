@@ -0,0 +1,90 @@
+import threading
+import time
+
+
+class VersionedCache:
+    """
+    Small in-process cache for page content that only changes on admin writes.
+
+    Every entry remembers the content version it was built for. Admin write
+    paths call bump() after committing, which makes every entry stale at once;
+    the next reader rebuilds it and everyone else keeps being served from memory.
+    The TTL is a fallback for changes made outside this process (another worker,
+    a manual SQL edit) which cannot bump our version.
+    """
+
+    def __init__(self, ttl=300.0):
+        self.ttl = ttl
+        self._version = 0
+        self._entries = {}  # key -> (version, built_at, value)
+        self._lock = threading.Lock()
+        self._build_locks = {}  # key -> [lock, threads using it]; dropped when the last one is done
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def version(self):
+        return self._version
+
+    def bump(self):
+        """Invalidates everything; call after any write that changes public content."""
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+            return self._version
+
+    def _fresh(self, entry):
+        version, built_at, _ = entry
+        return version == self._version and time.monotonic() - built_at < self.ttl
+
+    def get_or_build(self, key, builder):
+        """Returns the cached value for key, calling builder() once if it is missing or stale."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and self._fresh(entry):
+                self._hits += 1
+                return entry[2]
+            build_lock = self._build_locks.get(key)
+            if build_lock is None:
+                build_lock = self._build_locks[key] = [threading.Lock(), 0]
+            build_lock[1] += 1
+
+        try:
+            return self._build(key, builder, build_lock[0])
+        finally:
+            # Keys can come from query strings, so locks must not outlive their builds
+            with self._lock:
+                build_lock[1] -= 1
+                if build_lock[1] == 0:
+                    del self._build_locks[key]
+
+    def _build(self, key, builder, build_lock):
+        # Only one thread rebuilds a given key; the others wait and reuse its result
+        with build_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry and self._fresh(entry):
+                    self._hits += 1
+                    return entry[2]
+                self._misses += 1
+                version = self._version
+
+            value = builder()
+
+            with self._lock:
+                # Don't store a value built from data an admin changed mid-build
+                if version == self._version:
+                    self._entries[key] = (version, time.monotonic(), value)
+            return value
+
+    def stats(self):
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                'version': self._version,
+                'entries': len(self._entries),
+                'ttl_seconds': self.ttl,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_ratio': round(self._hits / total, 4) if total else 0.0,
+            }
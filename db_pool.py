@@ -0,0 +1,274 @@
+import threading
+import time
+from collections import deque
+
+import mysql.connector
+from mysql.connector.errors import PoolError
+
+
+class PoolTimeout(PoolError):
+    """Raised when no connection could be checked out within the timeout."""
+
+
+class TracedCursor:
+    """
+    Cursor wrapper that reports each statement to the pool's tracer as
+    tracer(statement, params, seconds) once it has run (or failed).
+    Everything else is proxied to the real cursor.
+    """
+
+    def __init__(self, cursor, tracer):
+        self._cursor = cursor
+        self._tracer = tracer
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def execute(self, statement, params=None, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return self._cursor.execute(statement, params, *args, **kwargs)
+        finally:
+            self._tracer(statement, params, time.perf_counter() - started)
+
+    def executemany(self, statement, seq_params, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return self._cursor.executemany(statement, seq_params, *args, **kwargs)
+        finally:
+            self._tracer(statement, seq_params, time.perf_counter() - started)
+
+
+class PooledConnection:
+    """
+    Thin wrapper around a real MySQL connection.
+    Everything is proxied to the underlying connection except close(),
+    which hands the connection back to the pool instead of closing it.
+    That way existing `conn.close()` calls keep working unchanged.
+    """
+
+    def __init__(self, pool, raw_conn):
+        self._pool = pool
+        self._raw = raw_conn
+        self._released = False
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def cursor(self, *args, **kwargs):
+        cursor = self._raw.cursor(*args, **kwargs)
+        tracer = self._pool.tracer
+        return TracedCursor(cursor, tracer) if tracer is not None else cursor
+
+    def close(self):
+        # Safe to call more than once (e.g. route close + request teardown)
+        if self._released:
+            return
+        self._released = True
+        self._pool._release(self._raw)
+
+    @property
+    def released(self):
+        return self._released
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class DirectConnection(PooledConnection):
+    """A connection opened outside the pool (see connect_direct); close() really closes it."""
+
+    def close(self):
+        if self._released:
+            return
+        self._released = True
+        self._raw.close()
+
+
+class ConnectionPool:
+    """
+    Thread-safe, lazily filled pool of MySQL connections.
+
+    - size: maximum number of open connections
+    - timeout: seconds a caller waits for a free connection before PoolTimeout
+    - ping_interval: connections idle longer than this are pinged (and
+      reconnected if needed) on checkout, so stale sockets are never handed out
+    - recycle: connections older than this are closed and replaced
+
+    Setting `tracer` to a callable makes every cursor handed out afterwards
+    report its statements to it (see TracedCursor); None, the default,
+    returns the driver's cursors untouched.
+    """
+
+    tracer = None
+
+    def __init__(self, size=10, timeout=5.0, ping_interval=30.0, recycle=3600.0, **connect_args):
+        self.size = size
+        self.timeout = timeout
+        self.ping_interval = ping_interval
+        self.recycle = recycle
+        self._connect_args = connect_args
+
+        self._cond = threading.Condition()
+        self._idle = deque()  # (raw_conn, created_at, last_used)
+        self._created_at = {}  # id(raw_conn) -> creation time
+        self._open = 0
+        self._in_use = 0
+        self._waiting = 0
+
+        # Counters used by stats()
+        self._checkouts = 0
+        self._timeouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._checkout_total = 0.0
+        self._checkout_max = 0.0
+        self._health_failures = 0
+
+    # --- Connection lifecycle ---
+
+    def _connect(self):
+        raw = mysql.connector.connect(**self._connect_args)
+        self._created_at[id(raw)] = time.monotonic()
+        return raw
+
+    def _discard(self, raw):
+        self._created_at.pop(id(raw), None)
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def _healthy(self, raw, last_used):
+        now = time.monotonic()
+        if now - self._created_at.get(id(raw), now) > self.recycle:
+            return False
+        if now - last_used < self.ping_interval:
+            return True
+        try:
+            raw.ping(reconnect=True, attempts=1, delay=0)
+            return True
+        except mysql.connector.Error:
+            return False
+
+    def get_connection(self, timeout=None):
+        """Checks out a connection, waiting up to `timeout` seconds for one to free up."""
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        raw = None
+        last_used = 0.0
+        must_create = False
+
+        with self._cond:
+            self._waiting += 1
+            try:
+                while True:
+                    if self._idle:
+                        raw, _, last_used = self._idle.pop()  # LIFO keeps hot connections warm
+                        break
+                    if self._open < self.size:
+                        self._open += 1
+                        must_create = True
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeout(
+                            f"Timed out after {timeout:.1f}s waiting for a database connection "
+                            f"(pool size {self.size}, all in use)"
+                        )
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting -= 1
+            self._in_use += 1
+            waited = time.monotonic() - started
+
+        try:
+            if must_create:
+                raw = self._connect()
+            elif not self._healthy(raw, last_used):
+                with self._cond:
+                    self._health_failures += 1
+                self._discard(raw)
+                raw = self._connect()
+        except Exception:
+            # Give the slot back so the pool does not shrink permanently
+            with self._cond:
+                self._open -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+        elapsed = time.monotonic() - started
+        with self._cond:
+            self._checkouts += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+            self._checkout_total += elapsed
+            self._checkout_max = max(self._checkout_max, elapsed)
+
+        return PooledConnection(self, raw)
+
+    def _release(self, raw):
+        # Reset any open transaction so the next user starts clean
+        healthy = True
+        try:
+            if raw.in_transaction:
+                raw.rollback()
+        except Exception:
+            healthy = False
+
+        with self._cond:
+            self._in_use -= 1
+            if healthy:
+                self._idle.append((raw, self._created_at.get(id(raw), 0.0), time.monotonic()))
+            else:
+                self._open -= 1
+            self._cond.notify()
+
+        if not healthy:
+            self._discard(raw)
+
+    def connect_direct(self):
+        """
+        Opens a connection with the pool's settings that does not count
+        against the pool size, for work that holds a connection for a long time.
+        """
+        return DirectConnection(self, mysql.connector.connect(**self._connect_args))
+
+    def close_all(self):
+        """Closes every idle connection. Connections in use are closed when returned."""
+        with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._open -= len(idle)
+        for raw, _, _ in idle:
+            self._discard(raw)
+
+    # --- Metrics ---
+
+    def stats(self):
+        """Returns a snapshot of pool usage, useful for sizing DB_POOL_SIZE."""
+        with self._cond:
+            checkouts = self._checkouts
+            return {
+                'size': self.size,
+                'open': self._open,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'waiting': self._waiting,
+                'checkouts': checkouts,
+                'timeouts': self._timeouts,
+                'health_check_failures': self._health_failures,
+                'wait_avg_ms': round(self._wait_total / checkouts * 1000, 3) if checkouts else 0.0,
+                'wait_max_ms': round(self._wait_max * 1000, 3),
+                'checkout_avg_ms': round(self._checkout_total / checkouts * 1000, 3) if checkouts else 0.0,
+                'checkout_max_ms': round(self._checkout_max * 1000, 3),
+            }
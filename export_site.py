@@ -0,0 +1,156 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+
+from app import app, static_assets
+from app_utils import (get_db_connection, fetch_sections, load_latest_blogs, load_faqs_by_category,
+                       load_image_sources, page_cache, ALL_SECTIONS, LAYOUT_SECTIONS)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUTPUT = os.path.join(BASE_DIR, 'static_site')
+STATE_FILE = '.export-state.json'
+
+# Anything that changes how every page renders: templates, page CSS/JS and the bundle manifest
+BUILD_INPUTS = ('templates', os.path.join('static', 'css'), os.path.join('static', 'js'),
+                os.path.join('static', 'dist', 'manifest.json'))
+
+_STATIC_URL = re.compile(r'/static/[^"\'\s,)?#]+')
+
+
+def _digest(*parts):
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def build_digest():
+    digest = hashlib.sha256()
+    for entry in BUILD_INPUTS:
+        path = os.path.join(BASE_DIR, entry)
+        files = [path] if os.path.isfile(path) else sorted(
+            os.path.join(root, name) for root, _dirs, names in os.walk(path) for name in names
+            if not name.endswith(('.gz', '.br'))
+        )
+        for file in files:
+            digest.update(os.path.relpath(file, BASE_DIR).encode())
+            with open(file, 'rb') as f:
+                digest.update(f.read())
+    return digest.hexdigest()
+
+
+def page_inputs():
+    """
+    Every exported page with a digest of the data it renders:
+    {output path: (url, digest)}. A page is re-rendered only when its digest
+    (or the build digest) changes, so an admin edit to one blog rebuilds that
+    blog and nothing else, while a footer edit rebuilds every page.
+    """
+    conn = get_db_connection()
+    try:
+        layout = _digest(fetch_sections(conn, LAYOUT_SECTIONS))
+        sections = _digest(fetch_sections(conn, ALL_SECTIONS))
+        cursor = conn.cursor()
+        # MD5 is computed by MySQL, so the blog bodies never leave the database here
+        cursor.execute("""
+            SELECT b.blog_id, MD5(CONCAT_WS('|', b.heading, b.subheading, b.author, b.publish_date, b.content, b.renderer_version,
+                                             i.image_filename, i.alt_text, i.variants))
+            FROM Blogs b
+            LEFT JOIN Images i ON b.thumbnail_image_id = i.image_id
+        """)
+        blogs = cursor.fetchall()
+    finally:
+        conn.close()
+
+    pages = {
+        'index.html': ('/', _digest(sections, load_latest_blogs(), load_image_sources())),
+        'faqs/index.html': ('/faqs', _digest(layout, load_faqs_by_category())),
+        'matchmaking/index.html': ('/matchmaking', layout),
+        'upcommingSolutions/index.html': ('/upcommingSolutions', layout),
+    }
+    for blog_id, row_digest in blogs:
+        pages[f'blog/{blog_id}/index.html'] = (f'/blog/{blog_id}', _digest(layout, row_digest))
+    return pages
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + '.tmp', 'wb') as out:
+        out.write(data)
+    os.replace(path + '.tmp', path)
+
+
+def copy_assets(html, output):
+    """Copies the static files a page references to the same (fingerprinted) URLs under output/static."""
+    urls = sorted(set(_STATIC_URL.findall(html)))
+    for url in urls:
+        resolved = static_assets.resolve(url[len('/static/'):])
+        if resolved is None:
+            continue
+        source = os.path.join(static_assets.folder, resolved[0])
+        target = os.path.join(output, url.lstrip('/'))
+        # Pre-compressed copies go along so the web server can send them as-is (gzip_static/brotli_static)
+        for suffix in ('', '.gz', '.br'):
+            if not os.path.isfile(source + suffix):
+                continue
+            if os.path.exists(target + suffix) and os.path.getmtime(target + suffix) >= os.path.getmtime(source + suffix):
+                continue
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copy2(source + suffix, target + suffix)
+    return urls
+
+
+def export(output=DEFAULT_OUTPUT, force=False):
+    state_path = os.path.join(output, STATE_FILE)
+    try:
+        with open(state_path) as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        state = {}
+    build = build_digest()
+    previous = {} if force or state.get('build') != build else state.get('pages', {})
+
+    page_cache.enabled = False  # always render from the database
+    client = app.test_client()
+    pages, rendered = {}, 0
+    for path, (url, digest) in page_inputs().items():
+        old = previous.get(path)
+        if old and old['digest'] == digest and os.path.exists(os.path.join(output, path)):
+            pages[path] = old
+            continue
+        response = client.get(url)
+        if response.status_code != 200:
+            print(f"Skipping {url}: HTTP {response.status_code}")
+            continue
+        html = response.get_data(as_text=True)
+        _write(os.path.join(output, path), html.encode('utf-8'))
+        pages[path] = {'url': url, 'digest': digest, 'assets': copy_assets(html, output)}
+        rendered += 1
+        print(f"Rendered {url}")
+
+    # Pages that no longer exist (deleted blogs) and assets nothing links to any more
+    removed = 0
+    for path in set(state.get('pages', {})) - set(pages):
+        try:
+            os.remove(os.path.join(output, path))
+            removed += 1
+        except OSError:
+            pass
+    referenced = {os.path.join(output, url.lstrip('/')) for page in pages.values() for url in page['assets']}
+    for root, _dirs, names in os.walk(os.path.join(output, 'static')):
+        for name in names:
+            path = os.path.join(root, name)
+            base = path[:-3] if name.endswith(('.gz', '.br')) else path
+            if base not in referenced:
+                os.remove(path)
+
+    _write(state_path, json.dumps({'build': build, 'pages': pages}, indent=1).encode())
+    print(f"{rendered} pages rendered, {len(pages) - rendered} unchanged, {removed} removed -> {output}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Pre-render the public pages to static HTML.")
+    parser.add_argument('output', nargs='?', default=DEFAULT_OUTPUT, help="output directory (default: static_site/)")
+    parser.add_argument('--force', action='store_true', help="re-render every page")
+    args = parser.parse_args()
+    export(args.output, args.force)
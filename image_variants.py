@@ -0,0 +1,150 @@
+import hashlib
+import json
+import os
+
+try:
+    from PIL import Image, features
+except ImportError: # Pillow is optional; without it pages just use the original images
+    Image = None
+    features = None
+
+STATIC_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+DERIVED_FOLDER = os.path.join(STATIC_ROOT, 'assets', 'derived')
+DERIVED_URL = '/static/assets/derived'
+
+# Widths generated for srcset; only widths smaller than the original are produced
+WIDTHS = (320, 640, 960, 1280, 1920)
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp', '.gif')
+QUALITY = {'webp': 80, 'avif': 55}
+
+
+def is_image(filename):
+    return bool(filename) and filename.lower().endswith(IMAGE_EXTENSIONS)
+
+
+def output_formats():
+    if Image is None:
+        return ()
+    return tuple(fmt for fmt in ('avif', 'webp') if features.check(fmt))
+
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:32]
+
+
+def build_variants(source_file):
+    """
+    Writes resized WebP/AVIF copies of an image into static/assets/derived and
+    returns them as [{'format', 'width', 'url'}, ...].
+    Output names are derived from the source bytes, so re-running is cheap and
+    identical images share their variants.
+    """
+    formats = output_formats()
+    if not formats:
+        return []
+    os.makedirs(DERIVED_FOLDER, exist_ok=True)
+    stem = _file_hash(source_file)
+    variants = []
+    with Image.open(source_file) as img:
+        img.load()
+        if img.mode not in ('RGB', 'RGBA'):
+            img = img.convert('RGBA' if 'transparency' in img.info or img.mode in ('LA', 'P') else 'RGB')
+        widths = [w for w in WIDTHS if w < img.width] or [img.width]
+        for width in widths:
+            height = max(1, round(img.height * width / img.width))
+            resized = None
+            for fmt in formats:
+                filename = f"{stem}-{width}w.{fmt}"
+                out_path = os.path.join(DERIVED_FOLDER, filename)
+                if not os.path.exists(out_path):
+                    if resized is None:
+                        resized = img.resize((width, height), Image.LANCZOS) if width != img.width else img
+                    tmp_path = out_path + '.tmp'
+                    resized.save(tmp_path, format=fmt.upper(), quality=QUALITY[fmt])
+                    os.replace(tmp_path, out_path)
+                variants.append({'format': fmt, 'width': width, 'url': f"{DERIVED_URL}/{filename}"})
+    return variants
+
+
+def srcsets(variants):
+    """Groups variants into one srcset string per format: {'webp': 'url 320w, url 640w', ...}."""
+    grouped = {}
+    for v in sorted(variants, key=lambda v: v['width']):
+        grouped.setdefault(v['format'], []).append(f"{v['url']} {v['width']}w")
+    return {fmt: ', '.join(entries) for fmt, entries in grouped.items()}
+
+
+def process_image(image_key, source_file):
+    """
+    Background job: builds the variants for one image and records them on its
+    Images row (image_filename = image_key), then refreshes cached pages.
+    """
+    # Imported here so app_utils can be loaded without this module's optional deps
+    from app_utils import get_db_connection, bump_content_version
+    try:
+        variants = build_variants(source_file)
+    except Exception as e:
+        print(f"Error building image variants for {image_key}: {e}")
+        return
+    if not variants:
+        return
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("UPDATE Images SET variants = %s WHERE image_filename = %s", (json.dumps(variants), image_key))
+        conn.commit()
+    finally:
+        conn.close()
+    bump_content_version()
+
+
+def backfill():
+    """
+    Generates variants for every image the site already uses: uploads in the
+    Images table without variants, and the seeded images referenced by the
+    section tables (registered in Images under their static path).
+    """
+    from app_utils import get_db_connection, fetch_sections, bump_content_version
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT image_filename FROM Images WHERE variants IS NULL")
+        uploads = [row[0] for row in cursor.fetchall()]
+        seeded = sorted({
+            value for value in fetch_sections(conn).values()
+            if isinstance(value, str) and value.startswith('static/') and not value.startswith('static/assets/uploads/') and is_image(value)
+        })
+
+        done = 0
+        for key in uploads + seeded:
+            if key.startswith('static/'):
+                source = os.path.join(STATIC_ROOT, key[len('static/'):])
+            else:
+                source = os.path.join(STATIC_ROOT, 'assets', 'uploads', key)
+            if not is_image(key) or not os.path.exists(source):
+                continue
+            variants = build_variants(source)
+            if not variants:
+                continue
+            cursor.execute("""
+                INSERT INTO Images (image_filename, ref_count, variants) VALUES (%s, 1, %s)
+                ON DUPLICATE KEY UPDATE variants = VALUES(variants)
+            """, (key, json.dumps(variants)))
+            done += 1
+            print(f"{key}: {len(variants)} variants")
+        conn.commit()
+    finally:
+        conn.close()
+    bump_content_version()
+    print(f"Generated variants for {done} images.")
+
+
+if __name__ == '__main__':
+    if Image is None:
+        print("Pillow is not installed. Run: pip install Pillow")
+    else:
+        backfill()
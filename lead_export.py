@@ -0,0 +1,136 @@
+import csv
+import io
+import json
+import os
+import threading
+import zlib
+
+from app_utils import ADMIN_LISTINGS, get_dedicated_connection, json_value
+
+# Rows fetched from the server per round trip; memory use is bounded by one batch
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', 1000))
+# Exports running at once. Each holds a request thread and a dedicated DB connection
+# for as long as the download takes, so only a few may run beside normal traffic.
+EXPORT_CONCURRENCY = int(os.getenv('EXPORT_CONCURRENCY', 2))
+# Seconds MySQL waits on a slow client before dropping a streaming result
+EXPORT_NET_WRITE_TIMEOUT = int(os.getenv('EXPORT_NET_WRITE_TIMEOUT', 600))
+
+FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
+_slots = threading.BoundedSemaphore(EXPORT_CONCURRENCY)
+
+
+class ExportBusy(Exception):
+    """Raised when EXPORT_CONCURRENCY exports are already running."""
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    value = json_value(value)
+    # Leads come from public forms; keep spreadsheet apps from running a cell as a formula
+    if isinstance(value, str) and value[:1] in ('=', '+', '-', '@', '\t', '\r'):
+        return "'" + value
+    return value
+
+
+class ExportStream:
+    """
+    Response body for one export: iterating it runs the query on an
+    unbuffered cursor and yields the rows EXPORT_BATCH_SIZE at a time, encoded
+    (and gzip-compressed when asked), so memory stays flat however many rows
+    there are. close() - called by the server when the response ends or the
+    client goes away - closes the connection and frees the export slot.
+    """
+
+    def __init__(self, conn, query, params, columns, fmt, compress=False, batch_size=EXPORT_BATCH_SIZE):
+        self._conn = conn
+        self._query = query
+        self._params = params
+        self._columns = columns
+        self._fmt = fmt
+        self._batch_size = batch_size
+        self._compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None  # wbits 31: gzip framing
+        self._closed = False
+        self.rows = 0
+
+    def _encode(self, rows):
+        if self._fmt == 'ndjson':
+            return ''.join(
+                json.dumps(dict(zip(self._columns, map(json_value, row))), ensure_ascii=False) + '\n' for row in rows
+            ).encode('utf-8')
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerows([_csv_value(value) for value in row] for row in rows)
+        return buffer.getvalue().encode('utf-8')
+
+    def _output(self, data):
+        if self._compressor is None:
+            return data
+        return self._compressor.compress(data)
+
+    def __iter__(self):
+        try:
+            cursor = self._conn.cursor(buffered=False)
+            cursor.execute(self._query, self._params)
+            if self._fmt == 'csv':
+                header = io.StringIO()
+                csv.writer(header).writerow(self._columns)
+                # BOM so Excel opens the UTF-8 file with the right encoding
+                yield self._output(b'\xef\xbb\xbf' + header.getvalue().encode('utf-8'))
+            while True:
+                rows = cursor.fetchmany(self._batch_size)
+                if not rows:
+                    break
+                self.rows += len(rows)
+                chunk = self._output(self._encode(rows))
+                if chunk:
+                    yield chunk
+            if self._compressor is not None:
+                yield self._compressor.flush()
+        finally:
+            self.close()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            # An abandoned download leaves unread rows; closing the socket discards them
+            self._conn.close()
+        except Exception:
+            pass
+        finally:
+            _slots.release()
+
+
+def open_export(name, fmt, where=(), params=(), compress=False):
+    """
+    Starts an export of an ADMIN_LISTINGS table in `fmt` ('csv' or 'ndjson'),
+    oldest first, restricted by the given conditions. Connects up front so a
+    database error can still become an error response. Raises ExportBusy
+    when too many exports are running.
+    """
+    listing = ADMIN_LISTINGS[name]
+    if not _slots.acquire(blocking=False):
+        raise ExportBusy(f"{EXPORT_CONCURRENCY} exports are already running; try again shortly")
+    try:
+        conn = get_dedicated_connection()
+    except Exception:
+        _slots.release()
+        raise
+    query = f"""
+        SELECT {', '.join(listing['columns'])}
+        FROM {listing['table']}
+        {'WHERE ' + ' AND '.join(where) if where else ''}
+        ORDER BY {listing['date_column']}, id
+    """
+    stream = ExportStream(conn, query, tuple(params), listing['columns'], fmt, compress=compress)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SET SESSION net_write_timeout = %s", (EXPORT_NET_WRITE_TIMEOUT,))
+        cursor.close()
+    except Exception:
+        stream.close()
+        raise
+    return stream
@@ -0,0 +1,329 @@
+import queue
+import smtplib
+import threading
+import time
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
+
+
+def build_message(from_addr, to_email, subject, body):
+    msg = MIMEMultipart()
+    msg['From'] = from_addr
+    msg['To'] = to_email
+    msg['Subject'] = subject
+    msg.attach(MIMEText(body, 'plain'))
+    return msg
+
+
+class SmtpSession:
+    """
+    One authenticated SMTP connection that is kept open between messages.
+    It reconnects transparently when the server has dropped it or it has been
+    idle long enough that the server probably will have.
+    smtplib connections are not thread-safe, so each worker owns its own session.
+    on_send, if given, is called with the seconds each successful send() took.
+    """
+
+    def __init__(self, host, port, username=None, password=None, use_tls=True, timeout=30, idle_timeout=60, on_send=None):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.on_send = on_send
+        self._server = None
+        self._last_used = 0.0
+
+    def _connect(self):
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.use_tls:
+            server.starttls()
+        if self.username and self.password:
+            server.login(self.username, self.password)
+        self._server = server
+
+    def _alive(self):
+        if self._server is None:
+            return False
+        if time.monotonic() - self._last_used < self.idle_timeout:
+            return True
+        try:
+            return self._server.noop()[0] == 250
+        except smtplib.SMTPException:
+            return False
+        except OSError:
+            return False
+
+    def send(self, from_addr, to_email, message):
+        started = time.perf_counter()
+        if not self._alive():
+            self.close()
+            self._connect()
+        try:
+            self._server.sendmail(from_addr, to_email, message)
+        except (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused):
+            # The server answered (SMTPException is an OSError); a new connection would get the same answer
+            raise
+        except (smtplib.SMTPServerDisconnected, OSError):
+            # Connection died between the liveness check and the send: retry once on a new one
+            self.close()
+            self._connect()
+            self._server.sendmail(from_addr, to_email, message)
+        self._last_used = time.monotonic()
+        if self.on_send is not None:
+            self.on_send(time.perf_counter() - started)
+
+    def close(self):
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except Exception:
+                pass
+            self._server = None
+
+
+class SqlOutbox:
+    """
+    Durable record of outgoing mail in the email_outbox table.
+    A message is 'pending' until a worker claims it ('sending'), then ends up
+    'sent' or, after max_attempts failures, 'failed'. Pending rows left over
+    from a previous run are picked up again on start-up.
+    """
+
+    def __init__(self, connection_factory):
+        self._connect = connection_factory
+
+    def _run(self, query, params=()):
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            conn.commit()
+            return cursor
+        finally:
+            conn.close()
+
+    def add(self, to_email, subject, body):
+        cursor = self._run(
+            "INSERT INTO email_outbox (to_email, subject, body) VALUES (%s, %s, %s)",
+            (to_email, subject, body),
+        )
+        return cursor.lastrowid
+
+    def claim(self, outbox_id):
+        # Guards against two workers (or two processes) sending the same row
+        cursor = self._run(
+            "UPDATE email_outbox SET status = 'sending', claimed_at = NOW() WHERE id = %s AND status = 'pending'",
+            (outbox_id,),
+        )
+        return cursor.rowcount == 1
+
+    def mark_sent(self, outbox_id):
+        self._run(
+            "UPDATE email_outbox SET status = 'sent', sent_at = NOW(), last_error = NULL WHERE id = %s",
+            (outbox_id,),
+        )
+
+    def mark_failed(self, outbox_id, error, retry_in, give_up):
+        self._run("""
+            UPDATE email_outbox SET
+                status = %s,
+                attempts = attempts + 1,
+                last_error = %s,
+                next_attempt_at = NOW() + INTERVAL %s SECOND
+            WHERE id = %s
+        """, ('failed' if give_up else 'pending', str(error)[:1000], int(retry_in), outbox_id))
+
+    def due(self, limit, stale_after=600):
+        conn = self._connect()
+        try:
+            cursor = conn.cursor(dictionary=True)
+            # A 'sending' row this old belongs to a worker that died mid-send
+            cursor.execute(
+                "UPDATE email_outbox SET status = 'pending' WHERE status = 'sending' AND claimed_at < NOW() - INTERVAL %s SECOND",
+                (stale_after,),
+            )
+            conn.commit()
+            cursor.execute("""
+                SELECT id, to_email, subject, body, attempts FROM email_outbox
+                WHERE status = 'pending' AND next_attempt_at <= NOW()
+                ORDER BY next_attempt_at
+                LIMIT %s
+            """, (limit,))
+            return cursor.fetchall()
+        finally:
+            conn.close()
+
+
+class MailDispatcher:
+    """
+    Background email sender.
+
+    enqueue() records the message in the outbox (when one is configured) and
+    hands it to a bounded in-memory queue, returning immediately. Worker
+    threads each keep one SMTP session open and send from the queue. Failures
+    are retried with exponential backoff; with an outbox, retries and anything
+    that did not fit in the queue are re-fed by a poller thread, so nothing is
+    lost across restarts.
+    """
+
+    def __init__(self, session_factory, from_addr, outbox=None, workers=2, queue_size=1000,
+                 max_attempts=5, backoff_base=30, poll_interval=15):
+        self._session_factory = session_factory
+        self.from_addr = from_addr
+        self.outbox = outbox
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.poll_interval = poll_interval
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._queued_ids = set()
+        self._queued_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = []
+        self._started = False
+        self._start_lock = threading.Lock()
+        self.sent = 0
+        self.failed = 0
+
+    def start(self):
+        with self._start_lock:
+            if self._started:
+                return
+            self._started = True
+            for i in range(self.workers):
+                t = threading.Thread(target=self._worker, name=f"mail-worker-{i}", daemon=True)
+                t.start()
+                self._threads.append(t)
+            if self.outbox is not None:
+                t = threading.Thread(target=self._poller, name="mail-outbox-poller", daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        for _ in range(self.workers):
+            try:
+                self._queue.put_nowait(None)
+            except queue.Full:
+                pass
+        for t in self._threads:
+            t.join(timeout)
+
+    def enqueue(self, to_email, subject, body):
+        """Queues one message for delivery. Returns False only if it could not be accepted at all."""
+        self.start()
+        outbox_id = None
+        if self.outbox is not None:
+            try:
+                outbox_id = self.outbox.add(to_email, subject, body)
+            except Exception as e:
+                # Still try to deliver it from memory rather than dropping it
+                print(f"Error writing email to outbox: {e}")
+        return self._offer({'id': outbox_id, 'to_email': to_email, 'subject': subject, 'body': body, 'attempts': 0})
+
+    def _offer(self, item):
+        if item['id'] is not None:
+            with self._queued_lock:
+                if item['id'] in self._queued_ids:
+                    return True
+                self._queued_ids.add(item['id'])
+        try:
+            self._queue.put_nowait(item)
+            return True
+        except queue.Full:
+            if item['id'] is not None:
+                with self._queued_lock:
+                    self._queued_ids.discard(item['id'])
+                # Stays pending in the outbox; the poller will pick it up
+                return True
+            print(f"Email queue full, dropping message to {item['to_email']}")
+            return False
+
+    def wait_idle(self, timeout=None):
+        """Blocks until everything currently queued has been processed (used by tests and shutdown)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def _backoff(self, attempts):
+        return self.backoff_base * (2 ** max(attempts - 1, 0))
+
+    def _worker(self):
+        session = self._session_factory()
+        try:
+            while not self._stop.is_set():
+                item = self._queue.get()
+                try:
+                    if item is None:
+                        return
+                    self._deliver(session, item)
+                finally:
+                    if item is not None and item['id'] is not None:
+                        with self._queued_lock:
+                            self._queued_ids.discard(item['id'])
+                    self._queue.task_done()
+        finally:
+            session.close()
+
+    def _deliver(self, session, item):
+        outbox_id = item['id']
+        if outbox_id is not None:
+            try:
+                if not self.outbox.claim(outbox_id):
+                    return  # already sent or being sent elsewhere
+            except Exception as e:
+                print(f"Error claiming outbox email {outbox_id}: {e}")
+                return
+        message = build_message(self.from_addr, item['to_email'], item['subject'], item['body']).as_string()
+        try:
+            session.send(self.from_addr, item['to_email'], message)
+        except Exception as e:
+            attempts = item['attempts'] + 1
+            give_up = attempts >= self.max_attempts
+            print(f"Error sending email to {item['to_email']} (attempt {attempts}): {e}")
+            session.close()
+            if give_up:
+                self.failed += 1
+            if outbox_id is not None:
+                try:
+                    self.outbox.mark_failed(outbox_id, e, self._backoff(attempts), give_up)
+                except Exception as db_err:
+                    print(f"Error updating outbox email {outbox_id}: {db_err}")
+            elif not give_up:
+                # No outbox: retry from memory after the backoff delay
+                item = dict(item, attempts=attempts)
+                timer = threading.Timer(self._backoff(attempts), self._offer, args=(item,))
+                timer.daemon = True
+                timer.start()
+            return
+        self.sent += 1
+        if outbox_id is not None:
+            try:
+                self.outbox.mark_sent(outbox_id)
+            except Exception as e:
+                print(f"Error updating outbox email {outbox_id}: {e}")
+
+    def _poller(self):
+        while not self._stop.is_set():
+            free = self._queue.maxsize - self._queue.qsize()
+            if free > 0:
+                try:
+                    for row in self.outbox.due(free):
+                        self._offer(row)
+                except Exception as e:
+                    print(f"Error polling email outbox: {e}")
+            self._stop.wait(self.poll_interval)
+
+    def stats(self):
+        return {
+            'queued': self._queue.qsize(),
+            'workers': self.workers,
+            'sent': self.sent,
+            'failed': self.failed,
+        }
@@ -0,0 +1,463 @@
+import argparse
+import hashlib
+import importlib.util
+import os
+import re
+import time
+
+import mysql.connector
+from dotenv import load_dotenv
+from mysql.connector import errorcode
+
+load_dotenv()
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+_FILENAME = re.compile(r'^(\d{4})_(\w+)\.py$')
+
+# Seconds a DDL statement may wait for the table's metadata lock. ALTER TABLE queues
+# behind long-running queries, and every query that arrives after it queues behind the
+# ALTER, so a short timeout (and a retry) keeps a migration from stalling the site.
+LOCK_WAIT_TIMEOUT = int(os.getenv('MIGRATION_LOCK_WAIT_TIMEOUT', 5))
+LOCK_WAIT_RETRIES = int(os.getenv('MIGRATION_LOCK_WAIT_RETRIES', 5))
+
+# MySQL's answers when ALGORITHM=/LOCK= cannot be honoured for an ALTER
+_NOT_ONLINE = {errorcode.ER_ALTER_OPERATION_NOT_SUPPORTED, errorcode.ER_ALTER_OPERATION_NOT_SUPPORTED_REASON}
+
+SCHEMA_VERSION_TABLE = """
+CREATE TABLE IF NOT EXISTS schema_version (
+    version INT PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    checksum CHAR(64) NOT NULL,
+    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    execution_ms INT
+)
+"""
+
+
+class MigrationError(Exception):
+    """A migration could not be applied or reverted."""
+
+
+# --- Steps ---
+# A migration is a list of steps. Each step knows whether it still has work to
+# do (so a migration can adopt a database that already has some of its
+# changes), the SQL it would run (for the dry-run plan) and its inverse.
+
+class Step:
+    transactional = False  # DML that can share a transaction; DDL commits implicitly in MySQL
+
+    def pending(self, cursor):
+        return True
+
+    def statements(self):
+        raise NotImplementedError
+
+    def apply(self, cursor, allow_locking=False):
+        for statement in self.statements():
+            cursor.execute(statement)
+
+    def revert_statements(self):
+        return None  # irreversible
+
+    def revert(self, cursor):
+        statements = self.revert_statements()
+        if statements is None:
+            raise MigrationError(f"{self} cannot be reverted")
+        for statement in statements:
+            cursor.execute(statement)
+
+
+class Sql(Step):
+    """Any statement, with an optional inverse; INSERT/UPDATE/DELETE run inside the migration's transaction."""
+
+    def __init__(self, up, down=None):
+        self.up, self.down = up.strip(), down.strip() if down else down
+        self.transactional = self.up.split(None, 1)[0].upper() in ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+    def statements(self):
+        return [self.up]
+
+    def revert_statements(self):
+        return [self.down] if self.down else ([] if self.transactional else None)
+
+    def __str__(self):
+        return ' '.join(self.up.split())[:80]
+
+
+def _exists(cursor, query, params):
+    cursor.execute(query, params)
+    return cursor.fetchone()[0] > 0
+
+
+class CreateTable(Step):
+    def __init__(self, table, body):
+        self.table, self.body = table, body.strip()
+
+    def pending(self, cursor):
+        return not _exists(cursor, """
+            SELECT COUNT(*) FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s
+        """, (self.table,))
+
+    def statements(self):
+        return [f"CREATE TABLE IF NOT EXISTS {self.table} (\n{self.body}\n)"]
+
+    def revert_statements(self):
+        return [f"DROP TABLE IF EXISTS {self.table}"]
+
+    def __str__(self):
+        return f"create table {self.table}"
+
+
+class _OnlineAlter(Step):
+    """ALTER TABLE that must not block reads or writes; falls back to a locking ALTER only when allowed."""
+
+    online_clauses = ('ALGORITHM=INPLACE, LOCK=NONE',)
+
+    def alteration(self):
+        raise NotImplementedError
+
+    def statements(self):
+        return [f"ALTER TABLE {self.table} {self.alteration()}, {self.online_clauses[0]}"]
+
+    def apply(self, cursor, allow_locking=False):
+        for clause in self.online_clauses:
+            try:
+                cursor.execute(f"ALTER TABLE {self.table} {self.alteration()}, {clause}")
+                return
+            except mysql.connector.Error as err:
+                if err.errno not in _NOT_ONLINE:
+                    raise
+                reason = err.msg
+        if not allow_locking:
+            raise MigrationError(
+                f"{self} cannot run online on this server ({reason}); "
+                f"rerun with --allow-locking during a quiet period"
+            )
+        print(f"  {self}: no online algorithm available, running a locking ALTER")
+        cursor.execute(f"ALTER TABLE {self.table} {self.alteration()}")
+
+
+class AddColumn(_OnlineAlter):
+    # INSTANT (MySQL 8.0.12+) only touches metadata; INPLACE rebuilds the table but keeps it writable
+    online_clauses = ('ALGORITHM=INSTANT', 'ALGORITHM=INPLACE, LOCK=NONE')
+
+    def __init__(self, table, column, definition):
+        self.table, self.column, self.definition = table, column, definition
+
+    def pending(self, cursor):
+        return not _exists(cursor, """
+            SELECT COUNT(*) FROM information_schema.columns
+            WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
+        """, (self.table, self.column))
+
+    def alteration(self):
+        return f"ADD COLUMN {self.column} {self.definition}"
+
+    def revert_statements(self):
+        return [f"ALTER TABLE {self.table} DROP COLUMN {self.column}"]
+
+    def __str__(self):
+        return f"add column {self.table}.{self.column}"
+
+
+class AddIndex(_OnlineAlter):
+    def __init__(self, table, name, columns, unique=False):
+        self.table, self.name, self.columns, self.unique = table, name, columns, unique
+
+    def pending(self, cursor):
+        return not _exists(cursor, """
+            SELECT COUNT(*) FROM information_schema.statistics
+            WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+        """, (self.table, self.name))
+
+    def alteration(self):
+        return f"ADD {'UNIQUE ' if self.unique else ''}INDEX {self.name} ({', '.join(self.columns)})"
+
+    def revert_statements(self):
+        return [f"ALTER TABLE {self.table} DROP INDEX {self.name}"]
+
+    def __str__(self):
+        return f"add index {self.table}.{self.name} ({', '.join(self.columns)})"
+
+
+class Seed(Step):
+    """
+    Rows inserted in one executemany (a single multi-row INSERT), skipping
+    keys that already exist. only_if_empty is for tables without a natural
+    key to dedupe on: the rows go in only if the table has none yet.
+    """
+
+    transactional = True
+
+    def __init__(self, table, columns, rows, only_if_empty=False):
+        self.table, self.columns, self.rows, self.only_if_empty = table, columns, rows, only_if_empty
+
+    def pending(self, cursor):
+        if not self.only_if_empty:
+            return True
+        cursor.execute(f"SELECT EXISTS(SELECT 1 FROM {self.table})")
+        return not cursor.fetchone()[0]
+
+    def statements(self):
+        placeholders = ', '.join(['%s'] * len(self.columns))
+        return [f"INSERT IGNORE INTO {self.table} ({', '.join(self.columns)}) VALUES ({placeholders})"]
+
+    def apply(self, cursor, allow_locking=False):
+        cursor.executemany(self.statements()[0], self.rows)
+
+    def revert_statements(self):
+        return []  # seed data is left in place
+
+    def __str__(self):
+        return f"seed {self.table} ({len(self.rows)} rows)"
+
+
+# --- Migrations ---
+
+class Migration:
+    def __init__(self, version, name, path):
+        self.version, self.name, self.path = version, name, path
+        with open(path, 'rb') as f:
+            self.checksum = hashlib.sha256(f.read()).hexdigest()
+        spec = importlib.util.spec_from_file_location(f"migrations.m{version:04d}_{name}", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        self.description = (module.__doc__ or '').strip()
+        self.steps = list(module.STEPS)
+        self.irreversible = getattr(module, 'IRREVERSIBLE', None)  # reason, if it must never be rolled back
+
+    def __str__(self):
+        return f"{self.version:04d}_{self.name}"
+
+
+def load_migrations(folder=MIGRATIONS_DIR):
+    migrations = []
+    for filename in sorted(os.listdir(folder)):
+        match = _FILENAME.match(filename)
+        if match:
+            migrations.append(Migration(int(match.group(1)), match.group(2), os.path.join(folder, filename)))
+    versions = [m.version for m in migrations]
+    if len(set(versions)) != len(versions):
+        raise MigrationError("Two migration files share a version number")
+    return migrations
+
+
+def applied_versions(cursor):
+    cursor.execute(SCHEMA_VERSION_TABLE)
+    cursor.execute("SELECT version, checksum FROM schema_version ORDER BY version")
+    return dict(cursor.fetchall())
+
+
+def _set_lock_timeout(cursor):
+    cursor.execute("SET SESSION lock_wait_timeout = %s", (LOCK_WAIT_TIMEOUT,))
+
+
+def _run(step, cursor, allow_locking):
+    for attempt in range(LOCK_WAIT_RETRIES + 1):
+        try:
+            step.apply(cursor, allow_locking)
+            return
+        except mysql.connector.Error as err:
+            if err.errno != errorcode.ER_LOCK_WAIT_TIMEOUT or attempt == LOCK_WAIT_RETRIES:
+                raise
+            print(f"  {step}: table busy, retrying ({attempt + 1}/{LOCK_WAIT_RETRIES})")
+            time.sleep(min(2 ** attempt, 30))
+
+
+def apply_migration(conn, migration, allow_locking=False):
+    """
+    Applies one migration. Its DML steps (seeds, backfills) and the
+    schema_version row share one transaction, committed at the end. MySQL
+    commits DDL immediately, so if a step fails the DDL steps already done
+    are undone by running their inverses in reverse order.
+    """
+    cursor = conn.cursor()
+    started = time.monotonic()
+    done = []
+    current = None
+    try:
+        for current in migration.steps:
+            if not current.pending(cursor):
+                continue
+            if not current.transactional and conn.in_transaction:
+                # DDL would commit the open transaction implicitly; do it explicitly
+                conn.commit()
+            _run(current, cursor, allow_locking)
+            done.append(current)
+        current = 'schema_version'
+        cursor.execute(
+            "INSERT INTO schema_version (version, name, checksum, execution_ms) VALUES (%s, %s, %s, %s)",
+            (migration.version, migration.name, migration.checksum, int((time.monotonic() - started) * 1000)),
+        )
+        conn.commit()
+    except Exception as err:
+        conn.rollback()
+        print(f"Migration {migration} failed at {current}: {err}")
+        for completed in reversed(done):
+            if completed.transactional:
+                continue  # already rolled back, or committed before later DDL and kept
+            try:
+                completed.revert(cursor)
+                print(f"  reverted: {completed}")
+            except Exception as revert_err:
+                print(f"  could not revert {completed}: {revert_err}")
+        raise MigrationError(f"Migration {migration} failed: {err}") from err
+    finally:
+        cursor.close()
+
+
+def revert_migration(conn, migration):
+    if migration.irreversible:
+        raise MigrationError(f"Migration {migration} cannot be rolled back: {migration.irreversible}")
+    cursor = conn.cursor()
+    try:
+        for step in reversed(migration.steps):
+            if step.revert_statements() is None:
+                raise MigrationError(f"Migration {migration} cannot be rolled back: {step} is irreversible")
+        for step in reversed(migration.steps):
+            if not step.pending(cursor) or isinstance(step, (Sql, Seed)):
+                step.revert(cursor)
+        cursor.execute("DELETE FROM schema_version WHERE version = %s", (migration.version,))
+        conn.commit()
+    finally:
+        cursor.close()
+
+
+# --- Commands ---
+
+def _connect():
+    # Straight to MySQL rather than through app_utils, so migrating never depends on the
+    # rest of the app importing cleanly. Read at call time: bench and query_audit switch DB_NAME.
+    conn = mysql.connector.connect(
+        host=os.getenv('DB_HOST'),
+        user=os.getenv('DB_USER'),
+        password=os.getenv('DB_PASSWORD'),
+        database=os.getenv('DB_NAME'),
+    )
+    cursor = conn.cursor()
+    # One migrator at a time, e.g. when several app instances deploy together
+    cursor.execute("SELECT GET_LOCK('schema_migrations', 0)")
+    if cursor.fetchone()[0] != 1:
+        conn.close()
+        raise MigrationError("Another migration run holds the schema_migrations lock")
+    _set_lock_timeout(cursor)
+    cursor.close()
+    return conn
+
+
+def _check_checksums(migrations, applied):
+    for migration in migrations:
+        if migration.version in applied and applied[migration.version] != migration.checksum:
+            print(f"Warning: {migration} was edited after it was applied; add a new migration instead")
+
+
+def plan(target=None):
+    """Prints what upgrade() would run, step by step, without changing anything."""
+    migrations = load_migrations()
+    conn = _connect()
+    try:
+        cursor = conn.cursor()
+        applied = applied_versions(cursor)
+        _check_checksums(migrations, applied)
+        pending = [m for m in migrations if m.version not in applied and (target is None or m.version <= target)]
+        if not pending:
+            print("Schema is up to date.")
+        for migration in pending:
+            print(f"{migration}: {migration.description.splitlines()[0] if migration.description else ''}")
+            # Tables this migration creates already have the columns/indexes it goes on to add
+            created = set()
+            for step in migration.steps:
+                table = getattr(step, 'table', None)
+                if table in created and isinstance(step, (AddColumn, AddIndex)):
+                    print(f"  skip   {step} (in the CREATE TABLE above)")
+                    continue
+                if table not in created and not step.pending(cursor):
+                    print(f"  skip   {step} (already present)")
+                    continue
+                if isinstance(step, CreateTable):
+                    created.add(table)
+                for statement in step.statements():
+                    print(f"  run    {' '.join(statement.split())[:200]}")
+        conn.rollback()
+    finally:
+        conn.close()
+    return pending
+
+
+def upgrade(target=None, allow_locking=False):
+    """Applies pending migrations in order, up to and including `target`."""
+    migrations = load_migrations()
+    conn = _connect()
+    try:
+        cursor = conn.cursor()
+        applied = applied_versions(cursor)
+        conn.commit()
+        _check_checksums(migrations, applied)
+        count = 0
+        for migration in migrations:
+            if migration.version in applied or (target is not None and migration.version > target):
+                continue
+            print(f"Applying {migration}")
+            apply_migration(conn, migration, allow_locking)
+            count += 1
+        print(f"{count} migration(s) applied." if count else "Schema is up to date.")
+        return count
+    finally:
+        conn.close()
+
+
+def downgrade(target):
+    """Reverts applied migrations newer than `target`, newest first."""
+    migrations = {m.version: m for m in load_migrations()}
+    conn = _connect()
+    try:
+        cursor = conn.cursor()
+        applied = applied_versions(cursor)
+        conn.commit()
+        for version in sorted(applied, reverse=True):
+            if version <= target:
+                break
+            if version not in migrations:
+                raise MigrationError(f"Migration {version:04d} is applied but its file is missing")
+            print(f"Reverting {migrations[version]}")
+            revert_migration(conn, migrations[version])
+    finally:
+        conn.close()
+
+
+def status():
+    migrations = load_migrations()
+    conn = _connect()
+    try:
+        cursor = conn.cursor()
+        applied = applied_versions(cursor)
+        conn.commit()
+    finally:
+        conn.close()
+    _check_checksums(migrations, applied)
+    for migration in migrations:
+        print(f"{'applied' if migration.version in applied else 'pending'}  {migration}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Apply numbered schema migrations from migrations/.")
+    sub = parser.add_subparsers(dest='command')
+    sub.add_parser('status', help="list applied and pending migrations")
+    plan_parser = sub.add_parser('plan', help="dry run: show the SQL upgrade would run")
+    plan_parser.add_argument('--to', type=int, help="stop at this version")
+    up_parser = sub.add_parser('up', help="apply pending migrations (default)")
+    up_parser.add_argument('--to', type=int, help="stop at this version")
+    up_parser.add_argument('--allow-locking', action='store_true',
+                           help="let ALTERs that cannot run online lock the table")
+    down_parser = sub.add_parser('down', help="revert migrations newer than --to")
+    down_parser.add_argument('--to', type=int, required=True, help="version to return to (0 for none)")
+    args = parser.parse_args()
+
+    if args.command == 'status':
+        status()
+    elif args.command == 'plan':
+        plan(args.to)
+    elif args.command == 'down':
+        downgrade(args.to)
+    else:
+        upgrade(getattr(args, 'to', None), getattr(args, 'allow_locking', False))
@@ -0,0 +1,238 @@
+"""Baseline: the schema create_database.py used to build, plus the columns and indexes added to it since."""
+
+from migrate import CreateTable, AddColumn, AddIndex, Seed, Sql
+
+# Tables created (or adopted, when they already exist) by this migration cannot be dropped by a rollback
+IRREVERSIBLE = "baseline schema"
+
+STEPS = [
+    CreateTable('navtable', """
+    nav_id int auto_increment primary key,
+    navLogo varchar(200),
+    navAnchor1 varchar(200),
+    navAnchor2 varchar(200),
+    navAnchor3 varchar(200),
+    dropdown1 varchar(200),
+    dropdown2 varchar(200),
+    navbtn varchar(200)
+"""),
+    CreateTable('herotable', """
+    hero_id int auto_increment primary key,
+    heroHeading varchar(200),
+    heroDescription varchar(1000),
+    heroImg varchar(200)
+"""),
+    CreateTable('clientTrust', """
+    clientTrust_id int auto_increment primary key,
+    clientHeading varchar(200),
+    clientDescription varchar(1000), clientImg1 varchar(200), clientImg2 varchar(200), clientImg3 varchar(200), clientImg4 varchar(200),
+    clientImg5 varchar(200), clientImg6 varchar(200), clientImg7 varchar(200), clientImg8 varchar(200), clientImg9 varchar(200)
+"""),
+    CreateTable('innovationTable', """
+    innovation_id int auto_increment primary key,
+    innovationHeadTop varchar(200), innovationHeadmain varchar(200), innovationDescription varchar(200),
+    li1 varchar(1000), li2 varchar(1000), li3 varchar(1000), li4 varchar(1000),
+    innovationVideo varchar(500), innovationVideoSources TEXT, innovationVideoPoster varchar(500)
+"""),
+    CreateTable('clientExperience', """
+    clientExp_id int auto_increment primary key,
+    clientExpHead varchar(200),
+    clientExpDescription varchar(1000),
+    clientExpVideo varchar(500), clientExpVideoSources TEXT, clientExpVideoPoster varchar(500)
+"""),
+    CreateTable('statistics', """
+    statistics_id int auto_increment primary key,
+    statHead varchar(200),
+    statDescription varchar(200)
+"""),
+    CreateTable('stat_card', """
+    statCard_id int auto_increment primary key,
+    StatcardLogo1 varchar(500), StatcardLogo2 varchar(500), StatcardLogo3 varchar(500),
+    StatcardHead1 varchar(500), StatcardHead2 varchar(500), StatcardHead3 varchar(500),
+    StatcardPara1 varchar(500), StatcardPara2 varchar(500), StatcardPara3 varchar(500)
+"""),
+    CreateTable('getToKnow', """
+    knowId int auto_increment primary key,
+    knowHead varchar(200), knowVideo varchar(500), knowVideoSources TEXT, knowVideoPoster varchar(500)
+"""),
+    CreateTable('exploreTable', """
+    explore_id INT AUTO_INCREMENT PRIMARY KEY,
+    exploreHeading varchar(200)
+"""),
+    CreateTable('footer', """
+    footer_id INT AUTO_INCREMENT PRIMARY KEY,
+    footer_logo varchar(200),
+    footer_social_icon1 varchar(200),
+    footer_social_icon2 varchar(200),
+    footer_social_icon3 varchar(200),
+    footer_social_icon4 varchar(200),
+    footer_social_link1 varchar(200),
+    footer_social_link2 varchar(200),
+    footer_social_link3 varchar(200),
+    footer_social_link4 varchar(200)
+"""),
+    CreateTable('Images', """
+    image_id INT AUTO_INCREMENT PRIMARY KEY,
+    image_filename VARCHAR(255) NOT NULL UNIQUE, -- content hash + extension for new uploads
+    alt_text VARCHAR(500),
+    ref_count INT NOT NULL DEFAULT 1, -- blogs/sections using this file; deleted at zero
+    variants TEXT, -- JSON list of resized WebP/AVIF copies: [{"format", "width", "url"}]
+    upload_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+"""),
+    CreateTable('Blogs', """
+    blog_id INT AUTO_INCREMENT PRIMARY KEY,
+    heading VARCHAR(255) NOT NULL,
+    subheading VARCHAR(500),
+    author VARCHAR(100) NOT NULL,
+    publish_date DATE NOT NULL,
+    content TEXT NOT NULL,
+    -- content rendered and sanitized at save time by blog_renderer.py; rebuilt when renderer_version is behind
+    content_html MEDIUMTEXT,
+    content_toc TEXT,
+    reading_minutes SMALLINT,
+    excerpt VARCHAR(500),
+    renderer_version SMALLINT NOT NULL DEFAULT 0,
+    thumbnail_image_id INT,
+    FOREIGN KEY (thumbnail_image_id) REFERENCES Images(image_id) ON DELETE SET NULL,
+    INDEX idx_blogs_publish (publish_date, blog_id) -- latest blogs and the keyset-paged archive/admin lists
+"""),
+    CreateTable('contact_submissions', """
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    first_name VARCHAR(255) NOT NULL,
+    last_name VARCHAR(255) NOT NULL,
+    job_title VARCHAR(255),
+    company_name VARCHAR(255),
+    phone_number VARCHAR(50),
+    email VARCHAR(255) UNIQUE NOT NULL,
+    industry VARCHAR(255),
+    num_employees VARCHAR(50), -- Storing as VARCHAR as input type is text
+    additional_details TEXT,
+    submission_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_submissions_date (submission_date) -- admin listing sort/date filter (InnoDB appends id)
+"""),
+    CreateTable('faqs', """
+    faq_id INT AUTO_INCREMENT PRIMARY KEY,
+    category VARCHAR(255) NOT NULL,
+    question TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+"""),
+    CreateTable('AdminSettings', """
+    setting_name VARCHAR(255) PRIMARY KEY,
+    setting_value TEXT NOT NULL
+"""),
+    CreateTable('demo_bookings', """
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    firm_name VARCHAR(255),
+    company_type VARCHAR(100),
+    person_name VARCHAR(255),
+    title VARCHAR(100),
+    email VARCHAR(255),
+    team_size VARCHAR(50),
+    meeting_date DATE,
+    meeting_time VARCHAR(20),
+    meeting_at DATETIME, -- meeting_date + meeting_time; what queries filter on
+    meeting_link VARCHAR(500),
+    link_sent_at TIMESTAMP NULL,
+    link_attempts INT NOT NULL DEFAULT 0,
+    link_claim_token VARCHAR(32),
+    link_claimed_at TIMESTAMP NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE KEY uq_demo_meeting_at (meeting_at), -- one booking per slot; also serves availability range scans
+    INDEX idx_demo_link_due (link_sent_at, meeting_at), -- scheduler: unsent links in the next 10 minutes
+    INDEX idx_demo_created (created_at) -- admin listing sorted by booking time
+"""),
+    CreateTable('email_outbox', """
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    to_email VARCHAR(255) NOT NULL,
+    subject VARCHAR(500) NOT NULL,
+    body TEXT NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending', -- pending, sending, sent, failed
+    attempts INT NOT NULL DEFAULT 0,
+    last_error VARCHAR(1000),
+    next_attempt_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    claimed_at TIMESTAMP NULL,
+    sent_at TIMESTAMP NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_outbox_due (status, next_attempt_at)
+"""),
+
+    # Columns and indexes that databases created before them are missing (skipped where present)
+    AddColumn('Images', 'ref_count', 'INT NOT NULL DEFAULT 1 AFTER alt_text'),
+    AddColumn('Images', 'variants', 'TEXT AFTER ref_count'),
+    AddColumn('demo_bookings', 'link_sent_at', 'TIMESTAMP NULL'),
+    AddColumn('demo_bookings', 'link_attempts', 'INT NOT NULL DEFAULT 0'),
+    AddColumn('demo_bookings', 'link_claim_token', 'VARCHAR(32)'),
+    AddColumn('demo_bookings', 'link_claimed_at', 'TIMESTAMP NULL'),
+    AddColumn('demo_bookings', 'meeting_at', 'DATETIME AFTER meeting_time'),
+    Sql("""
+        UPDATE demo_bookings SET meeting_at = STR_TO_DATE(CONCAT(meeting_date, ' ', meeting_time), '%Y-%m-%d %H:%i')
+        WHERE meeting_at IS NULL
+    """),
+    # Fails if the old check-then-insert already let a slot be double-booked; resolve those rows first
+    AddIndex('demo_bookings', 'uq_demo_meeting_at', ['meeting_at'], unique=True),
+    AddIndex('demo_bookings', 'idx_demo_link_due', ['link_sent_at', 'meeting_at']),
+    AddIndex('demo_bookings', 'idx_demo_created', ['created_at']),
+    AddColumn('innovationTable', 'innovationVideoSources', 'TEXT'),
+    AddColumn('innovationTable', 'innovationVideoPoster', 'varchar(500)'),
+    AddColumn('clientExperience', 'clientExpVideoSources', 'TEXT'),
+    AddColumn('clientExperience', 'clientExpVideoPoster', 'varchar(500)'),
+    AddColumn('getToKnow', 'knowVideoSources', 'TEXT'),
+    AddColumn('getToKnow', 'knowVideoPoster', 'varchar(500)'),
+    AddColumn('Blogs', 'content_html', 'MEDIUMTEXT'),
+    AddColumn('Blogs', 'content_toc', 'TEXT'),
+    AddColumn('Blogs', 'reading_minutes', 'SMALLINT'),
+    AddColumn('Blogs', 'excerpt', 'VARCHAR(500)'),
+    AddColumn('Blogs', 'renderer_version', 'SMALLINT NOT NULL DEFAULT 0'),
+    AddIndex('Blogs', 'idx_blogs_publish', ['publish_date', 'blog_id']),
+    AddIndex('contact_submissions', 'idx_submissions_date', ['submission_date']),
+
+    # Seed content: the single row of each section table, and the starter FAQs
+    Seed('navtable', ['nav_id', 'navLogo', 'navAnchor1', 'navAnchor2', 'navAnchor3', 'dropdown1', 'dropdown2', 'navbtn'], [
+        (1, 'static/assets/images/navlogo.png', 'Our Solutions', 'FAQs', 'Contact', 'Match Making(Live Now)', 'Upcomming Solutions(Comming Solutions)', 'Book Demo'),
+    ]),
+    Seed('herotable', ['hero_id', 'heroHeading', 'heroDescription', 'heroImg'], [
+        (1, 'De-Risking Human Progress', 'With elite insurance expertise empowered by breakthrough technology, Newfront is the modern insurance brokerage for the 21st century.', 'static/assets/images/hero.png'),
+    ]),
+    Seed('clientTrust', ['clientTrust_id', 'clientHeading', 'clientDescription', 'clientImg1', 'clientImg2', 'clientImg3', 'clientImg4', 'clientImg5', 'clientImg6', 'clientImg7', 'clientImg8', 'clientImg9'], [
+        (1, 'Clients Trust Newfront', 'Our experts consult with companies across all growth stages on strategies that align with their benefits philosophy.', 'static/assets/images/client1.png', 'static/assets/images/client2.webp', 'static/assets/images/client3.png', 'static/assets/images/client4.webp', 'static/assets/images/client5.png', 'static/assets/images/client6.png', 'static/assets/images/client7.webp', 'static/assets/images/client8.png', 'static/assets/images/client9.webp'),
+    ]),
+    Seed('innovationTable', ['innovation_id', 'innovationHeadTop', 'innovationHeadmain', 'innovationDescription', 'li1', 'li2', 'li3', 'li4', 'innovationVideo'], [
+        (1, 'Impactful Innovation', 'Charting a New Course', 'We’re bringing advanced technology to an antiquated industry, fostering transparency, convenience, and optimized client outcomes.', 'Business insurance clients can have 24/7 access to their entire insurance program including policies, losses, COIs, and billing, on any device through Newfront’s connected dashboard', 'Total rewards clients can access benefit plans, compliance information, and secure documents in our centralized platform', 'Predictive analytics and proprietary benchmarking enable better carrier negotiations and informed decision-making', 'Multiple AI-enabled technology solutions continue to be developed, saving clients time and improving their experiences', 'static/assets/videos/a_new_course.webm'),
+    ]),
+    Seed('clientExperience', ['clientExp_id', 'clientExpHead', 'clientExpDescription', 'clientExpVideo'], [
+        (1, 'Using AI to Improve the Client Experience', 'Newfront is building breakthrough AI to drive client insights and free our teams to do the strategic work they were built to do.', 'static/assets/videos/improve-experience.webm'),
+    ]),
+    Seed('statistics', ['statistics_id', 'statHead', 'statDescription'], [
+        (1, 'By the Numbers', 'The data speaks for itself. From our large roster of established and growing clients to our stellar client retention rate—we build relationships that last.'),
+    ]),
+    Seed('stat_card', ['statCard_id', 'StatcardLogo1', 'StatcardLogo2', 'StatcardLogo3', 'StatcardHead1', 'StatcardHead2', 'StatcardHead3', 'StatcardPara1', 'StatcardPara2', 'StatcardPara3'], [
+        (1, 'static/assets/images/stats1.png', 'static/assets/images/stats2.png', 'static/assets/images/stats3.png', '$3.1B', '~20%', '500+', 'in annual premiums placed', 'U.S. unicorns represented', 'public company experience'),
+    ]),
+    Seed('getToKnow', ['knowId', 'knowHead', 'knowVideo'], [
+        (1, 'Get to Know Fortifund', 'static/assets/videos/get-to-know.webm'),
+    ]),
+    Seed('exploreTable', ['explore_id', 'exploreHeading'], [
+        (1, 'Explore Our Industries and Services'),
+    ]),
+    Seed('footer', ['footer_id', 'footer_logo', 'footer_social_icon1', 'footer_social_icon2', 'footer_social_icon3', 'footer_social_icon4', 'footer_social_link1', 'footer_social_link2', 'footer_social_link3', 'footer_social_link4'], [
+        (1, 'static/assets/images/footerLogo.png', 'static/assets/images/fbimg.png', 'static/assets/images/image.png', 'static/assets/images/insta.png', 'static/assets/images/twitter.png', '#', '#', '#', '#'),
+    ]),
+    Seed('faqs', ['category', 'question', 'answer'], [
+        ('General Questions', 'What is FortiFund?', 'FortiFund is a deal-matching platform that connects brokered deals to the right lenders based on underwriting criteria — automatically, efficiently, and securely. It is not a CRM.'),
+        ('General Questions', 'How is FortiFund different from a CRM?', 'CRMs help manage contacts and communication. FortiFund helps you close more deals by matching submissions with lenders that actually fund your deals — without the admin hassle.'),
+        ('General Questions', 'Who can use FortiFund?', 'Brokers and processors looking to submit deals faster and smarter, and lenders searching for deals that meet their funding criteria.'),
+        ('For Brokers', 'Can I choose which lenders I work with?', 'Yes! Each brokerage can customize their back end to prioritize preferred lenders — including those who offer the highest commissions or who you’ve worked with before.'),
+        ('For Brokers', 'How do I submit a deal?', 'Log in, complete the short intake form, and drag-and-drop your files. FortiFund matches your deal with lenders based on both your preferences and lender guidelines.'),
+        ('For Brokers', 'Are deals automatically sent to lenders?', 'Not yet — but we’re getting there. Right now, FortiFund matches your deal with the most relevant lenders based on their criteria and your preferences. Once matched, you’ll still send the deal to the lender yourself, just like you normally would — but with more confidence that it’s the right fit. We’re actively working on features that will let you send and track deals directly through the platform.'),
+        ('For Brokers', 'Can I prioritize lenders based on commission payouts?', 'Yes. FortiFund allows you to rank lenders based on your priorities, including commission structures. Our system takes that into account when suggesting matches.'),
+        ('For Brokers', 'How much does it cost to use FortiFund?', 'We offer flexible pricing — pay-per-deal or monthly plans. Contact us for a package tailored to your volume.'),
+        ('For Lenders', 'What kind of deals will I see?', 'Only those that match your guidelines. You’ll only see deals worth your time — and without any clutter.'),
+        ('For Lenders', 'Can I set custom deal preferences?', 'Yes. You can define your underwriting rules, industries, revenue ranges, and more — and update them anytime.'),
+        ('For Lenders', 'Will I get repeat low-quality deals?', 'No. Brokers only send deals that match your preferences, and we prioritize quality over volume.'),
+        ('Security & Privacy', 'Is my data safe on FortiFund?', 'Yes. Your deal data is stored securely, and sensitive client information is kept private. Only you control who ultimately receives the full details. We’re also building features to improve tracking and data security even further.'),
+        ('Security & Privacy', 'Will my deals be sent to all lenders?', 'No. FortiFund doesn’t blast your deals out. Instead, we use precision matching to identify the single best-fit lender for each deal — based on underwriting criteria, your preferences, and even commission structures. This gives you the confidence to send your deal to just one lender, which: Increases your chance of getting the deal funded, Helps you earn the highest commissions possible, and Eliminates the risk of your deal being backdoored or overexposed. You stay in full control — once you receive a match, you send the deal directly, just like you normally would.'),
+        ('Support & Customization', 'Can I get help tailoring FortiFund to my workflow?', 'Yes! Our team will work with you to configure your dashboard, deal settings, and lender preferences to fit your business goals.'),
+        ('Support & Customization', 'What if I need help with a hard-to-place deal?', 'We’re here to help. Our team and tools are designed to find the right match — even for deals that don’t fit the standard mold.'),
+    ], only_if_empty=True),
+]
@@ -0,0 +1,20 @@
+"""Secondary indexes for the full scans and filesorts query_audit.py found on hot paths."""
+
+from migrate import AddIndex
+
+STEPS = [
+    # /faqs and the admin FAQ list read every FAQ ORDER BY category, faq_id; reading
+    # the index in order leaves no filesort (InnoDB would append faq_id anyway,
+    # it is spelled out so the index says what it is for)
+    AddIndex('faqs', 'idx_faqs_category', ['category', 'faq_id']),
+    # The meeting link job fetches and releases its claimed bookings by token every
+    # five minutes; without this both statements scan every booking ever made
+    AddIndex('demo_bookings', 'idx_demo_claim', ['link_claim_token']),
+]
+
+# Already covered, listed here so the next audit does not add them again:
+# - contact_submissions.submission_date: idx_submissions_date (0001)
+# - Blogs.publish_date: idx_blogs_publish (publish_date, blog_id) (0001)
+# - Blogs.thumbnail_image_id: the index InnoDB creates for its foreign key
+# - demo_bookings date/time: queries filter and sort on meeting_at, covered by
+#   uq_demo_meeting_at; meeting_date/meeting_time are only kept for display
@@ -0,0 +1,255 @@
+import atexit
+import hashlib
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import request, session, make_response
+
+
+class MemoryBackend:
+    """Keeps rendered pages in process memory, evicting the least recently used beyond max_entries."""
+
+    def __init__(self, max_entries=500):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.on_evict = None
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            evicted = []
+            while len(self._entries) > self.max_entries:
+                evicted.append(self._entries.popitem(last=False)[0])
+        for old in evicted:
+            self._evicted(old)
+            if self.on_evict:
+                self.on_evict(old)
+
+    def _evicted(self, key):
+        """Called for each key set() pushed out, after it left the LRU order."""
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class DiskBackend(MemoryBackend):
+    """
+    Keeps rendered pages as files under a private directory, so large caches
+    cost disk instead of worker memory; only the LRU order stays in memory.
+    Each process gets its own directory, removed at exit: cache keys carry this
+    process's content version, which means nothing to another process.
+    """
+
+    def __init__(self, folder=None, max_entries=5000):
+        super().__init__(max_entries)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self.folder = tempfile.mkdtemp(prefix='page-cache-', dir=folder)
+        atexit.register(shutil.rmtree, self.folder, True)
+
+    def _path(self, key):
+        return os.path.join(self.folder, hashlib.sha1(repr(key).encode()).hexdigest())
+
+    def get(self, key):
+        if super().get(key) is None:
+            return None
+        try:
+            with open(self._path(key), 'rb') as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            super().delete(key)
+            return None
+
+    def set(self, key, entry):
+        path = self._path(key)
+        with open(path + '.tmp', 'wb') as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + '.tmp', path)
+        super().set(key, True)
+
+    def _evicted(self, key):
+        self._remove(key)
+
+    def delete(self, key):
+        super().delete(key)
+        self._remove(key)
+
+    def _remove(self, key):
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def clear(self):
+        super().clear()
+        for name in os.listdir(self.folder):
+            try:
+                os.remove(os.path.join(self.folder, name))
+            except OSError:
+                pass
+
+
+class PageCache:
+    """
+    Full-page cache for anonymous GET routes.
+
+    Pages are stored under (endpoint, view args, whitelisted query args,
+    content version) together with surrogate-key tags, e.g. 'blog:12'.
+    purge(*tags) drops just the pages carrying those tags; purge_all() bumps
+    the version, so every page is rebuilt on its next request. Requests from
+    logged-in admins, sessions with pending flash messages and anything but
+    GET/HEAD always go to the view. Responses carry an ETag, so browsers
+    revalidate with a cheap 304. The TTL covers edits made by another worker.
+    """
+
+    def __init__(self, backend=None, ttl=300.0, enabled=True):
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.backend.on_evict = self._forget
+        self.ttl = ttl
+        self.enabled = enabled
+        self._version = 0
+        self._purges = 0  # any purge; a page rendered across one may be stale and is not stored
+        self._tags = {}  # tag -> set of keys
+        self._lock = threading.Lock()
+        self._key_parts = []
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+
+    @property
+    def version(self):
+        return self._version
+
+    def vary_on(self, func):
+        """Adds func() to every key, e.g. the asset manifest version the pages link to."""
+        self._key_parts.append(func)
+        return func
+
+    # --- Invalidation ---
+
+    def purge(self, *tags):
+        with self._lock:
+            self._purges += 1
+            keys = set().union(*(self._tags.pop(tag, set()) for tag in tags))
+        for key in keys:
+            self.backend.delete(key)
+        return len(keys)
+
+    def purge_all(self):
+        with self._lock:
+            self._version += 1
+            self._purges += 1
+            self._tags.clear()
+        self.backend.clear()
+        return self._version
+
+    def _forget(self, key):
+        with self._lock:
+            for keys in self._tags.values():
+                keys.discard(key)
+
+    # --- Serving ---
+
+    def _bypass(self):
+        if request.method not in ('GET', 'HEAD'):
+            return True
+        # Looking at the session makes Flask add 'Vary: Cookie', which is what we want
+        return bool(session.get('_flashes') or session.get('logged_in'))
+
+    def cached(self, tags=(), query_args=()):
+        """
+        Decorator for a view (placed under @app.route). tags is a tuple of
+        surrogate keys or a function of the view's arguments returning one.
+        Only the listed query args are part of the key; requests carrying any
+        other query args are not cached, so random query strings cannot fill it.
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if not self.enabled or self._bypass() or set(request.args) - set(query_args):
+                    self.bypassed += 1
+                    return view(*args, **kwargs)
+
+                key = (
+                    request.endpoint,
+                    tuple(sorted(kwargs.items())),
+                    tuple((name, tuple(request.args.getlist(name))) for name in query_args if name in request.args),
+                    self._version,
+                    tuple(part() for part in self._key_parts),
+                )
+                entry = self.backend.get(key)
+                if entry is not None and time.monotonic() - entry['stored_at'] < self.ttl:
+                    self.hits += 1
+                    return self._respond(entry)
+
+                self.misses += 1
+                purges = self._purges
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.direct_passthrough or session.modified:
+                    return response
+                response.set_etag(hashlib.sha1(response.get_data()).hexdigest())
+                response.cache_control.no_cache = True
+                entry = {
+                    'body': response.get_data(),
+                    'headers': [(k, v) for k, v in response.headers if k not in ('Content-Length', 'Set-Cookie')],
+                    'stored_at': time.monotonic(),
+                }
+                page_tags = tags(*args, **kwargs) if callable(tags) else tags
+                with self._lock:
+                    if purges == self._purges:
+                        for tag in page_tags:
+                            self._tags.setdefault(tag, set()).add(key)
+                        store = True
+                    else:
+                        store = False
+                if store:
+                    self.backend.set(key, entry)
+                return response.make_conditional(request)
+            return wrapper
+        return decorator
+
+    def _respond(self, entry):
+        response = make_response(entry['body'])
+        response.headers.clear()
+        for name, value in entry['headers']:
+            response.headers.add(name, value)
+        response.content_length = len(entry['body'])
+        response.headers['X-Page-Cache'] = 'HIT'
+        return response.make_conditional(request)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'backend': type(self.backend).__name__,
+            'version': self._version,
+            'entries': len(self.backend),
+            'tags': len(self._tags),
+            'ttl_seconds': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'bypassed': self.bypassed,
+            'hit_ratio': round(self.hits / lookups, 3) if lookups else None,
+        }
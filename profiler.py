@@ -0,0 +1,280 @@
+"""
+On-demand profiling of a running worker, started from the admin panel.
+
+A session either samples for a number of seconds (every thread, or only the
+threads serving one endpoint), or waits for the next N requests to one
+endpoint and samples only the threads serving them. Either way each request
+it covers also runs under cProfile. When the session ends it writes, to the
+profile folder:
+
+    <name>.collapsed.txt   sampled stacks, one "frame;frame;frame count" line
+                           per distinct stack (flamegraph.pl, speedscope)
+    <name>.prof            the merged cProfile stats (pstats, snakeviz)
+    <name>.json            what was profiled and how many samples/requests
+
+With no session running, the only cost is one attribute check per request.
+A session profiles the worker process that started it; the folder is shared,
+so any worker can list and serve the files.
+"""
+import cProfile
+import json
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from datetime import datetime
+
+from flask import g, request
+
+_ROOT = os.path.dirname(os.path.abspath(__file__))
+PROFILE_NAME = re.compile(r'^[0-9]{8}-[0-9]{6}-[0-9]+-[A-Za-z0-9_.-]+$')
+FORMATS = {'collapsed': '.collapsed.txt', 'prof': '.prof', 'json': '.json'}
+
+
+class ProfileSession:
+    """One profiling run: what it covers, the samples and the merged cProfile stats."""
+
+    def __init__(self, seconds, endpoint=None, requests=None, interval=0.01):
+        self.endpoint = endpoint
+        self.request_limit = requests
+        self.seconds = seconds
+        self.interval = interval
+        self.started_at = datetime.now()
+        self.deadline = time.monotonic() + seconds
+        self.samples = 0
+        self.stacks = {}  # collapsed stack -> samples
+        self.claimed = 0
+        self.finished = 0
+        self.stats = None
+        self.threads = {}  # thread ident -> endpoint of the request it is serving
+        self.done = threading.Event()
+        self.lock = threading.Lock()
+
+    @property
+    def name(self):
+        if self.request_limit:
+            label = f"{self.endpoint}-{self.request_limit}req"
+        else:
+            label = f"{self.endpoint or 'all'}-{self.seconds:g}s"
+        return f"{self.started_at:%Y%m%d-%H%M%S}-{os.getpid()}-{re.sub(r'[^A-Za-z0-9_.-]', '_', label)}"
+
+    def covers(self, endpoint, rule):
+        """Claims the request for this session if it matches and the request limit is not reached yet."""
+        if self.done.is_set() or (self.endpoint is not None and self.endpoint not in (endpoint, rule)):
+            return False
+        with self.lock:
+            if self.request_limit is not None:
+                if self.claimed >= self.request_limit:
+                    return False
+            self.claimed += 1
+        return True
+
+    def request_finished(self, profile):
+        with self.lock:
+            if self.done.is_set():
+                return  # Already written out; a request that outlived the session is left out
+            if profile is not None:
+                if self.stats is None:
+                    self.stats = pstats.Stats(profile)
+                else:
+                    self.stats.add(profile)
+            self.finished += 1
+            if self.request_limit is not None and self.finished >= self.request_limit:
+                self.done.set()
+
+    def status(self):
+        return {
+            'name': self.name,
+            'endpoint': self.endpoint,
+            'requests': self.request_limit,
+            'requests_profiled': self.finished,
+            'samples': self.samples,
+            'interval_ms': round(self.interval * 1000, 3),
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'seconds_left': max(0, round(self.deadline - time.monotonic(), 1)),
+        }
+
+
+class SamplingProfiler:
+    """
+    Stack sampler plus per-request cProfile, installed on the app with
+    init_app() and driven by start()/stop(). Only one session runs at a time.
+    """
+
+    def __init__(self, app=None, folder=None, keep=20):
+        self.folder = folder
+        self.keep = keep
+        self._session = None
+        self._lock = threading.Lock()
+        self._labels = {}  # code object -> frame label
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.before_request_funcs.setdefault(None, []).insert(0, self._request_started)
+        app.teardown_request(self._request_finished)
+
+    # --- Sessions ---
+
+    def start(self, seconds, endpoint=None, requests=None, interval=0.01):
+        """
+        Profiles the next `requests` requests to `endpoint` (an endpoint name
+        or URL rule such as '/admin'), giving up after `seconds`; without
+        `requests`, samples for `seconds`, every thread or only those serving
+        `endpoint`. Raises ValueError if a session is already running or the
+        arguments do not make sense.
+        """
+        if seconds <= 0:
+            raise ValueError("seconds must be positive")
+        if requests is not None and (requests <= 0 or not endpoint):
+            raise ValueError("requests needs an endpoint and must be positive")
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+        with self._lock:
+            if self._session is not None:
+                raise ValueError(f"Profile {self._session.name} is still running")
+            session = self._session = ProfileSession(seconds, endpoint, requests, interval)
+        threading.Thread(target=self._run, args=(session,), name="profiler", daemon=True).start()
+        return session
+
+    def stop(self):
+        """Ends the running session early; its results are still written. Returns it, or None."""
+        session = self._session
+        if session is not None:
+            session.done.set()
+        return session
+
+    def status(self):
+        session = self._session
+        return session.status() if session is not None else None
+
+    # --- Request hooks ---
+
+    def _request_started(self):
+        session = self._session
+        if session is None:
+            return
+        rule = request.url_rule.rule if request.url_rule is not None else None
+        if not session.covers(request.endpoint, rule):
+            return
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            profile = None  # Another profiler already owns this thread; it is still sampled
+        g._profile = (session, profile)
+        session.threads[threading.get_ident()] = request.endpoint or 'unmatched'
+
+    def _request_finished(self, exc=None):
+        if '_profile' not in g:
+            return
+        session, profile = g.pop('_profile')
+        if profile is not None:
+            profile.disable()
+        session.threads.pop(threading.get_ident(), None)
+        session.request_finished(profile)
+
+    # --- Sampling ---
+
+    def _label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            filename = code.co_filename
+            if filename.startswith(_ROOT + os.sep):
+                filename = os.path.relpath(filename, _ROOT)
+            else:
+                filename = os.sep.join(filename.split(os.sep)[-2:])
+            label = self._labels[code] = f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(';', ':')
+        return label
+
+    def _sample(self, session, own_ident):
+        names = None
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            root = session.threads.get(ident)
+            if root is None:
+                if session.endpoint is not None:
+                    continue  # Only the threads serving the requests being profiled
+                if names is None:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                root = f"thread {names.get(ident, ident)}"
+            frames = []
+            while frame is not None:
+                frames.append(self._label(frame.f_code))
+                frame = frame.f_back
+            frames.append(root)
+            stack = ';'.join(reversed(frames))
+            session.stacks[stack] = session.stacks.get(stack, 0) + 1
+        session.samples += 1
+
+    def _run(self, session):
+        own_ident = threading.get_ident()
+        try:
+            while not session.done.is_set():
+                remaining = session.deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._sample(session, own_ident)
+                session.done.wait(min(session.interval, remaining))
+            with session.lock:
+                session.done.set()
+            self._write(session)
+        except Exception as e:
+            print(f"Error writing profile {session.name}: {e}")
+        finally:
+            self._labels.clear()
+            with self._lock:
+                self._session = None
+
+    # --- Results ---
+
+    def _path(self, name, fmt):
+        return os.path.join(self.folder, name + FORMATS[fmt])
+
+    def _write(self, session):
+        os.makedirs(self.folder, exist_ok=True)
+        name = session.name
+        with open(self._path(name, 'collapsed'), 'w') as f:
+            for stack, count in sorted(session.stacks.items()):
+                f.write(f"{stack} {count}\n")
+        if session.stats is not None:
+            session.stats.dump_stats(self._path(name, 'prof'))
+        with open(self._path(name, 'json'), 'w') as f:
+            json.dump(dict(session.status(), seconds_left=None,
+                           duration_seconds=round((datetime.now() - session.started_at).total_seconds(), 1),
+                           has_prof=session.stats is not None), f, indent=2)
+        self._prune()
+
+    def _prune(self):
+        for name in [profile['name'] for profile in self.profiles()][self.keep:]:
+            for fmt in FORMATS:
+                try:
+                    os.remove(self._path(name, fmt))
+                except FileNotFoundError:
+                    pass
+
+    def profiles(self):
+        """Metadata of the stored profiles, newest first."""
+        if not os.path.isdir(self.folder):
+            return []
+        found = []
+        for filename in os.listdir(self.folder):
+            if filename.endswith(FORMATS['json']):
+                try:
+                    with open(os.path.join(self.folder, filename)) as f:
+                        found.append(json.load(f))
+                except (OSError, ValueError):
+                    continue
+        return sorted(found, key=lambda profile: profile['started_at'], reverse=True)
+
+    def file(self, name, fmt):
+        """(folder, filename) of one stored profile file, for send_from_directory; ValueError if unknown."""
+        if not PROFILE_NAME.match(name) or fmt not in FORMATS:
+            raise ValueError(f"Unknown profile {name}.{fmt}")
+        path = self._path(name, fmt)
+        if not os.path.exists(path):
+            raise ValueError(f"Unknown profile {name}.{fmt}")
+        return self.folder, os.path.basename(path)
@@ -0,0 +1,316 @@
+"""
+EXPLAIN audit of the queries the app issues.
+
+    python query_audit.py [--scale 2] [--keep] [--strict]
+
+Builds a scratch database (AUDIT_DB_NAME, by default DB_NAME + '_audit'),
+applies the migrations and fills it with synthetic rows at production-like
+volume (bench.synthetic), ANALYZEd so the optimizer sees realistic statistics. Every
+route is driven through the Flask test client and every background job is run
+once, with the connection pool's tracer recording each statement and the
+function that issued it. Each distinct statement is then EXPLAINed and full
+table scans and filesorts are reported.
+
+The exit status is 1 when a request to a public page runs a statement with a
+full scan or filesort that is not listed in ACCEPTED, so a release can be
+gated on "no new full scans on hot paths". --strict applies the same rule to
+admin pages and background jobs.
+"""
+import argparse
+import os
+import re
+import sys
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+import mysql.connector
+from dotenv import load_dotenv
+
+from bench import synthetic
+
+load_dotenv()
+
+AUDIT_DB_NAME = os.getenv('AUDIT_DB_NAME') or f"{os.getenv('DB_NAME')}_audit"
+
+# Rows per table at --scale 1: enough that a scan costs more than an index lookup
+AUDIT_VOLUMES = {
+    'Images': 500,
+    'Blogs': 2000,
+    'faqs': 300,
+    'contact_submissions': 50000,
+    'demo_bookings': 10000,
+    'email_outbox': 20000,
+}
+
+# Full scans and filesorts that are there on purpose, by issuing function: why
+ACCEPTED = {
+    'app_utils.rebuild_search_index': "reads every blog and FAQ to build the in-memory search index",
+    'app_utils.load_image_sources': "loads every image with variants, once per content version",
+    'lead_export.ExportStream.__iter__': "an export reads the whole (date-filtered) table by design",
+}
+
+_ROOT = os.path.dirname(os.path.abspath(__file__))
+_UNTRACED_FILES = {os.path.join(_ROOT, name) for name in ('db_pool.py', 'request_metrics.py', 'query_audit.py')}
+_PLACEHOLDER_LIST = re.compile(r'\(\s*%s(?:\s*,\s*%s)+\s*\)')
+_EXPLAINABLE = ('SELECT', 'UPDATE', 'DELETE', 'WITH')
+
+
+# --- Recording ---
+
+def _normalize(statement):
+    # IN lists of any length are one statement as far as the plan goes
+    return _PLACEHOLDER_LIST.sub('(%s, ...)', ' '.join(statement.split()))
+
+
+def _call_site():
+    """module.function of the innermost app frame that ran the statement."""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = os.path.abspath(frame.f_code.co_filename)
+        if filename.startswith(_ROOT) and filename not in _UNTRACED_FILES:
+            module = os.path.splitext(os.path.relpath(filename, _ROOT))[0].replace(os.sep, '.')
+            # Cache builders are nested functions; report the loader they belong to
+            function = getattr(frame.f_code, 'co_qualname', frame.f_code.co_name).split('.<locals>')[0]
+            return f"{module}.{function}"
+        frame = frame.f_back
+    return 'unknown'
+
+
+class QueryLog:
+    """
+    Pool tracer that keeps one entry per distinct statement: the first
+    parameters it ran with, the functions that issued it and the requests or
+    jobs (set with during()) it ran under. Statements from other threads are
+    put down to 'background'.
+    """
+
+    def __init__(self):
+        self.statements = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @contextmanager
+    def during(self, label, hot=False):
+        self._local.context = (label, hot)
+        try:
+            yield
+        finally:
+            self._local.context = None
+
+    def __call__(self, statement, params, seconds):
+        label, hot = getattr(self._local, 'context', None) or ('background', False)
+        key = _normalize(statement)
+        site = _call_site()
+        with self._lock:
+            entry = self.statements.get(key)
+            if entry is None:
+                entry = self.statements[key] = {
+                    'statement': statement, 'params': params, 'sites': set(), 'labels': set(), 'hot': False, 'calls': 0,
+                }
+            entry['sites'].add(site)
+            entry['labels'].add(label)
+            entry['hot'] = entry['hot'] or hot
+            entry['calls'] += 1
+
+
+# --- Driving the app ---
+
+def drive(site, log):
+    """Requests every route and runs every background job once, labelled for the report."""
+    import app_utils
+    client = site.app.test_client()
+    today = date.today()
+
+    def get(path, hot=False):
+        with log.during(f"GET {path}", hot):
+            response = client.get(path)
+            response.get_data()  # runs streamed bodies (exports) to the end
+        return response
+
+    def post(path, data, hot=False):
+        with log.during(f"POST {path}", hot):
+            return client.post(path, data=data)
+
+    # Public pages, each requested once with the page cache off
+    for path in ('/', '/blog', '/faqs', '/demo', '/matchmaking', '/upcommingSolutions', '/api/booked_dates_times',
+                 f"/api/availability?month={today:%Y-%m}&months=3", '/api/search?q=fund'):
+        get(path, hot=True)
+    with log.during('GET /blog', hot=True):
+        second_page = app_utils.load_blog_page(app_utils.load_blog_page()['next'])
+    get(f"/blog?after={second_page['next']}", hot=True)
+    get(f"/blog?before={second_page['prev']}", hot=True)
+    blog_id = second_page['rows'][0]['blog_id']
+    get(f"/blog/{blog_id}", hot=True)
+    post('/submit_contact', {
+        'first_name': 'Audit', 'last_name': 'Lead', 'job_title': 'CFO', 'company_name': 'Audit Fund',
+        'phone_number': '555-0199', 'email': 'audit-lead@example.com', 'industry': 'Venture', 'num_employees': '10',
+        'additional_details': 'query audit',
+    }, hot=True)
+    # A slot starting in five minutes, so the meeting link job below has a booking to claim
+    soon = datetime.now().replace(second=0, microsecond=0) + timedelta(minutes=5)
+    post('/book_demo', {
+        'firm_name': 'Audit Fund', 'company_type': 'Fund', 'person_name': 'Audit', 'title': 'CFO',
+        'email': 'audit-booking@example.com', 'team_size': '10', 'meeting_date': soon.strftime('%Y-%m-%d'),
+        'meeting_time': soon.strftime('%H:%M'),
+    }, hot=True)
+
+    # Admin
+    site.app.secret_key = site.app.secret_key or 'query-audit'
+    with client.session_transaction() as session:
+        session['logged_in'] = True
+    get('/admin')
+    with log.during('GET /admin'):
+        admin_blogs = app_utils.load_blog_page(per_page=app_utils.ADMIN_PAGE_SIZE)
+    get(f"/admin?blogs_after={admin_blogs['next']}")
+    month_ago = (today - timedelta(days=30)).isoformat()
+    for listing, spec in app_utils.ADMIN_LISTINGS.items():
+        for sort in spec['sorts']:
+            for direction in ('desc', 'asc'):
+                base = f"/admin/api/{listing}?sort={sort}&dir={direction}"
+                page = get(base).get_json()
+                if page and page.get('next'):
+                    page = get(f"{base}&after={page['next']}").get_json()
+                    if page.get('prev'):
+                        get(f"{base}&before={page['prev']}")
+                get(f"{base}&from={month_ago}&to={today.isoformat()}")
+        get(f"/admin/export/{listing}.csv")
+        get(f"/admin/export/{listing}.ndjson?from={month_ago}")
+    get('/create_blog')
+    get(f"/edit_blog/{blog_id}")
+    post('/admin', {'form_type': 'add_faq', 'faqCategory': 'Audit', 'faqQuestion': 'Audit?', 'faqAnswer': 'Yes.'})
+    with log.during('POST /admin'):
+        faq_id = max(faq['faq_id'] for faqs in app_utils.load_faqs_by_category().values() for faq in faqs)
+    post('/admin', {'form_type': 'edit_faq', 'faq_id': faq_id, 'faqCategory': 'Audit', 'faqQuestion': 'Audit?',
+                    'faqAnswer': 'Still yes.'})
+    blog_form = {'blogHeading': 'Audit post', 'blogAuthor': 'Audit', 'blogDate': today.isoformat(),
+                 'blogContent': '## Audit\n\nA post written by the query audit.'}
+    post('/submit_blog', blog_form)
+    post(f"/update_blog/{blog_id}", blog_form)
+    post(f"/delete_blog/{blog_id}", {})
+    post(f"/delete_faq/{faq_id}", {})
+
+    # Background jobs
+    jobs = {
+        'send_due_meeting_links': site.send_due_meeting_links,
+        'rebuild_search_index': app_utils.rebuild_search_index,
+        # The startup run (stale renderer_version only) and the full one from `blog_renderer.py --all`
+        'blog_renderer.rebuild': lambda: __import__('blog_renderer').rebuild(),
+        'blog_renderer.rebuild --all': lambda: __import__('blog_renderer').rebuild(everything=True),
+        'mail outbox poll': lambda: app_utils.mail_dispatcher.outbox.due(50),
+    }
+    for name, job in jobs.items():
+        with log.during(f"job {name}"):
+            job()
+
+
+# --- EXPLAIN ---
+
+def explain(cursor, entry):
+    """EXPLAIN rows for a recorded statement, or None for statements without a plan worth checking."""
+    statement = entry['statement'].strip()
+    keyword = statement.split(None, 1)[0].upper()
+    if keyword not in _EXPLAINABLE and not (keyword in ('INSERT', 'REPLACE') and re.search(r'\bSELECT\b', statement, re.I)):
+        return None
+    if re.match(r'SELECT\s+(GET_LOCK|RELEASE_LOCK)', statement, re.I):
+        return None
+    params = entry['params']
+    if isinstance(params, list):  # executemany: the first row stands for the rest
+        params = params[0] if params else None
+    cursor.execute(f"EXPLAIN {statement}", params)
+    return cursor.fetchall()
+
+
+def problems(plan):
+    for row in plan:
+        table = row.get('table') or ''
+        if table.startswith('<'):  # derived tables and unions are built by MySQL itself
+            continue
+        if row.get('type') == 'ALL':
+            yield f"full scan of {table} (~{row.get('rows')} rows)"
+        if 'Using filesort' in (row.get('Extra') or ''):
+            yield f"filesort on {table}"
+
+
+def audit(log, strict=False):
+    """EXPLAINs everything in the log, prints the report and returns the number of failures."""
+    import app_utils
+    conn = app_utils.get_dedicated_connection()
+    findings = []
+    explained = 0
+    try:
+        cursor = conn.cursor(dictionary=True)
+        for entry in log.statements.values():
+            try:
+                plan = explain(cursor, entry)
+            except mysql.connector.Error as err:
+                findings.append((entry, [f"EXPLAIN failed: {err}"], False))
+                continue
+            if plan is None:
+                continue
+            explained += 1
+            issues = list(problems(plan))
+            if issues:
+                accepted = all(site in ACCEPTED for site in entry['sites'])
+                findings.append((entry, issues, accepted))
+    finally:
+        conn.close()
+
+    failures = 0
+    for entry, issues, accepted in sorted(findings, key=lambda f: (f[2], not f[0]['hot'])):
+        fails = not accepted and (entry['hot'] or strict)
+        failures += fails
+        status = 'accepted' if accepted else ('FAIL' if fails else 'warn')
+        labels = sorted(entry['labels'])
+        if len(labels) > 3:
+            labels[3:] = [f"{len(labels) - 3} more"]
+        print(f"{status:8s} {', '.join(sorted(entry['sites']))}  [{'hot' if entry['hot'] else 'cold'}: {', '.join(labels)}]")
+        print(f"         {_normalize(entry['statement'])[:300]}")
+        for issue in issues:
+            print(f"         - {issue}")
+        if accepted:
+            for site in sorted(entry['sites']):
+                print(f"         ({ACCEPTED[site]})")
+    print(f"{len(log.statements)} distinct statements, {explained} explained, "
+          f"{len(findings)} with full scans or filesorts, {failures} failing.")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN every query the app issues against a seeded scratch database.")
+    parser.add_argument('--scale', type=float, default=1, help="multiply the synthetic row counts (default 1)")
+    parser.add_argument('--keep', action='store_true', help=f"leave {AUDIT_DB_NAME} in place afterwards")
+    parser.add_argument('--strict', action='store_true', help="fail on admin pages and background jobs too")
+    args = parser.parse_args()
+
+    try:
+        synthetic.use_database(AUDIT_DB_NAME)
+    except ValueError as e:
+        sys.exit(f"{e}; set AUDIT_DB_NAME to a scratch database")
+    # Set before app_utils is imported: every page is rendered fresh and mail goes nowhere
+    os.environ['PAGE_CACHE_BACKEND'] = 'off'
+    os.environ['SMTP_SERVER'] = '127.0.0.1'
+    os.environ['SMTP_PORT'] = '9'
+    os.environ['SMTP_USE_TLS'] = 'false'
+
+    import app_utils
+    with synthetic.scratch_database(keep=args.keep):
+        conn = app_utils.get_dedicated_connection()
+        try:
+            counts = synthetic.seed(conn, {table: max(1, int(rows * args.scale)) for table, rows in AUDIT_VOLUMES.items()})
+        finally:
+            conn.close()
+        print("Seeded " + ", ".join(f"{rows} {table}" for table, rows in counts.items()))
+
+        log = QueryLog()
+        app_utils.get_db_pool().tracer = log
+        # Importing the app does not start its scheduler; drive() runs each job itself
+        import app as site
+        drive(site, log)
+        app_utils.mail_dispatcher.stop()
+        app_utils.get_db_pool().tracer = None
+        failures = audit(log, strict=args.strict)
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()
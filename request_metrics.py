@@ -0,0 +1,280 @@
+"""
+Where request time goes, per endpoint: SQL statements and their time,
+pool checkouts, template rendering and mail, recorded for every request and
+served as Prometheus histograms. Requests slower than a threshold are logged
+with the statements they ran.
+
+Recording a request is a few perf_counter() calls and one dict update per
+histogram under a short lock, so it stays on in production. Bodies are never
+read: a streamed response (the lead exports) is measured up to the point it
+is handed to the server, and the statements its generator runs afterwards
+are outside the request and not counted.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import before_render_template, g, has_request_context, request, template_rendered
+
+# Upper bounds of the latency buckets, in seconds
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+# Statement text is cut to this many characters in the slow-request log
+LOGGED_STATEMENT_CHARS = 300
+
+
+def _label_value(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _series(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_label_value(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic count with one series per tuple of label values."""
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def expose(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{_series(self.labels, labels)} {value}" for labels, value in values]
+        return lines
+
+
+class Histogram:
+    """
+    Prometheus histogram with one series per tuple of label values. Counts
+    are kept per bucket and only made cumulative when exposed.
+    """
+
+    def __init__(self, name, help, labels=(), buckets=SECONDS_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [per-bucket counts (last one is +Inf), sum]
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def expose(self):
+        with self._lock:
+            snapshot = sorted((labels, list(counts), total) for labels, (counts, total) in self._series.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, counts, total in snapshot:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_series(self.labels, labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{self.name}_sum{_series(self.labels, labels)} {total!r}")
+            lines.append(f"{self.name}_count{_series(self.labels, labels)} {cumulative}")
+        return lines
+
+
+class _RequestTimings:
+    """What one request has spent so far; lives in g for the length of the request."""
+
+    __slots__ = ('started', 'status', 'queries', 'statements', 'phases', 'render_depth', 'render_started')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.status = None
+        self.queries = 0
+        self.statements = []  # (statement, seconds), up to max_logged_queries of them
+        self.phases = {}  # phase -> seconds
+        self.render_depth = 0
+        self.render_started = 0.0
+
+    def add(self, phase, seconds):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+
+class RequestMetrics:
+    """
+    Per-endpoint request instrumentation for a Flask app.
+
+    init_app() installs itself as the connection pool's tracer (passing each
+    statement on to a tracer that was already set) and hooks the request and
+    template signals. Time is split into phases, each observed only for the
+    requests that entered it:
+
+        db       running SQL statements
+        connect  checking connections out of the pool (timed('connect'))
+        render   render_template, outermost call only
+        mail     queueing email (timed('mail')), including its outbox insert
+        smtp     talking to the SMTP relay from inside the request
+
+    Phases can overlap (mail includes the db time of the outbox insert), so
+    they do not add up to the request time.
+    """
+
+    def __init__(self, app=None, pool=None, slow_request_ms=1000, max_logged_queries=50, enabled=True):
+        self.slow_request_ms = slow_request_ms
+        self.max_logged_queries = max_logged_queries
+        self.enabled = enabled
+        self.requests = Counter(
+            'app_requests_total', "Requests handled, by endpoint, method and status.", ('endpoint', 'method', 'status'))
+        self.duration = Histogram(
+            'app_request_seconds', "Time from the first before_request hook until the response is handed to the "
+            "server (a streamed body is not included).", ('endpoint',))
+        self.queries = Histogram(
+            'app_request_queries', "SQL statements run per request.", ('endpoint',), QUERY_BUCKETS)
+        self.phases = Histogram(
+            'app_request_phase_seconds', "Time per request spent in each phase (db, connect, render, mail, smtp), "
+            "for the requests that entered it.", ('endpoint', 'phase'))
+        self.smtp = Histogram(
+            'app_smtp_send_seconds', "Time to hand one message to the SMTP relay, from any thread.")
+        self._gauges = []
+        self._downstream = None
+        self._logger = None
+        if app is not None:
+            self.init_app(app, pool)
+
+    def init_app(self, app, pool):
+        if not self.enabled:
+            return
+        self._logger = app.logger
+        self._downstream = pool.tracer
+        pool.tracer = self._trace
+        # First in line, so the time other before_request hooks take is counted too
+        app.before_request_funcs.setdefault(None, []).insert(0, self._start)
+        app.after_request(self._after)
+        app.teardown_request(self._finish)
+        before_render_template.connect(self._render_started, app, weak=False)
+        template_rendered.connect(self._render_finished, app, weak=False)
+
+    def add_gauges(self, prefix, stats, help):
+        """Exposes every number in the dict stats() returns as a gauge named prefix_<key>."""
+        self._gauges.append((prefix, stats, help))
+
+    # --- Recording ---
+
+    def current(self):
+        """This request's _RequestTimings, or None outside a request or when disabled."""
+        if not has_request_context():
+            return None
+        return g.get('_request_timings')
+
+    @contextmanager
+    def timed(self, phase):
+        """Adds the time spent in the block to `phase` of the current request, if there is one."""
+        timings = self.current()
+        if timings is None:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            timings.add(phase, time.perf_counter() - started)
+
+    def observe_smtp(self, seconds):
+        """SmtpSession on_send hook: one message handed to the relay, from a mail worker, a job or a request."""
+        if not self.enabled:
+            return
+        self.smtp.observe((), seconds)
+        timings = self.current()
+        if timings is not None:
+            timings.add('smtp', seconds)
+
+    def _trace(self, statement, params, seconds):
+        if self._downstream is not None:
+            self._downstream(statement, params, seconds)
+        timings = self.current()
+        if timings is None:
+            return
+        timings.queries += 1
+        timings.add('db', seconds)
+        if len(timings.statements) < self.max_logged_queries:
+            timings.statements.append((statement, seconds))
+
+    def _render_started(self, sender, **extra):
+        timings = self.current()
+        if timings is not None:
+            if timings.render_depth == 0:
+                timings.render_started = time.perf_counter()
+            timings.render_depth += 1
+
+    def _render_finished(self, sender, **extra):
+        timings = self.current()
+        if timings is not None and timings.render_depth:
+            timings.render_depth -= 1
+            if timings.render_depth == 0:
+                timings.add('render', time.perf_counter() - timings.render_started)
+
+    def _start(self):
+        g._request_timings = _RequestTimings()
+
+    def _after(self, response):
+        timings = self.current()
+        if timings is not None:
+            timings.status = response.status_code
+        return response
+
+    def _finish(self, exc=None):
+        timings = g.pop('_request_timings', None)
+        if timings is None:
+            return
+        elapsed = time.perf_counter() - timings.started
+        endpoint = request.endpoint or 'unmatched'
+        # An exception that escaped the error handlers never reached after_request
+        status = timings.status or 500
+        self.requests.inc((endpoint, request.method, str(status)))
+        self.duration.observe((endpoint,), elapsed)
+        self.queries.observe((endpoint,), timings.queries)
+        for phase, seconds in timings.phases.items():
+            self.phases.observe((endpoint, phase), seconds)
+        if elapsed * 1000 >= self.slow_request_ms:
+            self._log_slow(timings, elapsed, status)
+
+    def _log_slow(self, timings, elapsed, status):
+        phases = ', '.join(f"{phase} {seconds * 1000:.1f} ms" for phase, seconds in sorted(timings.phases.items()))
+        lines = [f"Slow request: {request.method} {request.full_path.rstrip('?')} -> {status} in {elapsed * 1000:.1f} ms; "
+                 f"{timings.queries} queries" + (f"; {phases}" if phases else "")]
+        for statement, seconds in timings.statements:
+            lines.append(f"  {seconds * 1000:8.1f} ms  {' '.join(statement.split())[:LOGGED_STATEMENT_CHARS]}")
+        if timings.queries > len(timings.statements):
+            lines.append(f"  ... and {timings.queries - len(timings.statements)} more")
+        self._logger.warning("\n".join(lines))
+
+    # --- Exposition ---
+
+    def expose(self):
+        """Everything recorded so far, plus the registered gauges, in the Prometheus text format."""
+        lines = []
+        for metric in (self.requests, self.duration, self.queries, self.phases, self.smtp):
+            lines += metric.expose()
+        for prefix, stats, help in self._gauges:
+            for key, value in sorted(stats().items()):
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                name = f"{prefix}_{key}"
+                lines += [f"# HELP {name} {help} ({key})", f"# TYPE {name} gauge", f"{name} {_number(value)}"]
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,209 @@
+import bisect
+import html
+import math
+import re
+import threading
+
+from markupsafe import Markup, escape
+
+_TOKEN = re.compile(r'\w+', re.UNICODE)
+_TAG = re.compile(r'<[^>]+>')
+
+STOPWORDS = frozenset(
+    'a an and are as at be by for from has have how i in is it its of on or our that the this to was we what '
+    'when where which who will with you your'.split()
+)
+
+TITLE_WEIGHT = 3        # a term in the heading/question counts as this many body occurrences
+PREFIX_WEIGHT = 0.7     # score factor for a prefix expansion ('insur' -> 'insurance') vs an exact term
+MAX_EXPANSIONS = 30     # prefix expansions per query term, most common first
+SNIPPET_LENGTH = 180
+
+
+def plain_text(value):
+    """Text of a possibly-HTML field, for indexing and snippets."""
+    return re.sub(r'\s+', ' ', html.unescape(_TAG.sub(' ', value or ''))).strip()
+
+
+def tokenize(text):
+    return [t for t in _TOKEN.findall(text.lower()) if t not in STOPWORDS]
+
+
+class SearchIndex:
+    """
+    In-process inverted index with BM25 ranking over a few thousand documents
+    (blogs and FAQs). Each document is (kind, id) with a title, a body, a URL
+    and optional extra fields returned with results. Terms are kept in a sorted
+    list so a query term also matches every indexed term it is a prefix of,
+    which gives search-as-you-type. add()/remove() update the index in place,
+    so write paths can keep it current without a rebuild.
+    """
+
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self):
+        self._docs = {}        # key -> {'title', 'body', 'url', 'length', 'terms', 'extra'}
+        self._postings = {}    # term -> {key: weighted term frequency}
+        self._terms = []       # sorted list of every indexed term, for prefix lookups
+        self._total_length = 0
+        self._lock = threading.RLock()
+        self.built = False
+
+    def __len__(self):
+        return len(self._docs)
+
+    # --- Writes ---
+
+    def add(self, kind, doc_id, title, body, url, **extra):
+        """Indexes (or re-indexes) one document."""
+        key = (kind, doc_id)
+        title, body = plain_text(title), plain_text(body)
+        freqs = {}
+        for term in tokenize(title):
+            freqs[term] = freqs.get(term, 0) + TITLE_WEIGHT
+        for term in tokenize(body):
+            freqs[term] = freqs.get(term, 0) + 1
+        with self._lock:
+            self._remove(key)
+            length = sum(freqs.values())
+            self._docs[key] = {'title': title, 'body': body, 'url': url, 'length': length,
+                               'terms': tuple(freqs), 'extra': extra}
+            self._total_length += length
+            for term, tf in freqs.items():
+                postings = self._postings.get(term)
+                if postings is None:
+                    postings = self._postings[term] = {}
+                    bisect.insort(self._terms, term)
+                postings[key] = tf
+
+    def remove(self, kind, doc_id):
+        with self._lock:
+            self._remove((kind, doc_id))
+
+    def _remove(self, key):
+        doc = self._docs.pop(key, None)
+        if doc is None:
+            return
+        self._total_length -= doc['length']
+        for term in doc['terms']:
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(key, None)
+            if not postings:
+                del self._postings[term]
+                i = bisect.bisect_left(self._terms, term)
+                if i < len(self._terms) and self._terms[i] == term:
+                    del self._terms[i]
+
+    def replace_all(self, documents):
+        """Rebuilds from scratch: documents is an iterable of (kind, id, title, body, url, extra)."""
+        fresh = SearchIndex()
+        for kind, doc_id, title, body, url, extra in documents:
+            fresh.add(kind, doc_id, title, body, url, **extra)
+        with self._lock:
+            self._docs, self._postings, self._terms = fresh._docs, fresh._postings, fresh._terms
+            self._total_length = fresh._total_length
+            self.built = True
+
+    # --- Queries ---
+
+    def _expand(self, token):
+        """Indexed terms matching a query token: itself (weight 1) and, for 2+ characters, terms it prefixes."""
+        matches = {}
+        if token in self._postings:
+            matches[token] = 1.0
+        if len(token) >= 2:
+            i = bisect.bisect_left(self._terms, token)
+            prefixed = []
+            while i < len(self._terms) and self._terms[i].startswith(token):
+                if self._terms[i] != token:
+                    prefixed.append(self._terms[i])
+                i += 1
+            prefixed.sort(key=lambda t: len(self._postings[t]), reverse=True)
+            for term in prefixed[:MAX_EXPANSIONS]:
+                matches[term] = PREFIX_WEIGHT
+        return matches
+
+    def search(self, query, limit=10, kind=None):
+        """
+        Ranked results for a free-text query: [{'kind', 'id', 'title', 'url',
+        'snippet', 'score', **extra}]. Every query term has to match (exactly or
+        as a prefix); the snippet is HTML-escaped with matches in <mark>.
+        """
+        query = query or ''
+        tokens = tokenize(query)
+        words = _TOKEN.findall(query.lower())
+        # The word still being typed ('in' on the way to 'insurance') is kept even if it is a stopword
+        if words and not query[-1:].isspace() and words[-1] in STOPWORDS:
+            tokens.append(words[-1])
+        tokens = list(dict.fromkeys(tokens))
+        if not tokens:
+            return []
+        with self._lock:
+            n = len(self._docs)
+            if not n:
+                return []
+            avg_length = self._total_length / n
+            scores = None
+            matched_terms = set()
+            for token in tokens:
+                token_scores = {}
+                for term, weight in self._expand(token).items():
+                    postings = self._postings[term]
+                    idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+                    for key, tf in postings.items():
+                        if kind and key[0] != kind:
+                            continue
+                        norm = tf + self.k1 * (1 - self.b + self.b * self._docs[key]['length'] / avg_length)
+                        score = weight * idf * tf * (self.k1 + 1) / norm
+                        # A token's best expansion counts, so 'insur' does not add up every insur* term
+                        if score > token_scores.get(key, 0):
+                            token_scores[key] = score
+                    matched_terms.add(term)
+                if not token_scores:
+                    return []
+                if scores is None:
+                    scores = token_scores
+                else:
+                    scores = {key: scores[key] + s for key, s in token_scores.items() if key in scores}
+                if not scores:
+                    return []
+
+            ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+            results = []
+            for key, score in ranked:
+                doc = self._docs[key]
+                results.append(dict(
+                    doc['extra'], kind=key[0], id=key[1], title=doc['title'], url=doc['url'],
+                    snippet=self.snippet(doc['body'] or doc['title'], matched_terms), score=round(score, 4),
+                ))
+        return results
+
+    @staticmethod
+    def snippet(text, terms, length=SNIPPET_LENGTH):
+        """A window of text around the first matching word, escaped, with matching words in <mark>."""
+        if not terms:
+            return Markup(escape(text[:length]))
+        word = re.compile(r'\b(?:%s)\w*' % '|'.join(re.escape(t) for t in sorted(terms, key=len, reverse=True)),
+                          re.IGNORECASE)
+        first = word.search(text)
+        start = 0
+        if first and first.start() > length // 3:
+            start = text.rfind(' ', 0, first.start() - length // 3) + 1
+        window = text[start:start + length]
+        if start + length < len(text):
+            window = window[:window.rfind(' ')] if ' ' in window else window
+        parts, last = [], 0
+        for match in word.finditer(window):
+            parts.append(escape(window[last:match.start()]))
+            parts.append(Markup('<mark>%s</mark>') % match.group(0))
+            last = match.end()
+        parts.append(escape(window[last:]))
+        prefix = '… ' if start else ''
+        suffix = ' …' if start + len(window) < len(text) else ''
+        return Markup(prefix) + Markup('').join(parts) + Markup(suffix)
+
+    def stats(self):
+        return {'documents': len(self._docs), 'terms': len(self._terms), 'built': self.built}
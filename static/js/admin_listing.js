@@ -0,0 +1,123 @@
+// Admin tabs for contact submissions and demo bookings. Rows are fetched a page at a
+// time from the section's data-listing-url the first time its tab is shown, then again
+// whenever a filter changes or a pager button is used (keyset cursors from the response).
+// The export links are kept pointing at the same date range.
+(function () {
+    function formatValue(value, format) {
+        if (value === null || value === undefined) {
+            return document.createTextNode('');
+        }
+        if (format === 'link') {
+            if (!/^https?:\/\//i.test(value)) {
+                return document.createTextNode('');
+            }
+            const link = document.createElement('a');
+            link.href = value;
+            link.target = '_blank';
+            link.rel = 'noopener';
+            link.textContent = 'Link';
+            return link;
+        }
+        if (format === 'datetime') {
+            return document.createTextNode(String(value).replace('T', ' '));
+        }
+        return document.createTextNode(String(value));
+    }
+
+    function setupListing(root) {
+        const url = root.dataset.listingUrl;
+        const columns = Array.from(root.querySelectorAll('thead th')).map(th => ({
+            fields: th.dataset.field.split(' '),
+            format: th.dataset.format,
+            className: th.className.replace(/\bborder-b\b|\bborder-gray-200\b/g, '').trim()
+        }));
+        const tbody = root.querySelector('tbody');
+        const status = root.querySelector('.listing-status');
+        const prevBtn = root.querySelector('[data-page="prev"]');
+        const nextBtn = root.querySelector('[data-page="next"]');
+        const exportLinks = Array.from(root.querySelectorAll('a[data-export]'));
+        exportLinks.forEach(link => { link.dataset.base = link.getAttribute('href'); });
+        let cursors = { next: null, prev: null };
+        let controller = null;
+        let loaded = false;
+
+        const render = (page) => {
+            tbody.replaceChildren(...page.rows.map(row => {
+                const tr = document.createElement('tr');
+                tr.className = 'border-b border-gray-200 hover:bg-gray-50';
+                columns.forEach(column => {
+                    const td = document.createElement('td');
+                    td.className = column.className;
+                    if (column.fields.length > 1) {
+                        td.textContent = column.fields.map(field => row[field] || '').join(' ').trim();
+                    } else {
+                        td.appendChild(formatValue(row[column.fields[0]], column.format));
+                    }
+                    tr.appendChild(td);
+                });
+                return tr;
+            }));
+            cursors = { next: page.next, prev: page.prev };
+            prevBtn.hidden = !page.prev;
+            nextBtn.hidden = !page.next;
+            status.hidden = page.rows.length > 0;
+            status.textContent = status.dataset.empty;
+        };
+
+        const load = (cursorName, cursor) => {
+            const params = new URLSearchParams();
+            root.querySelectorAll('.listing-filters [name]').forEach(input => {
+                if (input.value) {
+                    params.set(input.name, input.value);
+                }
+            });
+            // Exports follow the date range (they are always oldest first)
+            const range = new URLSearchParams();
+            ['from', 'to'].forEach(name => {
+                if (params.has(name)) {
+                    range.set(name, params.get(name));
+                }
+            });
+            exportLinks.forEach(link => {
+                link.href = link.dataset.base + (range.toString() ? '?' + range.toString() : '');
+            });
+            if (cursor) {
+                params.set(cursorName, cursor);
+            }
+            if (controller) {
+                controller.abort();
+            }
+            controller = new AbortController();
+            status.hidden = false;
+            status.textContent = 'Loading…';
+            fetch(url + '?' + params.toString(), { signal: controller.signal, headers: { 'Accept': 'application/json' } })
+                .then(response => response.json().then(body => {
+                    if (!response.ok) {
+                        throw new Error(body.error || response.statusText);
+                    }
+                    return body;
+                }))
+                .then(render)
+                .catch(error => {
+                    if (error.name !== 'AbortError') {
+                        status.hidden = false;
+                        status.textContent = 'Could not load: ' + error.message;
+                    }
+                });
+        };
+
+        root.querySelector('.listing-filters').addEventListener('change', () => load());
+        prevBtn.addEventListener('click', () => load('before', cursors.prev));
+        nextBtn.addEventListener('click', () => load('after', cursors.next));
+        root.closest('section').addEventListener('section:shown', () => {
+            if (!loaded) {
+                loaded = true;
+                load();
+            }
+        });
+    }
+
+    document.addEventListener('DOMContentLoaded', () => {
+        document.querySelectorAll('.admin-listing').forEach(setupListing);
+    });
+})();
@@ -1,24 +1,32 @@
 document.addEventListener('DOMContentLoaded', function() {
-    let bookedDates = new Set();
-    let bookedDateTimes = {};
+    let bookedDateTimes = {}; // { 'YYYY-MM-DD': ['08:00', ...] } for every month loaded so far
+    let loadedMonths = new Set();
+    let slotsPerDay = 7;
     let selectedDate = null;
     let selectedTime = null;
     let currentDate = new Date(); // Start with current month
 
-    // Fetch booked dates from backend
-    fetch('/api/booked_dates')
-        .then(res => res.json())
-        .then(data => {
-            bookedDates = new Set(data);
-            renderCalendar();
-        });
+    function monthKey(d) { return `${d.getFullYear()}-${pad(d.getMonth() + 1)}`; }
 
-    // Fetch booked date+time pairs from backend
-    function fetchBookedDateTimes(cb) {
-        fetch('/api/booked_dates_times')
-            .then(res => res.json())
+    // Fetch busy slots for the month being shown (only future bookings, one request per month)
+    function fetchMonthAvailability(d, cb) {
+        const key = monthKey(d);
+        if (loadedMonths.has(key)) {
+            if (cb) cb();
+            return;
+        }
+        fetch(`/api/availability?month=${key}`)
+            .then(res => res.ok ? res.json() : { slots: [], days: {} }) // outside the bookable window
             .then(data => {
-                bookedDateTimes = data; // { 'YYYY-MM-DD': ['08:00', ...] }
+                loadedMonths.add(key);
+                if (!data.slots.length) {
+                    if (cb) cb();
+                    return;
+                }
+                slotsPerDay = data.slots.length;
+                Object.entries(data.days).forEach(([day, info]) => {
+                    bookedDateTimes[day] = info.busy;
+                });
                 if (cb) cb();
             });
     }
@@ -49,7 +57,7 @@ document.addEventListener('DOMContentLoaded', function() {
             const dateObj = new Date(currentDate.getFullYear(), currentDate.getMonth(), day);
             const dateStr = `${dateObj.getFullYear()}-${pad(dateObj.getMonth() + 1)}-${pad(day)}`;
             const isWeekend = dateObj.getDay() === 0 || dateObj.getDay() === 6;
-            const isFullyBooked = bookedDateTimes[dateStr] && bookedDateTimes[dateStr].length >= 7; // 7 slots per day
+            const isFullyBooked = bookedDateTimes[dateStr] && bookedDateTimes[dateStr].length >= slotsPerDay;
             const isSelected = selectedDate === dateStr;
             const dayCell = document.createElement('div');
             dayCell.className = 'day-cell';
@@ -90,18 +98,18 @@ document.addEventListener('DOMContentLoaded', function() {
 
     document.getElementById('prev-month').addEventListener('click', function() {
         currentDate.setMonth(currentDate.getMonth() - 1);
-        renderCalendar();
+        fetchMonthAvailability(currentDate, renderCalendar);
     });
     document.getElementById('next-month').addEventListener('click', function() {
         currentDate.setMonth(currentDate.getMonth() + 1);
-        renderCalendar();
+        fetchMonthAvailability(currentDate, renderCalendar);
     });
     document.getElementById('meeting-time').addEventListener('change', function(e) {
         selectedTime = e.target.value;
     });
 
     // Initial load
-    fetchBookedDateTimes(() => {
+    fetchMonthAvailability(currentDate, () => {
         renderCalendar();
         updateTimeDropdown();
     });
@@ -0,0 +1,49 @@
+// Loads section videos only when they come near the viewport, picking one
+// rendition per format: the smallest whose height covers the rendered size.
+(function () {
+  const videos = document.querySelectorAll('video.lazy-video');
+
+  function chooseSources(video) {
+    const needed = (video.clientHeight || window.innerHeight) * (window.devicePixelRatio || 1);
+    const byType = {};
+    video.querySelectorAll('source[data-src]').forEach((source) => {
+      (byType[source.type] = byType[source.type] || []).push(source);
+    });
+    Object.values(byType).forEach((sources) => {
+      sources.sort((a, b) => (+a.dataset.height || 0) - (+b.dataset.height || 0));
+      const chosen = sources.find((s) => +s.dataset.height >= needed) || sources[sources.length - 1];
+      sources.forEach((source) => {
+        if (source === chosen) {
+          source.src = source.dataset.src;
+        } else {
+          source.remove();
+        }
+      });
+    });
+  }
+
+  function load(video) {
+    chooseSources(video);
+    video.load();
+    const playing = video.play();
+    if (playing && playing.catch) {
+      playing.catch(() => {}); // autoplay blocked (e.g. data saver); the poster stays up
+    }
+  }
+
+  if (!('IntersectionObserver' in window)) {
+    videos.forEach(load);
+    return;
+  }
+
+  const observer = new IntersectionObserver((entries) => {
+    entries.forEach((entry) => {
+      if (entry.isIntersecting) {
+        observer.unobserve(entry.target);
+        load(entry.target);
+      }
+    });
+  }, { rootMargin: '200px 0px' });
+
+  videos.forEach((video) => observer.observe(video));
+})();
@@ -0,0 +1,68 @@
+// Search-as-you-type for inputs marked data-search="blog|faq": queries /api/search
+// and lists the matches (with highlighted snippets) in the element named by data-results.
+(function () {
+  document.querySelectorAll('input[data-search]').forEach((input) => {
+    const results = document.getElementById(input.dataset.results);
+    let timer = null;
+    let latest = 0;
+
+    function render(items, query) {
+      results.innerHTML = '';
+      if (!query) {
+        results.hidden = true;
+        return;
+      }
+      results.hidden = false;
+      if (!items.length) {
+        const empty = document.createElement('p');
+        empty.className = 'search-empty';
+        empty.textContent = 'No results for "' + query + '".';
+        results.appendChild(empty);
+        return;
+      }
+      items.forEach((item) => {
+        const link = document.createElement('a');
+        link.className = 'search-result';
+        link.href = item.url;
+        const title = document.createElement('strong');
+        title.textContent = item.title;
+        const snippet = document.createElement('p');
+        snippet.innerHTML = item.snippet; // escaped server-side, only <mark> added
+        link.append(title, snippet);
+        results.appendChild(link);
+      });
+    }
+
+    input.addEventListener('input', () => {
+      clearTimeout(timer);
+      timer = setTimeout(() => {
+        const query = input.value.trim();
+        const requestId = ++latest;
+        if (!query) {
+          render([], '');
+          return;
+        }
+        fetch('/api/search?type=' + encodeURIComponent(input.dataset.search) + '&q=' + encodeURIComponent(query))
+          .then((response) => response.json())
+          .then((data) => {
+            if (requestId === latest) { // ignore answers to older keystrokes
+              render(data.results || [], query);
+            }
+          })
+          .catch(() => {});
+      }, 150);
+    });
+  });
+
+  // Opening /faqs#faq-12 (e.g. from a search result) expands that answer
+  function openFaqFromHash() {
+    const item = window.location.hash && document.querySelector(window.location.hash + '.faq-item');
+    if (item) {
+      item.querySelector('.faq-question').classList.add('active');
+      item.querySelector('.faq-answer').style.display = 'block';
+      item.scrollIntoView({ block: 'center' });
+    }
+  }
+  window.addEventListener('hashchange', openFaqFromHash);
+  openFaqFromHash();
+})();
@@ -0,0 +1,200 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+
+from flask import abort, request, send_from_directory, url_for
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError: # brotli is optional; gzip variants are still produced and served
+    brotli = None
+
+FINGERPRINT_LENGTH = 12
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+# Folders whose filenames are already content hashes (see upload_store, image_variants,
+# video_transcode, asset_bundles): their URLs never change meaning, so they are cached as immutable as-is.
+CONTENT_ADDRESSED = ('assets/uploads/', 'assets/derived/', 'dist/')
+
+# Text assets worth serving pre-compressed; encodings in order of preference
+COMPRESSIBLE = ('.css', '.js', '.svg', '.json', '.txt')
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+_FINGERPRINTED = re.compile(r'^(?P<stem>.+)\.(?P<hash>[0-9a-f]{%d})(?P<ext>\.[^./]+)$' % FINGERPRINT_LENGTH)
+
+
+class StaticAssets:
+    """
+    Serves the app's static folder with long-lived caching.
+
+    url_for('static', filename='css/base.css') produces a content-hashed URL
+    (/static/css/base.<hash>.css) that is served with an immutable one-year
+    Cache-Control, so browsers never revalidate it and a changed file simply
+    gets a new URL. The asset_url filter does the same for the 'static/...'
+    paths stored in the section tables. Files are served with byte ranges,
+    ETag/If-None-Match and Last-Modified/If-Modified-Since, and CSS/JS are
+    served from .br/.gz siblings when the client accepts them (precompress()
+    writes those).
+    """
+
+    def __init__(self, app=None):
+        self._hashes = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.folder = app.static_folder
+        self.url_path = app.static_url_path
+        app.view_functions['static'] = self.serve
+        app.url_defaults(self._fingerprint_url)
+        app.add_template_filter(self.asset_url, 'asset_url')
+
+    # --- URLs ---
+
+    def fingerprint(self, filename):
+        """Hash of a static file's bytes, cached until its mtime or size changes; None if it does not exist."""
+        path = os.path.join(self.folder, filename)
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        key = (st.st_mtime_ns, st.st_size)
+        cached = self._hashes.get(filename)
+        if cached and cached[0] == key:
+            return cached[1]
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        value = digest.hexdigest()[:FINGERPRINT_LENGTH]
+        with self._lock:
+            self._hashes[filename] = (key, value)
+        return value
+
+    def fingerprinted_name(self, filename):
+        if filename.startswith(CONTENT_ADDRESSED):
+            return filename
+        value = self.fingerprint(filename)
+        if value is None:
+            return filename
+        stem, ext = os.path.splitext(filename)
+        return f"{stem}.{value}{ext}"
+
+    def _fingerprint_url(self, endpoint, values):
+        if endpoint == 'static' and values.get('filename'):
+            values['filename'] = self.fingerprinted_name(values['filename'])
+
+    def asset_url(self, path):
+        """Hashed URL for a stored 'static/...' (or '/static/...') path; anything else is returned unchanged."""
+        if not path or not isinstance(path, str):
+            return path
+        prefix = self.url_path.lstrip('/') + '/'
+        relative = path.lstrip('/')
+        if not relative.startswith(prefix):
+            return path
+        return url_for('static', filename=relative[len(prefix):])
+
+    # --- Serving ---
+
+    def resolve(self, filename):
+        """Maps a requested name to (real filename, fingerprint in the URL or None); None for paths outside the folder."""
+        path = safe_join(self.folder, filename)
+        if path is None:
+            return None
+        if os.path.isfile(path):
+            return filename, None
+        match = _FINGERPRINTED.match(filename)
+        if not match:
+            return filename, None
+        return match.group('stem') + match.group('ext'), match.group('hash')
+
+    def _precompressed(self, filename):
+        """Best (encoding, filename) the client accepts among up-to-date .br/.gz siblings."""
+        if not filename.endswith(COMPRESSIBLE):
+            return None, filename
+        try:
+            source_mtime = os.stat(os.path.join(self.folder, filename)).st_mtime
+        except OSError:
+            return None, filename
+        accepted = request.accept_encodings
+        for encoding, suffix in ENCODINGS:
+            if not accepted[encoding]:
+                continue
+            try:
+                if os.stat(os.path.join(self.folder, filename + suffix)).st_mtime >= source_mtime:
+                    return encoding, filename + suffix
+            except OSError:
+                continue
+        return None, filename
+
+    def serve(self, filename):
+        resolved = self.resolve(filename)
+        if resolved is None:
+            abort(404)
+        filename, requested_hash = resolved
+        current_hash = self.fingerprint(filename) if requested_hash else None
+        # A stale hash (page cached from before the file changed) still gets the
+        # current file, but must not be pinned in caches under that URL.
+        immutable = (requested_hash is not None and requested_hash == current_hash) or filename.startswith(CONTENT_ADDRESSED)
+        encoding, served = self._precompressed(filename)
+
+        kwargs = {'mimetype': mimetypes.guess_type(filename)[0] or 'application/octet-stream'}
+        if immutable:
+            kwargs['max_age'] = IMMUTABLE_MAX_AGE
+        if current_hash and immutable:
+            kwargs['etag'] = f"{current_hash}-{encoding or 'identity'}"
+        response = send_from_directory(self.folder, served, conditional=True, **kwargs)
+
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        if filename.endswith(COMPRESSIBLE):
+            response.vary.add('Accept-Encoding')
+        if immutable:
+            response.cache_control.immutable = True
+        return response
+
+
+def precompress(folder, subdirs=('css', 'js'), min_size=256):
+    """
+    Writes .gz (and .br when the brotli package is installed) next to every
+    CSS/JS file under the given static subfolders, skipping ones that are
+    already up to date or do not get smaller. Returns the number written.
+    """
+    written = 0
+    for subdir in subdirs:
+        for root, _dirs, files in os.walk(os.path.join(folder, subdir)):
+            for name in files:
+                if not name.endswith(COMPRESSIBLE):
+                    continue
+                path = os.path.join(root, name)
+                mtime = os.stat(path).st_mtime
+                with open(path, 'rb') as f:
+                    data = f.read()
+                if len(data) < min_size:
+                    continue
+                encoders = {'.gz': lambda d: gzip.compress(d, compresslevel=9, mtime=0)}
+                if brotli is not None:
+                    encoders['.br'] = lambda d: brotli.compress(d, quality=11)
+                for suffix, encode in encoders.items():
+                    out_path = path + suffix
+                    if os.path.exists(out_path) and os.stat(out_path).st_mtime >= mtime:
+                        continue
+                    compressed = encode(data)
+                    if len(compressed) >= len(data):
+                        continue
+                    with open(out_path + '.tmp', 'wb') as out:
+                        out.write(compressed)
+                    os.replace(out_path + '.tmp', out_path)
+                    written += 1
+    return written
+
+
+if __name__ == '__main__':
+    static_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+    count = precompress(static_folder)
+    print(f"Wrote {count} pre-compressed files." + ("" if brotli else " Install brotli for .br variants."))
@@ -0,0 +1,43 @@
+"""The minifiers, and every built JS bundle checked by a real JavaScript parser."""
+import shutil
+import subprocess
+
+import pytest
+
+from asset_bundles import BUNDLES, bundle_data, minify_css, minify_js
+
+
+def test_js_comments_are_removed_and_line_breaks_kept():
+    assert minify_js("let a = 1; // one\n\n  /* two */ let b = a / 2 // three\n") == "let a = 1;\nlet b = a / 2"
+
+
+def test_js_strings_keep_comment_markers():
+    assert minify_js("const url = 'https://example.com/*x*/'; // c") == "const url = 'https://example.com/*x*/';"
+
+
+@pytest.mark.parametrize('source', [
+    r"if (!/^https?:\/\//i.test(value)) {",
+    r"const re = /[/]\/*/g;",
+    r"return /a\/\/b/.test(s);",
+    r"const parts = value.split(/,\s*/);",
+])
+def test_js_regex_literals_are_kept_whole(source):
+    assert minify_js(source + " // comment") == source
+
+
+def test_js_division_is_not_a_regex():
+    assert minify_js("const half = total / 2; // ratio / 2\nconst third = (a) / 3 // x") == \
+        "const half = total / 2;\nconst third = (a) / 3"
+
+
+def test_css_comments_and_whitespace_are_removed():
+    assert minify_css("a  {\n  color : red; /* note */\n}\n") == "a{color : red}"
+
+
+@pytest.mark.skipif(shutil.which('node') is None, reason="needs node to parse the bundles")
+@pytest.mark.parametrize('page', sorted(page for page, kinds in BUNDLES.items() if kinds.get('js')))
+def test_js_bundle_parses(page, tmp_path):
+    path = tmp_path / f"{page}.js"
+    path.write_text(bundle_data('js', BUNDLES[page]['js']), encoding='utf-8')
+    result = subprocess.run(['node', '--check', str(path)], capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
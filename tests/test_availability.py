@@ -0,0 +1,53 @@
+"""/api/availability only answers for months in the bookable window."""
+from datetime import date
+
+import pytest
+
+import app as site
+import app_utils
+
+
+class _NoBookings:
+    def cursor(self):
+        return self
+
+    def execute(self, query, params=()):
+        pass
+
+    def fetchall(self):
+        return []
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(app_utils, 'get_db_connection', _NoBookings)
+    app_utils.bump_availability()
+    return site.app.test_client()
+
+
+def _month(offset):
+    return f"{app_utils._add_months(date.today().replace(day=1), offset):%Y-%m}"
+
+
+@pytest.mark.parametrize('offset', [0, 1, app_utils.AVAILABILITY_BOOKABLE_MONTHS])
+def test_months_in_the_bookable_window_are_served(client, offset):
+    response = client.get(f'/api/availability?month={_month(offset)}')
+    assert response.status_code == 200
+    assert response.get_json()['from'] == f"{_month(offset)}-01"
+
+
+@pytest.mark.parametrize('offset', [-1, -120, app_utils.AVAILABILITY_BOOKABLE_MONTHS + 1, 12 * 500])
+def test_months_outside_the_bookable_window_are_rejected(client, offset):
+    response = client.get(f'/api/availability?month={_month(offset)}')
+    assert response.status_code == 400
+    assert 'month must be between' in response.get_json()['error']
+
+
+def test_rejected_months_leave_no_cache_entries(client):
+    before = len(app_utils.availability_cache._entries)
+    for offset in range(app_utils.AVAILABILITY_BOOKABLE_MONTHS + 1, app_utils.AVAILABILITY_BOOKABLE_MONTHS + 50):
+        client.get(f'/api/availability?month={_month(offset)}')
+    assert len(app_utils.availability_cache._entries) == before
@@ -0,0 +1,38 @@
+"""Benchmark summaries and the baseline comparison, including the degenerate cases."""
+from bench import report
+
+
+def _result(p50, requests=100, errors=0):
+    stats = {'requests': requests, 'errors': errors, 'p50_ms': p50, 'p95_ms': p50, 'p99_ms': p50,
+             'queries_per_request': 2.0}
+    return {'settings': {}, 'routes': {'/': stats}, 'rss_mb': {'peak': None}}
+
+
+def test_percentile_is_nearest_rank():
+    assert report.percentile([1, 2, 3, 4], 50) == 2
+    assert report.percentile([1, 2, 3, 4], 99) == 4
+    assert report.percentile([], 50) is None
+
+
+def test_empty_run_summarizes_without_latencies():
+    stats = report.summarize([], 1.0)['overall']
+    assert stats['requests'] == 0
+    assert stats['p50_ms'] is None and stats['max_ms'] is None
+
+
+def test_slower_than_tolerance_is_a_regression():
+    lines, regressed = report.compare(_result(20.0), _result(10.0), tolerance=0.2)
+    assert regressed
+    assert "REGRESSION / p50_ms: 10.0 -> 20.0 (+100%)" in lines
+
+
+def test_zero_baseline_percentile_compares_without_a_ratio():
+    lines, regressed = report.compare(_result(5.0), _result(0.0), tolerance=0.2)
+    assert regressed
+    assert "REGRESSION / p50_ms: 0.0 -> 5.0" in lines
+
+
+def test_missing_percentiles_are_skipped():
+    lines, regressed = report.compare(_result(None, requests=0), _result(10.0), tolerance=0.2)
+    assert not regressed
+    assert lines == []
@@ -0,0 +1,58 @@
+"""VersionedCache: one build per key at a time, versioned invalidation, and no per-key state left behind."""
+import threading
+import time
+
+from content_cache import VersionedCache
+
+
+def test_value_is_built_once_and_reused():
+    cache = VersionedCache()
+    calls = []
+    assert cache.get_or_build('k', lambda: calls.append(1) or 'v') == 'v'
+    assert cache.get_or_build('k', lambda: calls.append(1) or 'w') == 'v'
+    assert len(calls) == 1
+
+
+def test_bump_makes_entries_stale():
+    cache = VersionedCache()
+    cache.get_or_build('k', lambda: 'old')
+    cache.bump()
+    assert cache.get_or_build('k', lambda: 'new') == 'new'
+
+
+def test_concurrent_readers_share_one_build():
+    cache = VersionedCache()
+    calls = []
+
+    def build():
+        calls.append(1)
+        time.sleep(0.05)
+        return 'v'
+
+    threads = [threading.Thread(target=cache.get_or_build, args=('k', build)) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+    assert cache._build_locks == {}
+
+
+def test_build_locks_are_dropped_after_each_build():
+    cache = VersionedCache()
+    for n in range(100):
+        cache.get_or_build(('month', n), lambda: n)
+    assert cache._build_locks == {}
+
+
+def test_build_lock_is_dropped_when_the_builder_raises():
+    cache = VersionedCache()
+
+    def fail():
+        raise RuntimeError("database down")
+
+    try:
+        cache.get_or_build('k', fail)
+    except RuntimeError:
+        pass
+    assert cache._build_locks == {}
@@ -0,0 +1,236 @@
+"""MailDispatcher, SmtpSession and SqlOutbox against the local SMTP sink from bench/smtp_sink.py."""
+import itertools
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from bench.smtp_sink import SmtpSink
+from mailer import MailDispatcher, SmtpSession, SqlOutbox
+
+
+def wait_for(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+class FakeOutboxDatabase:
+    """
+    Just enough of MySQL to run the statements SqlOutbox issues against an
+    in-memory email_outbox table.
+    """
+
+    def __init__(self):
+        self.rows = {}
+        self._ids = itertools.count(1)
+        self.lock = threading.Lock()
+
+    def connect(self):
+        return _FakeConnection(self)
+
+    def insert(self, to_email, subject, body, **columns):
+        row = dict(to_email=to_email, subject=subject, body=body, status='pending', attempts=0,
+                   next_attempt_at=datetime.now(), claimed_at=None, sent_at=None, last_error=None)
+        row.update(columns)
+        outbox_id = next(self._ids)
+        self.rows[outbox_id] = dict(row, id=outbox_id)
+        return outbox_id
+
+
+class _FakeConnection:
+    def __init__(self, db):
+        self.db = db
+
+    def cursor(self, dictionary=False):
+        return _FakeCursor(self.db)
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class _FakeCursor:
+    def __init__(self, db):
+        self.db = db
+        self.lastrowid = None
+        self.rowcount = 0
+        self._result = []
+
+    def execute(self, query, params=()):
+        statement = ' '.join(query.split())
+        now = datetime.now()
+        rows = self.db.rows
+        with self.db.lock:
+            if statement.startswith("INSERT INTO email_outbox"):
+                self.lastrowid = self.db.insert(*params)
+            elif "SET status = 'sending'" in statement:
+                row = rows.get(params[0])
+                self.rowcount = int(row is not None and row['status'] == 'pending')
+                if self.rowcount:
+                    row.update(status='sending', claimed_at=now)
+            elif "SET status = 'sent'" in statement:
+                rows[params[0]].update(status='sent', sent_at=now, last_error=None)
+            elif "SET status = %s" in statement:
+                status, error, retry_in, outbox_id = params
+                row = rows[outbox_id]
+                row.update(status=status, attempts=row['attempts'] + 1, last_error=error,
+                           next_attempt_at=now + timedelta(seconds=retry_in))
+            elif "SET status = 'pending' WHERE status = 'sending'" in statement:
+                for row in rows.values():
+                    if row['status'] == 'sending' and row['claimed_at'] < now - timedelta(seconds=params[0]):
+                        row['status'] = 'pending'
+            elif statement.startswith("SELECT id, to_email, subject, body, attempts FROM email_outbox"):
+                due = sorted((row for row in rows.values() if row['status'] == 'pending' and row['next_attempt_at'] <= now),
+                             key=lambda row: row['next_attempt_at'])
+                self._result = [{key: row[key] for key in ('id', 'to_email', 'subject', 'body', 'attempts')}
+                                for row in due[:params[0]]]
+            else:
+                raise AssertionError(f"Unexpected statement: {statement}")
+
+    def fetchall(self):
+        return self._result
+
+
+@pytest.fixture
+def sink():
+    sink = SmtpSink().start()
+    yield sink
+    sink.close()
+
+
+@pytest.fixture
+def dispatchers(sink):
+    """Builds MailDispatchers delivering to the sink and stops them afterwards."""
+    started = []
+
+    def build(**options):
+        options.setdefault('backoff_base', 0.05)
+        options.setdefault('poll_interval', 0.05)
+        dispatcher = MailDispatcher(lambda: SmtpSession(*sink.address, use_tls=False), 'site@example.com', **options)
+        started.append(dispatcher)
+        return dispatcher
+
+    yield build
+    for dispatcher in started:
+        dispatcher.stop()
+
+
+def test_session_keeps_one_connection_open(sink):
+    timings = []
+    session = SmtpSession(*sink.address, use_tls=False, on_send=timings.append)
+    try:
+        session.send('site@example.com', 'a@example.com', 'Subject: one\r\n\r\nhi')
+        server = session._server
+        session.send('site@example.com', 'b@example.com', 'Subject: two\r\n\r\nhi')
+        assert session._server is server
+    finally:
+        session.close()
+    assert sink.messages == 2
+    assert len(timings) == 2
+
+
+def test_session_reconnects_after_close(sink):
+    session = SmtpSession(*sink.address, use_tls=False)
+    try:
+        session.send('site@example.com', 'a@example.com', 'Subject: one\r\n\r\nhi')
+        session.close()
+        session.send('site@example.com', 'a@example.com', 'Subject: two\r\n\r\nhi')
+    finally:
+        session.close()
+    assert sink.messages == 2
+
+
+def test_dispatcher_delivers_in_the_background(sink, dispatchers):
+    dispatcher = dispatchers()
+    for n in range(5):
+        assert dispatcher.enqueue(f"lead{n}@example.com", "Hello", "Body")
+    assert dispatcher.wait_idle(timeout=5)
+    assert sink.messages == 5
+    assert dispatcher.stats()['sent'] == 5
+
+
+def test_dispatcher_retries_a_temporary_failure(sink, dispatchers):
+    dispatcher = dispatchers()
+    sink.reject = 1
+    dispatcher.enqueue('lead@example.com', "Hello", "Body")
+    assert wait_for(lambda: sink.messages == 1)
+    assert sink.rejected == 1
+    assert dispatcher.stats()['failed'] == 0
+
+
+def test_dispatcher_gives_up_after_max_attempts(sink, dispatchers):
+    dispatcher = dispatchers(max_attempts=2)
+    sink.reject = 10
+    dispatcher.enqueue('lead@example.com', "Hello", "Body")
+    assert wait_for(lambda: dispatcher.stats()['failed'] == 1)
+    assert sink.rejected == 2
+    assert sink.messages == 0
+
+
+def test_outbox_records_delivery(sink, dispatchers):
+    db = FakeOutboxDatabase()
+    dispatcher = dispatchers(outbox=SqlOutbox(db.connect))
+    dispatcher.enqueue('lead@example.com', "Hello", "Body")
+    assert wait_for(lambda: db.rows[1]['status'] == 'sent')
+    assert sink.messages == 1
+
+
+def test_outbox_retries_until_sent(sink, dispatchers):
+    db = FakeOutboxDatabase()
+    dispatcher = dispatchers(outbox=SqlOutbox(db.connect))
+    sink.reject = 2
+    dispatcher.enqueue('lead@example.com', "Hello", "Body")
+    assert wait_for(lambda: db.rows[1]['status'] == 'sent')
+    assert db.rows[1]['attempts'] == 2
+    assert sink.messages == 1
+
+
+def test_outbox_marks_failed_after_max_attempts(sink, dispatchers):
+    db = FakeOutboxDatabase()
+    dispatcher = dispatchers(outbox=SqlOutbox(db.connect), max_attempts=2)
+    sink.reject = 10
+    dispatcher.enqueue('lead@example.com', "Hello", "Body")
+    assert wait_for(lambda: db.rows[1]['status'] == 'failed')
+    assert db.rows[1]['attempts'] == 2
+    assert 'Try again later' in db.rows[1]['last_error']
+
+
+class FakeScheduler:
+    running = False
+
+    def add_job(self, *args, **kwargs):
+        pass
+
+    def start(self):
+        self.running = True
+
+
+def test_outbox_replays_mail_left_by_a_previous_run(sink, dispatchers, monkeypatch):
+    import app as site
+    db = FakeOutboxDatabase()
+    db.insert('pending@example.com', "Queued before a restart", "Body")
+    # Claimed by a worker that died mid-send
+    db.insert('stale@example.com', "Interrupted", "Body", status='sending', claimed_at=datetime.now() - timedelta(hours=1))
+    db.insert('done@example.com', "Already sent", "Body", status='sent')
+    dispatcher = dispatchers(outbox=SqlOutbox(db.connect))
+    monkeypatch.setattr(site, 'scheduler', FakeScheduler())
+    monkeypatch.setattr(site, 'mail_dispatcher', dispatcher)
+    # Nothing is enqueued: serving the app alone must start the outbox poller
+    site.start_scheduler()
+    assert wait_for(lambda: db.rows[1]['status'] == db.rows[2]['status'] == 'sent')
+    assert sink.messages == 2
+
+
+def test_outbox_claim_is_taken_once():
+    db = FakeOutboxDatabase()
+    outbox = SqlOutbox(db.connect)
+    outbox_id = outbox.add('lead@example.com', "Hello", "Body")
+    assert outbox.claim(outbox_id)
+    assert not outbox.claim(outbox_id)
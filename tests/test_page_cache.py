@@ -0,0 +1,40 @@
+"""Page cache backends: LRU eviction and the files DiskBackend keeps."""
+import os
+
+from page_cache import DiskBackend, MemoryBackend
+
+
+def test_memory_backend_evicts_least_recently_used():
+    backend = MemoryBackend(max_entries=2)
+    evicted = []
+    backend.on_evict = evicted.append
+    backend.set('a', 1)
+    backend.set('b', 2)
+    backend.get('a')
+    backend.set('c', 3)
+    assert evicted == ['b']
+    assert backend.get('b') is None
+    assert backend.get('a') == 1
+
+
+def test_disk_backend_removes_files_of_evicted_pages(tmp_path):
+    backend = DiskBackend(str(tmp_path), max_entries=3)
+    evicted = []
+    backend.on_evict = evicted.append
+    for n in range(10):
+        backend.set(('page', n), {'body': b'x' * n})
+    assert len(backend) == 3
+    assert len(os.listdir(backend.folder)) == 3
+    assert evicted == [('page', n) for n in range(7)]
+    assert backend.get(('page', 0)) is None
+    assert backend.get(('page', 9)) == {'body': b'x' * 9}
+
+
+def test_disk_backend_delete_and_clear_remove_files(tmp_path):
+    backend = DiskBackend(str(tmp_path), max_entries=10)
+    for n in range(4):
+        backend.set(n, {'body': b''})
+    backend.delete(0)
+    assert len(os.listdir(backend.folder)) == 3
+    backend.clear()
+    assert os.listdir(backend.folder) == []
@@ -0,0 +1,122 @@
+import hashlib
+import os
+import tempfile
+
+from werkzeug.utils import secure_filename
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class UploadStore:
+    """
+    Content-addressed storage for admin uploads.
+
+    Files are saved under the hash of their bytes, so uploading the same file
+    twice stores it once and two different files can never overwrite each other
+    just because they share a name. Each stored file has one row in the Images
+    table whose ref_count says how many places (blog thumbnails, section
+    images/videos) use it; the file is only deleted once that reaches zero.
+    """
+
+    def __init__(self, folder, url_prefix='static/assets/uploads'):
+        self.folder = folder
+        self.url_prefix = url_prefix.rstrip('/')
+        os.makedirs(folder, exist_ok=True)
+
+    # --- Files on disk ---
+
+    def save(self, file_storage):
+        """
+        Streams an uploaded file to disk in chunks while hashing it and returns
+        the stored filename (<hash><ext>). Identical bytes map to the same name.
+        """
+        ext = os.path.splitext(secure_filename(file_storage.filename or ''))[1].lower()
+        digest = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=self.folder, prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                while True:
+                    chunk = file_storage.stream.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    out.write(chunk)
+            filename = digest.hexdigest()[:32] + ext
+            final_path = os.path.join(self.folder, filename)
+            if os.path.exists(final_path):
+                os.remove(tmp_path)  # already stored: dedupe
+            else:
+                os.replace(tmp_path, final_path)
+            return filename
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def path_for(self, filename):
+        return f"{self.url_prefix}/{filename}"
+
+    def filename_from_path(self, path):
+        """Returns the stored filename for a 'static/assets/uploads/...' path, or None for anything else."""
+        prefix = self.url_prefix + '/'
+        if path and path.startswith(prefix):
+            return path[len(prefix):]
+        return None
+
+    # --- Reference counting in the Images table ---
+    # These run on the caller's cursor so they commit or roll back together
+    # with the row that starts or stops using the file.
+
+    def acquire(self, cursor, filename, alt_text=None):
+        """Adds one reference to a stored file and returns its image_id."""
+        cursor.execute("""
+            INSERT INTO Images (image_filename, alt_text, ref_count) VALUES (%s, %s, 1)
+            ON DUPLICATE KEY UPDATE
+                ref_count = ref_count + 1,
+                alt_text = COALESCE(VALUES(alt_text), alt_text),
+                image_id = LAST_INSERT_ID(image_id)
+        """, (filename, alt_text))
+        return cursor.lastrowid
+
+    def release(self, cursor, image_id=None, filename=None):
+        """
+        Drops one reference. Returns the filename if that was the last one (the
+        Images row is deleted); pass it to purge() after committing.
+        """
+        if image_id is not None:
+            cursor.execute("SELECT image_id, image_filename, ref_count FROM Images WHERE image_id = %s FOR UPDATE", (image_id,))
+        elif filename is not None:
+            cursor.execute("SELECT image_id, image_filename, ref_count FROM Images WHERE image_filename = %s FOR UPDATE", (filename,))
+        else:
+            return None
+        row = cursor.fetchone()
+        if not row:
+            return None
+        if isinstance(row, dict):
+            row = (row['image_id'], row['image_filename'], row['ref_count'])
+        image_id, image_filename, ref_count = row
+        if ref_count > 1:
+            cursor.execute("UPDATE Images SET ref_count = ref_count - 1 WHERE image_id = %s", (image_id,))
+            return None
+        cursor.execute("DELETE FROM Images WHERE image_id = %s", (image_id,))
+        return image_filename
+
+    def release_path(self, cursor, path):
+        """release() for a stored 'static/assets/uploads/...' path; other paths are ignored."""
+        filename = self.filename_from_path(path)
+        return self.release(cursor, filename=filename) if filename else None
+
+    def purge(self, cursor, filenames):
+        """
+        Deletes files whose last reference was released, after the caller has
+        committed. Anything re-acquired in the meantime is left alone.
+        """
+        for filename in filenames:
+            if not filename:
+                continue
+            cursor.execute("SELECT 1 FROM Images WHERE image_filename = %s", (filename,))
+            if cursor.fetchone():
+                continue
+            filepath = os.path.join(self.folder, os.path.basename(filename))
+            if os.path.exists(filepath):
+                os.remove(filepath)
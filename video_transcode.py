@@ -0,0 +1,167 @@
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import threading
+
+STATIC_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+VIDEO_FOLDER = os.path.join(STATIC_ROOT, 'assets', 'derived', 'video')
+VIDEO_URL = '/static/assets/derived/video'
+
+FFMPEG = os.getenv('FFMPEG_PATH') or shutil.which('ffmpeg')
+FFPROBE = os.getenv('FFPROBE_PATH') or shutil.which('ffprobe')
+FFMPEG_THREADS = os.getenv('FFMPEG_THREADS', '2')
+
+# Bitrate ladder: (height, video bitrate). Only rungs at or below the source height are built.
+LADDER = ((480, '700k'), (720, '1500k'), (1080, '3000k'))
+
+# Container -> (ffmpeg codec args, MIME type for <source type>), smallest/most efficient first
+FORMATS = {
+    'webm': (['-c:v', 'libvpx-vp9', '-row-mt', '1', '-deadline', 'good', '-cpu-used', '4'], 'video/webm'),
+    'mp4': (['-c:v', 'libx264', '-preset', 'medium', '-pix_fmt', 'yuv420p', '-movflags', '+faststart'], 'video/mp4'),
+}
+
+MIME_TYPES = {'.webm': 'video/webm', '.mp4': 'video/mp4', '.m4v': 'video/mp4', '.ogv': 'video/ogg', '.mov': 'video/quicktime'}
+
+# Section columns that hold a video: field -> (section name in app_utils.SECTION_TABLES, column)
+VIDEO_FIELDS = {
+    'innovationVideo': ('innovation', 'innovationVideo'),
+    'clientExpVideo': ('experience', 'clientExpVideo'),
+    'knowVideo': ('know', 'knowVideo'),
+}
+
+# Transcodes are CPU heavy; run one at a time so page requests keep their share of the CPU
+_transcode_slots = threading.Semaphore(int(os.getenv('VIDEO_TRANSCODE_CONCURRENCY', 1)))
+
+
+def available():
+    return bool(FFMPEG and FFPROBE)
+
+
+def mime_type(path):
+    return MIME_TYPES.get(os.path.splitext(path or '')[1].lower(), 'video/mp4')
+
+
+def _run(args):
+    def lower_priority():
+        os.nice(10)
+    subprocess.run(args, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                   preexec_fn=lower_priority if hasattr(os, 'nice') else None)
+
+
+def _source_height(source_file):
+    out = subprocess.run(
+        [FFPROBE, '-v', 'error', '-select_streams', 'v:0', '-show_entries', 'stream=height',
+         '-of', 'json', source_file],
+        check=True, capture_output=True,
+    ).stdout
+    return int(json.loads(out)['streams'][0]['height'])
+
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:32]
+
+
+def transcode(source_file):
+    """
+    Builds the rendition ladder and a poster frame for one video.
+    Returns {'sources': [{'url', 'type', 'height'}, ...], 'poster': url}, with
+    sources ordered smallest first per format. Outputs are named after the
+    source bytes, so re-running skips work that is already done.
+    """
+    os.makedirs(VIDEO_FOLDER, exist_ok=True)
+    stem = _file_hash(source_file)
+    height = _source_height(source_file)
+    rungs = [(h, rate) for h, rate in LADDER if h <= height] or [(height, LADDER[0][1])]
+
+    sources = []
+    for ext, (codec_args, mime) in FORMATS.items():
+        for rung_height, bitrate in rungs:
+            filename = f"{stem}-{rung_height}p.{ext}"
+            out_path = os.path.join(VIDEO_FOLDER, filename)
+            if not os.path.exists(out_path):
+                tmp_path = os.path.join(VIDEO_FOLDER, f".tmp-{filename}")
+                _run([FFMPEG, '-y', '-v', 'error', '-i', source_file,
+                      '-vf', f"scale=-2:{rung_height}", *codec_args,
+                      '-b:v', bitrate, '-maxrate', bitrate, '-bufsize', bitrate,
+                      '-threads', FFMPEG_THREADS,
+                      '-an',  # the section videos autoplay muted, so audio is dead weight
+                      '-f', ext, tmp_path])
+                os.replace(tmp_path, out_path)
+            sources.append({'url': f"{VIDEO_URL}/{filename}", 'type': mime, 'height': rung_height})
+
+    poster_name = f"{stem}-poster.jpg"
+    poster_path = os.path.join(VIDEO_FOLDER, poster_name)
+    if not os.path.exists(poster_path):
+        tmp_path = os.path.join(VIDEO_FOLDER, f".tmp-{poster_name}")
+        _run([FFMPEG, '-y', '-v', 'error', '-ss', '1', '-i', source_file, '-frames:v', '1',
+              '-vf', f"scale=-2:{min(height, 720)}", '-q:v', '4', '-f', 'image2', tmp_path])
+        os.replace(tmp_path, poster_path)
+
+    return {'sources': sources, 'poster': f"{VIDEO_URL}/{poster_name}"}
+
+
+def static_file(path):
+    """Filesystem path for a stored 'static/...' path."""
+    return os.path.join(STATIC_ROOT, path[len('static/'):]) if path and path.startswith('static/') else None
+
+
+def process_video(field, video_path):
+    """
+    Background job: transcodes the video now used by a section and stores
+    the renditions and poster on the section row, next to the video column.
+    The row is only updated if it still points at this video.
+    """
+    from app_utils import get_db_connection, bump_content_version, SECTION_TABLES
+    if not available():
+        print(f"ffmpeg not found; serving {video_path} without renditions")
+        return
+    source_file = static_file(video_path)
+    if not source_file or not os.path.exists(source_file):
+        return
+    with _transcode_slots:
+        try:
+            result = transcode(source_file)
+        except (subprocess.CalledProcessError, OSError, ValueError, KeyError) as e:
+            print(f"Error transcoding {video_path}: {e}")
+            return
+
+    section, column = VIDEO_FIELDS[field]
+    table, pk = SECTION_TABLES[section]
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            f"UPDATE {table} SET {column}Sources = %s, {column}Poster = %s WHERE {pk} = 1 AND {column} = %s",
+            (json.dumps(result['sources']), result['poster'], video_path),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+    bump_content_version()
+
+
+def backfill():
+    """Transcodes whatever videos the sections currently use (e.g. the seeded ones)."""
+    from app_utils import get_db_connection, fetch_sections
+    conn = get_db_connection()
+    try:
+        content = fetch_sections(conn)
+    finally:
+        conn.close()
+    for field in VIDEO_FIELDS:
+        if content.get(field):
+            print(f"Transcoding {field}: {content[field]}")
+            process_video(field, content[field])
+
+
+if __name__ == '__main__':
+    if not available():
+        print("ffmpeg/ffprobe not found. Install ffmpeg or set FFMPEG_PATH and FFPROBE_PATH.")
+    else:
+        backfill()
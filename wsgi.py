@@ -0,0 +1,5 @@
+# Entry point for a production WSGI server, e.g. `gunicorn wsgi:app`:
+# the app with its background jobs (meeting links, search index) running.
+from app import app, start_scheduler
+
+start_scheduler()